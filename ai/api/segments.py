@@ -0,0 +1,226 @@
+import os
+import subprocess
+import tempfile
+import time
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+from config import SEGMENT_MIN_FRAMES, SEGMENT_WARMUP, SEGMENT_WORKERS, TARGET_FPS
+from detection.frames import sampled_fps
+from models.predictor import Predictor
+
+# The worker processes, started on first use and reused across videos.
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def plan_segments(
+    frame_count: int, workers: int, min_frames: int = SEGMENT_MIN_FRAMES
+) -> List[Tuple[int, int]]:
+    """
+    Splits the frames of a video into contiguous segments of about the same length.
+
+    Args:
+        frame_count (int): The number of frames of the video.
+        workers (int): The number of worker processes; there are at most as many segments.
+        min_frames (int, optional): The minimum length of a segment. Defaults to SEGMENT_MIN_FRAMES.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end frame of each segment, in order.
+    """
+    count = max(1, min(workers, frame_count // max(min_frames, 1)))
+    bounds = np.linspace(0, frame_count, count + 1).round().astype(int)
+    return [(int(s), int(e)) for s, e in zip(bounds[:-1], bounds[1:])]
+
+
+def process_segment(
+    video_path: str,
+    start: int,
+    end: int,
+    warmup: int,
+    output_path: str,
+    compact: bool,
+    target_fps: Optional[float] = TARGET_FPS,
+) -> Tuple[np.ndarray, Dict[str, Dict[str, float]]]:
+    """
+    Extracts the landmarks of one segment in a worker process.
+
+    The worker's own Holistic is reset, then run on the warmup frames before
+    the segment so its tracker settles like it would have mid-video.
+
+    Args:
+        video_path (str): The path of the input video.
+        start (int): The first frame of the segment.
+        end (int): The frame after the segment.
+        warmup (int): The number of frames before start to only run detection on.
+        output_path (str): The path to save the frames of the segment to.
+        compact (bool): Whether to extract the compact COMPACT_LANDMARKS layout.
+        target_fps (Optional[float], optional): The most frames per second to detect. Defaults to TARGET_FPS.
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Dict[str, float]]]: The (end - start, rows, 3) landmarks and the stage timings.
+    """
+    from api.video import VideoPrediction
+
+    video = VideoPrediction()
+    video.holistic.reset()
+    landmarks, _, metrics = video.extract_landmarks(
+        Predictor(compact=compact),
+        video_path,
+        output_path,
+        threaded=False,
+        decoder=False,
+        start=start,
+        end=end,
+        warmup=warmup,
+        target_fps=target_fps,
+    )
+    return landmarks.copy(), metrics
+
+
+def concat_videos(paths: List[str], output_path: str) -> None:
+    """
+    Joins videos of the same format end to end, without re-encoding.
+
+    Args:
+        paths (List[str]): The videos, in order.
+        output_path (str): The path of the joined video.
+    """
+    import imageio_ffmpeg
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.writelines(f"file '{os.path.abspath(path)}'\n" for path in paths)
+    try:
+        subprocess.run(
+            [
+                imageio_ffmpeg.get_ffmpeg_exe(),
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                f.name,
+                "-c",
+                "copy",
+                output_path,
+            ],
+            check=True,
+            capture_output=True,
+        )
+    finally:
+        os.remove(f.name)
+
+
+def merge_segments(
+    results: List[Tuple[np.ndarray, Dict[str, Dict[str, float]]]]
+) -> Tuple[np.ndarray, Dict[str, Dict[str, float]]]:
+    """
+    Joins the landmarks of the segments of a video and averages their stage timings.
+
+    Args:
+        results (List[Tuple[np.ndarray, Dict[str, Dict[str, float]]]]): The landmarks and stage timings of each segment, in time order, see process_segment.
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Dict[str, float]]]: The (T, rows, 3) landmarks and the items and busy milliseconds per item of each stage, averaged over the segments' items.
+    """
+    landmarks = np.concatenate([r[0] for r in results])
+    metrics = {}
+    for _, segment in results:
+        for name, stage in segment.items():
+            if "busy_ms" not in stage:
+                continue
+            total = metrics.setdefault(name, {"items": 0, "busy_ms": 0.0})
+            total["busy_ms"] += stage["busy_ms"] * stage["items"]
+            total["items"] += stage["items"]
+    for stage in metrics.values():
+        stage["busy_ms"] /= max(stage["items"], 1)
+    return landmarks, metrics
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Returns the worker pool, starting it on first use.
+
+    Workers are spawned rather than forked, so they do not inherit the
+    threads of TensorFlow or of a running Pipeline.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+    global _pool
+    if _pool is None or _pool._max_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+    return _pool
+
+
+def extract_segments(
+    model: Predictor,
+    video_path: str,
+    output_path: str,
+    workers: int = SEGMENT_WORKERS,
+    min_frames: int = SEGMENT_MIN_FRAMES,
+    warmup: int = SEGMENT_WARMUP,
+    target_fps: Optional[float] = TARGET_FPS,
+) -> Tuple[np.ndarray, float, Dict[str, Dict[str, float]]]:
+    """
+    Extracts the landmarks of a video in parallel segments, like VideoPrediction.extract_landmarks.
+
+    Each segment runs in a worker process with its own Holistic, seeking to
+    warmup frames before the segment. Warmup frames are detected but not
+    kept, so the segments meet without duplicate or missing frames; their
+    landmarks are concatenated and their videos joined in time order.
+
+    Args:
+        model (Predictor): The sign language gesture recognition model, which sets the landmark layout.
+        video_path (str): The path of the input video.
+        output_path (str): The path to save the output video.
+        workers (int, optional): The number of worker processes. Defaults to SEGMENT_WORKERS.
+        min_frames (int, optional): The minimum length of a segment. Defaults to SEGMENT_MIN_FRAMES.
+        warmup (int, optional): The number of frames each segment starts early. Defaults to SEGMENT_WARMUP.
+        target_fps (Optional[float], optional): The most frames per second to detect. Defaults to TARGET_FPS.
+
+    Returns:
+        Tuple[np.ndarray, float, Dict[str, Dict[str, float]]]: The (T, rows, 3) landmarks, their frames per second and the stage timings averaged over the frames, with the number of segments.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = sampled_fps(cap.get(cv2.CAP_PROP_FPS), target_fps)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    begin = time.perf_counter()
+    segments = plan_segments(frame_count, workers, min_frames)
+    pool = get_pool(workers)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_path) or ".") as tmp:
+        paths = [os.path.join(tmp, f"{i}.avi") for i in range(len(segments))]
+        futures = [
+            pool.submit(
+                process_segment,
+                video_path,
+                start,
+                # CAP_PROP_FRAME_COUNT is an estimate, so the last segment reads to the end.
+                None if i == len(segments) - 1 else end,
+                warmup,
+                path,
+                model.compact,
+                target_fps,
+            )
+            for i, ((start, end), path) in enumerate(zip(segments, paths))
+        ]
+        results = [future.result() for future in futures]
+        concat_videos(paths, output_path)
+    landmarks, metrics = merge_segments(results)
+    metrics["total"] = {
+        "items": len(landmarks),
+        "items_per_second": len(landmarks) / (time.perf_counter() - begin),
+        "segments": len(segments),
+    }
+    return landmarks, fps, metrics
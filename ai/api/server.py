@@ -122,6 +122,29 @@ async def get_logs() -> (
         )
 
 
+@MessageWrapper
+@app.get("/metrics", response_model=None)
+async def get_metrics() -> (
+    Union[SuccessMessage, ApiException, ErrorMessage, Exception, None]
+):
+    """
+    Endpoint to get the inference metrics of the model.
+
+    Returns:
+        Union[SuccessMessage, ApiException, ErrorMessage, Exception, None]: The response message.
+    """
+    try:
+        return SuccessMessage(
+            message="Metrics fetched successfully.",
+            content=queue.model.metrics(),
+            status_code=200,
+        )
+    except Exception as e:
+        return ErrorMessage(
+            message="Failed to fetch metrics.", status_code=500, details=str(e)
+        )
+
+
 @MessageWrapper
 @app.post("/queue/add", response_model=None)
 async def add_to_queue(
@@ -4,8 +4,16 @@ from typing import Optional
 from api.services.mongo import MongoService
 from api.services.cloudinary import CloudinaryService
 from api.utils.exception import ApiException
-from config import FILE_PATH
-from models.model import Model
+from config import (
+    COMPACT_EXTRACTION,
+    INFERENCE_BACKEND,
+    INFERENCE_CASCADE,
+    INFERENCE_QUANTIZED,
+    INFERENCE_SERVER,
+    INFERENCE_SOCKET,
+    MODEL_PATHS,
+)
+from models.runtime import create_model
 from api.video import VideoPrediction
 from utils.mistral_api import MistralAPI
 
@@ -18,8 +26,14 @@ class QueueService(object):
         mongo_service = MongoService()
         mongo_service.__connect__()
         self.mongo_service = mongo_service
-        self.model = Model(
-            model_path=FILE_PATH + "/weights/islr-fp16-192-8-seed42-foldall-last.h5"
+        quantized = INFERENCE_QUANTIZED and INFERENCE_BACKEND == "tflite"
+        self.model = create_model(
+            model_path=MODEL_PATHS["quantized" if quantized else INFERENCE_BACKEND],
+            compact=COMPACT_EXTRACTION,
+            backend=INFERENCE_BACKEND,
+            fallback_path=MODEL_PATHS["tflite"] if quantized else None,
+            cascade_path=MODEL_PATHS["cascade"] if INFERENCE_CASCADE else None,
+            server=INFERENCE_SOCKET if INFERENCE_SERVER else None,
         )
         self.model.__load__()
         self.video_prediction = VideoPrediction()
@@ -138,6 +152,8 @@ class QueueService(object):
 
             # Delete files
             cloudinary_service.cleanup()
+            if self.model.cache is not None:
+                self.model.cache.save()
 
             print(f"Finished processing video: {video.video_id}")
             log_writer.add_log("info", f"Finished processing video: {video.video_id}")
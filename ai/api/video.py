@@ -2,15 +2,44 @@ import mediapipe as mp
 import cv2
 import asyncio
 import numpy as np
-import pandas as pd
-from models.model import Model
-from config import FILE_PATH, PROMPT, NUMBER_OF_FRAMES
+from models.predictor import Predictor
+from config import (
+    FILE_PATH,
+    PROMPT,
+    NUMBER_OF_FRAMES,
+    NO_SIGN,
+    VIDEO_PIPELINE,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_RENDER_WORKERS,
+    VIDEO_SEGMENTS,
+    SEGMENT_WORKERS,
+    VIDEO_DECODER_PROCESS,
+    DETECTION_MAX_SIDE,
+    TARGET_FPS,
+    COMPACT_EXTRACTION,
+    INFERENCE_BACKEND,
+    MODEL_PATHS,
+)
 from utils.mistral_api import MistralAPI
-from typing import Tuple, List, Dict, Union
+from utils.pipeline import Pipeline
+from utils.shm_ring import FrameRing
+from typing import Any, Optional, Tuple, List, Dict, Union
+from detection.landmarks import LandmarkBuffer, results_to_array, results_to_compact
+from detection.frames import (
+    decode_frames,
+    detection_input,
+    read_frames,
+    ring_frames,
+    sampled_fps,
+)
+from contextlib import ExitStack
+from itertools import chain
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
 import os
 from moviepy.editor import VideoFileClip
 from api.dto.prediction import Prediction
-from api.dto.landmark import LandMark
+from api.segments import extract_segments
 from api.utils.exception import ApiException
 from api.services.logWriter import LogWriter
 
@@ -25,23 +54,29 @@ class VideoPrediction:
 
     @classmethod
     def mediapipe_detection(
-        self, image: np.ndarray, model: mp.solutions.holistic.Holistic
+        self,
+        image: np.ndarray,
+        model: mp.solutions.holistic.Holistic,
+        max_side: Optional[int] = DETECTION_MAX_SIDE,
     ) -> Tuple[np.ndarray, mp.solutions.holistic.Holistic]:
         """
         Perform mediapipe detection on an image using the given model.
 
+        The image is scaled down to max_side and converted to RGB in one step,
+        see detection_input. The landmarks are normalized, so they are drawn
+        on the full-size image unchanged.
+
         Args:
-            image (np.ndarray): The input image.
+            image (np.ndarray): The input image, in BGR.
             model (mp.solutions.holistic.Holistic): The mediapipe holistic model.
+            max_side (Optional[int], optional): The longest side of the image detected on. Defaults to DETECTION_MAX_SIDE.
 
         Returns:
-            Tuple[np.ndarray, mp.solutions.holistic.Holistic]: The processed image and the detection results.
+            Tuple[np.ndarray, mp.solutions.holistic.Holistic]: The input image, to draw on, and the detection results.
         """
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
-        results = model.process(image)
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        rgb = detection_input(image, max_side)
+        rgb.flags.writeable = False
+        results = model.process(rgb)
         return image, results
 
     def draw_styled_landmarks(
@@ -99,127 +134,6 @@ class VideoPrediction:
             ),
         )
 
-    def extract_keypoints(
-        self, frame_id: str, results: mp.solutions.holistic.Holistic
-    ) -> List[Dict[str, Union[str, float]]]:
-        """
-        Extract keypoints from the detection results.
-
-        Args:
-            frame_id (str): The frame ID.
-            results (mp.solutions.holistic.Holistic): The detection results.
-
-        Returns:
-            List[Dict[str, Union[str, float]]]: The extracted keypoints.
-        """
-        objects = []
-
-        # FACE
-        if results.face_landmarks:
-            for i, res in enumerate(results.face_landmarks.landmark):
-                objects.append(
-                    LandMark().add(
-                        x=res.x,
-                        y=res.y,
-                        z=res.z,
-                        frame=frame_id,
-                        type="face",
-                        landmark_index=i,
-                    )
-                )
-        else:
-            for i in range(468):
-                objects.append(
-                    LandMark().add(
-                        x=np.nan,
-                        y=np.nan,
-                        z=np.nan,
-                        frame=frame_id,
-                        type="face",
-                        landmark_index=i,
-                    )
-                )
-
-        # LEFT
-        if results.left_hand_landmarks:
-            for i, res in enumerate(results.left_hand_landmarks.landmark):
-                objects.append(
-                    LandMark().add(
-                        x=res.x,
-                        y=res.y,
-                        z=res.z,
-                        frame=frame_id,
-                        type="left",
-                        landmark_index=i,
-                    )
-                )
-        else:
-            for i in range(21):
-                objects.append(
-                    LandMark().add(
-                        x=np.nan,
-                        y=np.nan,
-                        z=np.nan,
-                        frame=frame_id,
-                        type="left",
-                        landmark_index=i,
-                    )
-                )
-
-        # POSE
-        if results.pose_landmarks:
-            for i, res in enumerate(results.pose_landmarks.landmark):
-                objects.append(
-                    LandMark().add(
-                        x=res.x,
-                        y=res.y,
-                        z=res.z,
-                        frame=frame_id,
-                        type="pose",
-                        landmark_index=i,
-                    )
-                )
-        else:
-            for i in range(33):
-                objects.append(
-                    LandMark().add(
-                        x=np.nan,
-                        y=np.nan,
-                        z=np.nan,
-                        frame=frame_id,
-                        type="pose",
-                        landmark_index=i,
-                    )
-                )
-
-        # RIGHT
-        if results.right_hand_landmarks:
-            for i, res in enumerate(results.right_hand_landmarks.landmark):
-                objects.append(
-                    LandMark().add(
-                        x=res.x,
-                        y=res.y,
-                        z=res.z,
-                        frame=frame_id,
-                        type="right",
-                        landmark_index=i,
-                    )
-                )
-        else:
-            for i in range(21):
-                objects.append(
-                    LandMark().add(
-                        x=np.nan,
-                        y=np.nan,
-                        z=np.nan,
-                        frame=frame_id,
-                        type="right",
-                        landmark_index=i,
-                    )
-                )
-
-        return objects
-
     def delete_file(self, file_path: str) -> None:
         """
         Delete a file.
@@ -254,10 +168,147 @@ class VideoPrediction:
         current_duration = frame_id / fps
         return current_duration
 
+    def extract_landmarks(
+        self,
+        model: Predictor,
+        video_path: str,
+        output_path: str,
+        threaded: bool = VIDEO_PIPELINE,
+        render_workers: int = PIPELINE_RENDER_WORKERS,
+        start: int = 0,
+        end: Optional[int] = None,
+        warmup: int = 0,
+        decoder: bool = VIDEO_DECODER_PROCESS,
+        target_fps: Optional[float] = TARGET_FPS,
+    ) -> Tuple[np.ndarray, float, Dict[str, Dict[str, float]]]:
+        """
+        Detect the landmarks of every frame of a video and save the frames with the landmarks drawn.
+
+        Decoding, detection, keypoint extraction, drawing and encoding run as
+        the stages of a Pipeline, each on its own thread, with
+        PIPELINE_QUEUE_SIZE frames between stages. Detection keeps the
+        tracking state of Holistic, and extraction and encoding append, so
+        those stages have one worker each. With decoder, frames are decoded
+        in a separate process into the slots of a FrameRing and detection
+        reads them in place, releasing each slot once it has converted it.
+        Videos above target_fps are sampled down to it, see FrameSampler, and
+        the output video keeps only the sampled frames.
+
+        Args:
+            model (Predictor): The sign language gesture recognition model, which sets the landmark layout.
+            video_path (str): The path of the input video.
+            output_path (str): The path to save the output video.
+            threaded (bool, optional): Whether to run the stages on threads, or one frame at a time. Defaults to VIDEO_PIPELINE.
+            render_workers (int, optional): The number of threads drawing the landmarks. Defaults to PIPELINE_RENDER_WORKERS.
+            start (int, optional): The first frame to process. Defaults to 0.
+            end (Optional[int], optional): The frame to stop before. Defaults to None, the end of the video.
+            warmup (int, optional): The number of frames before start to only run detection on, so the Holistic tracker settles. Defaults to 0.
+            decoder (bool, optional): Whether to decode in a separate process, through shared memory. Defaults to VIDEO_DECODER_PROCESS.
+            target_fps (Optional[float], optional): The most frames per second to detect. Defaults to TARGET_FPS.
+
+        Returns:
+            Tuple[np.ndarray, float, Dict[str, Dict[str, float]]]: The (T, rows, 3) landmarks, their frames per second, see sampled_fps, and the timings of each stage, see Pipeline.metrics.
+        """
+        with ExitStack() as stack:
+            cap = cv2.VideoCapture(video_path)
+            stack.callback(cap.release)
+            fps = sampled_fps(cap.get(cv2.CAP_PROP_FPS), target_fps)
+            frame_width = int(cap.get(3))
+            frame_height = int(cap.get(4))
+
+            fourcc = cv2.VideoWriter_fourcc(*"XVID")
+            out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+            stack.callback(out.release)
+
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            end = frame_count if end is None else min(end, frame_count)
+            landmarks = LandmarkBuffer(
+                capacity=max(end - start, NUMBER_OF_FRAMES), rows=model.rows
+            )
+            to_array = results_to_compact if model.compact else results_to_array
+
+            first = max(start - warmup, 0)
+            # CAP_PROP_FRAME_COUNT is an estimate, so the last segment reads to the end.
+            last = None if end == frame_count else end
+            ring = None
+            if decoder:
+                cap.release()
+                ring = FrameRing(
+                    PIPELINE_QUEUE_SIZE + 2, (frame_height, frame_width, 3)
+                )
+                stack.callback(ring.close)
+                process = get_context("spawn").Process(
+                    target=decode_frames,
+                    args=(video_path, ring, first, last, target_fps),
+                    name="decode",
+                    daemon=True,
+                )
+                process.start()
+                # Runs before ring.close, so the decoder is gone when the ring is unlinked.
+                stack.callback(self.stop_process, process)
+                frames = ring_frames(ring, process)
+            else:
+                frames = read_frames(cap, first, last, target_fps)
+
+            def release(slot: Optional[int]) -> None:
+                if slot is not None:
+                    ring.release(slot)
+
+            for item in frames:
+                if item[1] >= start:
+                    frames = chain([item], frames)
+                    break
+                self.mediapipe_detection(item[2], self.holistic)
+                release(item[0])
+
+            def detect(
+                item: Tuple[Optional[int], int, np.ndarray]
+            ) -> Tuple[np.ndarray, Any]:
+                slot, _, frame = item
+                if slot is not None:
+                    # The frame is drawn on later, so it must outlive the slot.
+                    frame = frame.copy()
+                    release(slot)
+                return self.mediapipe_detection(frame, self.holistic)
+
+            def extract(item: Tuple[np.ndarray, Any]) -> Tuple[np.ndarray, Any]:
+                to_array(item[1], out=landmarks.next_frame())
+                return item
+
+            def render(item: Tuple[np.ndarray, Any]) -> np.ndarray:
+                self.draw_styled_landmarks(*item)
+                return item[0]
+
+            pipeline = Pipeline(
+                [
+                    ("detect", detect, 1),
+                    ("extract", extract, 1),
+                    ("render", render, render_workers),
+                    ("encode", out.write, 1),
+                ],
+                maxsize=PIPELINE_QUEUE_SIZE,
+                threaded=threaded,
+                source="decode",
+            )
+            for _ in pipeline.run(frames):
+                pass
+        return landmarks.view(), fps, pipeline.metrics()
+
+    def stop_process(self, process: BaseProcess) -> None:
+        """
+        Stops a helper process if it is still running and waits for it to exit.
+
+        Args:
+            process (BaseProcess): The started process.
+        """
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
     async def predict_video(
         self,
         mistral: MistralAPI,
-        model: Model,
+        model: Predictor,
         video_path: str,
         output_path: str,
         log_writer: LogWriter,
@@ -267,7 +318,7 @@ class VideoPrediction:
 
         Args:
             mistral (MistralAPI): The MistralAPI instance.
-            model (Model): The sign language gesture recognition model.
+            model (Predictor): The sign language gesture recognition model.
             video_path (str): The path of the input video.
             output_path (str): The path to save the output video.
             log_writer (LogWriter): The log writer instance.
@@ -275,70 +326,71 @@ class VideoPrediction:
         Returns:
             Tuple[List[Dict[str, Union[str, float]]], List[str]]: The predictions and the generated sentence.
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_width = int(cap.get(3))
-        frame_height = int(cap.get(4))
-
-        fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+        if VIDEO_SEGMENTS and SEGMENT_WORKERS > 1:
+            landmarks, fps, metrics = extract_segments(model, video_path, output_path)
+        else:
+            landmarks, fps, metrics = self.extract_landmarks(
+                model, video_path, output_path
+            )
+        timings = ", ".join(
+            f"{name} {stage['busy_ms']:.1f} ms"
+            for name, stage in metrics.items()
+            if "busy_ms" in stage
+        )
+        message = (
+            f"Processed {metrics['total']['items']} frames at "
+            f"{metrics['total']['items_per_second']:.1f} fps ({timings} per frame)"
+        )
+        print(f"[INFO]: {message}")
+        log_writer.add_log("info", message)
+
+        print("[INFO]: Predicting")
+        log_writer.add_log("info", f"Predicting {len(landmarks)} frames")
+        logits, timestamps = model.predict_windows(landmarks, fps)
+        words, probs = model.decode(logits)
+        skipped = words.count(NO_SIGN)
+        print(f"[INFO]: Skipped {skipped} of {len(words)} windows without signing")
+        log_writer.add_log(
+            "info", f"Skipped {skipped} of {len(words)} windows without signing"
+        )
 
-        sequence = []
         predictions = []
         sentence = []
-        frame_id = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            image, results = self.mediapipe_detection(frame, self.holistic)
-            self.draw_styled_landmarks(image, results)
-            if len(sequence) < NUMBER_OF_FRAMES:
-                sequence.append(self.extract_keypoints(str(frame_id), results))
-            elif len(sequence) == NUMBER_OF_FRAMES:
-                seq_pred = []
-                for s in sequence:
-                    seq_pred.extend(s)
-                seq_pred = [s.to_dict() for s in seq_pred]
-                df = pd.DataFrame(seq_pred)
-                df_imp = df.drop(["frame", "type", "landmark_index"], axis=1)
-
-                print("[INFO]: Predicting")
-                log_writer.add_log("info", "Predicting")
-                prediction, max_prob = model.predict(df_imp)
-
-                #   if max_prob < MIN_THRESHOLD:
-                #       pass
-                #   else:
-                # Remove repeated words
-                if len(predictions) > 0 and prediction == predictions[-1].word:
-                    # if max_prob > predictions[-1].probability:
-                    #     predictions[-1]["probability"] = str(max_prob)
-                    pass
-                else:
-                    sentence.append(prediction)
-                    llm_prediction = (
-                        mistral.call_mistral_api(PROMPT(" ".join(sentence)))
-                        if len(sentence) > 2
-                        else ""
-                    )
-                    prediction_obj = Prediction().add(
-                        word=prediction,
+        for prediction, max_prob, (_, end) in zip(words, probs, timestamps):
+            #   if max_prob < MIN_THRESHOLD:
+            #       pass
+            #   else:
+            # Remove repeated words
+            if len(predictions) > 0 and prediction == predictions[-1].word:
+                # if max_prob > predictions[-1].probability:
+                #     predictions[-1]["probability"] = str(max_prob)
+                pass
+            elif prediction == NO_SIGN:
+                # Skipped windows stay in the timeline but not the sentence.
+                predictions.append(
+                    Prediction().add(
+                        word=NO_SIGN,
                         probability=max_prob,
-                        current_duration=round(
-                            self.get_current_duration(fps, frame_id)
-                        ),
+                        current_duration=round(end),
                         sentence_till_now=str(" ".join(sentence)),
-                        llm_prediction=str(llm_prediction),
+                        llm_prediction="",
                     )
-                    predictions.append(prediction_obj)
-                sequence = []
-            out.write(image)
-            frame_id += 1
-
-        cap.release()
-        out.release()
+                )
+            else:
+                sentence.append(prediction)
+                llm_prediction = (
+                    mistral.call_mistral_api(PROMPT(" ".join(sentence)))
+                    if len(sentence) > 2
+                    else ""
+                )
+                prediction_obj = Prediction().add(
+                    word=prediction,
+                    probability=max_prob,
+                    current_duration=round(end),
+                    sentence_till_now=str(" ".join(sentence)),
+                    llm_prediction=str(llm_prediction),
+                )
+                predictions.append(prediction_obj)
 
         predictions = [p.to_dict() for p in predictions]
 
@@ -347,7 +399,7 @@ class VideoPrediction:
     async def main(
         self,
         mistral: MistralAPI,
-        model: Model,
+        model: Predictor,
         video_path: str,
         save_name: str,
         log_writer: LogWriter,
@@ -357,7 +409,7 @@ class VideoPrediction:
 
         Args:
             mistral (MistralAPI): The MistralAPI instance.
-            model (Model): The sign language gesture recognition model.
+            model (Predictor): The sign language gesture recognition model.
             video_path (str): The path of the input video.
             save_name (str): The name to be used for saving the output files.
             log_writer (LogWriter): The log writer instance.
@@ -387,10 +439,16 @@ class VideoPrediction:
 
 
 if __name__ == "__main__":
-    model = Model(
-        model_path=FILE_PATH + "/weights/islr-fp16-192-8-seed42-foldall-last.h5"
+    from models.runtime import create_model
+
+    model = create_model(
+        model_path=MODEL_PATHS[INFERENCE_BACKEND],
+        compact=COMPACT_EXTRACTION,
+        backend=INFERENCE_BACKEND,
     )
     model.__load__()
     video_path = FILE_PATH + "/videos/APPLE GREEN YOU LIKE EAT.mp4"
     save_name = "apple"
-    asyncio.run(VideoPrediction().main(model, video_path, save_name))
+    asyncio.run(
+        VideoPrediction().main(MistralAPI(), model, video_path, save_name, LogWriter())
+    )
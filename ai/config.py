@@ -121,12 +121,145 @@ LHAND = np.arange(468, 489).tolist()
 RHAND = np.arange(522, 543).tolist()
 
 POINT_LANDMARKS = LIP + LHAND + RHAND + NOSE + REYE + LEYE  # +POSE
+CENTER_LANDMARKS = [17]
+
+# Compact layout: only the landmarks Preprocess reads, in POINT_LANDMARKS order.
+COMPACT_LANDMARKS = POINT_LANDMARKS
+COMPACT_EXTRACTION = True
 
 NUM_NODES = len(POINT_LANDMARKS)
 CHANNELS = 6 * NUM_NODES
 ROWS_PER_FRAME = 543
 NUMBER_OF_FRAMES = 30
+# Videos are sampled down to at most TARGET_FPS frames per second by their
+# timestamps, see detection.frames.FrameSampler; skipped frames are grabbed but
+# never retrieved. Windows are WINDOW_SECONDS long and start every
+# WINDOW_STRIDE_SECONDS, so they cover the same time, and detection costs the
+# same per second of video, whatever the frame rate of the upload. None keeps
+# every frame.
+TARGET_FPS = 30
+WINDOW_SECONDS = 1.0
+WINDOW_STRIDE_SECONDS = WINDOW_SECONDS
+# Cut windows at the valleys of hand motion, see models.windowing.motion_windows,
+# instead of every WINDOW_STRIDE_SECONDS. Windows are MIN_WINDOW_SECONDS to
+# MAX_WINDOW_SECONDS long; MOTION_SMOOTHING is the moving average, in frames,
+# applied to the motion energy first.
+ADAPTIVE_WINDOWS = False
+MIN_WINDOW_SECONDS = WINDOW_SECONDS / 2
+MAX_WINDOW_SECONDS = 2 * WINDOW_SECONDS
+MOTION_SMOOTHING = 5
+INFERENCE_BATCH_SIZE = 64
+# Decode, detect, extract, render and encode the frames of a video on their
+# own threads, see utils.pipeline.Pipeline, with PIPELINE_QUEUE_SIZE frames
+# between stages and PIPELINE_RENDER_WORKERS threads drawing the landmarks.
+# False processes one frame at a time.
+VIDEO_PIPELINE = True
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_RENDER_WORKERS = 1
+# Split each video into up to SEGMENT_WORKERS segments of at least
+# SEGMENT_MIN_FRAMES frames and process them in parallel worker processes, see
+# api.segments. Each segment starts SEGMENT_WARMUP frames early so the
+# Holistic tracker settles before its first kept frame.
+VIDEO_SEGMENTS = False
+SEGMENT_WORKERS = os.cpu_count() or 1
+SEGMENT_MIN_FRAMES = 150
+SEGMENT_WARMUP = 15
+# Decode videos in a separate process that writes frames straight into
+# shared memory, see utils.shm_ring.FrameRing, so decoding does not share the
+# GIL with detection and frames are not pickled between processes.
+VIDEO_DECODER_PROCESS = False
+# Longest side, in pixels, of the frames Holistic detects on; larger frames
+# are scaled down in the same step that converts them to RGB. The landmarks
+# are normalized to the frame, so they apply to the full-size frame as they
+# are. None detects at full resolution.
+DETECTION_MAX_SIDE = 1280
+
+# Inference backend: "keras" runs the .h5 weights, "tflite" and "onnx" a file
+# from scripts.export. The onnx backend does not import TensorFlow.
+INFERENCE_BACKEND = "keras"
+INFERENCE_THREADS = 1
+# With the tflite backend, serve MODEL_PATHS["quantized"] and fall back to the
+# float MODEL_PATHS["tflite"] when it is missing.
+INFERENCE_QUANTIZED = False
+# Fold each BatchNormalization into the layer before or after it and drop the
+# dropout layers when the keras weights are loaded. Exports inherit the lean graph.
+FOLD_BATCH_NORM = True
+# Windows are padded up to the nearest of these lengths, so each runtime sees
+# a few fixed shapes. The keras backend traces one function per bucket when it
+# loads. Longer windows run unpadded; an empty tuple disables bucketing.
+LENGTH_BUCKETS = (8, 16, NUMBER_OF_FRAMES, 64, 128, 256, MAX_LEN)
+# Compile Preprocess and the keras ensemble of each length bucket into one XLA
+# function. Falls back to the traced graph when compilation fails.
+INFERENCE_XLA = False
+# Compute precision of the keras backend networks. "bfloat16" and "float16"
+# run the Dense, attention and convolution math in 16 bits on float32 weights,
+# while Preprocess and the logits stay float32. CPUs without native support
+# (AVX512-BF16 or AMX-BF16, AVX512-FP16) fall back to "float32".
+INFERENCE_PRECISION = "float32"
+# How the keras backend runs several checkpoints, e.g. fold models passed to
+# Model as a list: "sequential" runs each network and averages the logits,
+# "average" averages the weights into one network and "fused" runs all
+# networks in one pass.
+ENSEMBLE_MODE = "sequential"
+# Width of the keras networks, see Model.get_model: 192, or 384 for the model
+# with twice the blocks.
+MODEL_DIM = 192
+# Serve a cascade: every window runs through the model above and is escalated
+# to MODEL_PATHS["cascade"], a CASCADE_DIM model, when the top-1 probability
+# is below CASCADE_MIN_PROBABILITY or its margin over the second label below
+# CASCADE_MIN_MARGIN. The larger model is served by the keras backend.
+INFERENCE_CASCADE = False
+CASCADE_DIM = 384
+CASCADE_MIN_PROBABILITY = 0.5
+CASCADE_MIN_MARGIN = 0.2
+MODEL_PATHS = {
+    "keras": os.path.join(FILE_PATH, "weights/islr-fp16-192-8-seed42-foldall-last.h5"),
+    "tflite": os.path.join(
+        FILE_PATH, "weights/islr-fp16-192-8-seed42-foldall-last.tflite"
+    ),
+    "quantized": os.path.join(
+        FILE_PATH, "weights/islr-fp16-192-8-seed42-foldall-last-quantized.tflite"
+    ),
+    "onnx": os.path.join(FILE_PATH, "weights/islr-fp16-192-8-seed42-foldall-last.onnx"),
+    "cascade": os.path.join(
+        FILE_PATH, "weights/islr-fp16-384-8-seed42-foldall-last.h5"
+    ),
+}
+# Memoize the logits of each window in a PREDICTION_CACHE_BYTES LRU cache,
+# keyed by the window rounded to PREDICTION_CACHE_QUANTUM and a digest of the
+# weights, and persist it to PREDICTION_CACHE_PATH (None keeps it in memory).
+PREDICTION_CACHE = True
+PREDICTION_CACHE_BYTES = 64 * 2**20
+PREDICTION_CACHE_QUANTUM = 1e-4
+PREDICTION_CACHE_PATH = os.path.join(FILE_PATH, "cache/predictions.npz")
+# Save the traced keras backend functions as a SavedModel under
+# COMPILED_CACHE_DIR, named by a digest of the weights, the model sources and
+# the settings, and restore them on later startups instead of rebuilding the
+# networks and loading the weights. Off until `benchmark.py startup` shows warm
+# restarts as fast as built models at every batch size, not just to load.
+COMPILED_CACHE = False
+COMPILED_CACHE_DIR = os.path.join(FILE_PATH, "cache/compiled")
+# Serve the model from one scripts/serve.py process instead of loading it in
+# every worker. Workers connect to INFERENCE_SOCKET and pass their windows
+# through INFERENCE_SERVER_SLOTS shared memory slots of
+# INFERENCE_SERVER_SLOT_BYTES each; larger batches go over the socket. The
+# server saves its prediction cache after INFERENCE_SERVER_SAVE_AFTER idle seconds.
+INFERENCE_SERVER = False
+INFERENCE_SOCKET = os.path.join(FILE_PATH, "cache/inference.sock")
+INFERENCE_SERVER_SLOTS = 2
+INFERENCE_SERVER_SLOT_BYTES = 16 * 2**20
+INFERENCE_SERVER_SAVE_AFTER = 5.0
 MIN_THRESHOLD = 0.3
+# Windows with a hand detected in fewer than this share of their frames skip
+# the model and are reported as NO_SIGN. 0 runs every window.
+MIN_HAND_COVERAGE = 0.1
+# Windows whose hands move less than this on average, in image widths per
+# frame, skip the model too. 0 runs every window with hands. Off until a
+# threshold is checked against the trained weights: signs held still, such as
+# fingerspelled letters and static handshapes, move little and would be
+# reported as NO_SIGN. benchmark.py gate tries --motion-energy, e.g. 0.002.
+MIN_MOTION_ENERGY = 0.0
+NO_SIGN = "no sign"
 
 s2p_map = {
     k.lower(): v
@@ -0,0 +1,200 @@
+import cv2
+import math
+import numpy as np
+from multiprocessing.process import BaseProcess
+from typing import Iterator, Optional, Tuple
+from utils.shm_ring import FrameRing
+
+
+def sampled_fps(fps: float, target_fps: Optional[float] = None) -> float:
+    """
+    Returns the frame rate of a video sampled down to a target frame rate.
+
+    Args:
+        fps (float): The frames per second of the video.
+        target_fps (Optional[float], optional): The most frames per second to keep. Defaults to None, every frame.
+
+    Returns:
+        float: The frames per second kept.
+    """
+    return min(fps, target_fps) if target_fps else fps
+
+
+class FrameSampler(object):
+    """
+    Picks the frames of a video to keep at a target frame rate, by their timestamps.
+
+    A frame is kept when it is the first within half a frame before or any
+    time after the next tick of a 1 / target_fps grid that starts at 0 s, so
+    any part of the video keeps the same frames as a pass over the whole of
+    it, and variable frame rate videos keep about target_fps frames in every
+    second. The half frame absorbs timestamps rounded to milliseconds.
+    """
+
+    def __init__(self, fps: float, target_fps: Optional[float] = None) -> None:
+        """
+        Initializes the FrameSampler object.
+
+        Args:
+            fps (float): The frames per second of the video.
+            target_fps (Optional[float], optional): The most frames per second to keep. Defaults to None, every frame.
+        """
+        self.interval = 1 / target_fps if target_fps and target_fps < fps else 0.0
+        self.frame_time = 1 / fps if fps else 0.0
+        self.tolerance = self.frame_time / 2
+        self.next_time: Optional[float] = None
+
+    def keep(self, timestamp: float) -> bool:
+        """
+        Checks whether to keep a frame, and moves the grid past it if so.
+
+        Args:
+            timestamp (float): The time of the frame in seconds.
+
+        Returns:
+            bool: True if the frame is kept, False if it is skipped.
+        """
+        if not self.interval:
+            return True
+        timestamp += self.tolerance
+        if self.next_time is None:
+            # Start where a pass from 0 s would be after the previous frame.
+            previous = timestamp - self.frame_time
+            self.next_time = (math.floor(previous / self.interval) + 1) * self.interval
+        if timestamp < self.next_time:
+            return False
+        self.next_time = (math.floor(timestamp / self.interval) + 1) * self.interval
+        return True
+
+
+def sample_video(
+    cap: cv2.VideoCapture,
+    start: int = 0,
+    end: Optional[int] = None,
+    target_fps: Optional[float] = None,
+) -> Iterator[int]:
+    """
+    Grabs the frames of a video and yields the ones a FrameSampler keeps, ready to retrieve.
+
+    Skipped frames are grabbed, which demuxes and decodes them, but never
+    retrieved, so they are not converted to BGR or copied out.
+
+    Args:
+        cap (cv2.VideoCapture): The opened video.
+        start (int, optional): The first frame. Defaults to 0.
+        end (Optional[int], optional): The frame to stop before. Defaults to None, the end of the video.
+        target_fps (Optional[float], optional): The most frames per second to keep. Defaults to None, every frame.
+
+    Yields:
+        int: The index of each kept frame, which cap.retrieve returns next.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    sampler = FrameSampler(fps, target_fps)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    frame_id = start
+    while cap.isOpened() and (end is None or frame_id < end):
+        if not cap.grab():
+            break
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1e3
+        if timestamp <= 0 and fps:
+            timestamp = frame_id / fps
+        if sampler.keep(timestamp):
+            yield frame_id
+        frame_id += 1
+
+
+def read_frames(
+    cap: cv2.VideoCapture,
+    start: int = 0,
+    end: Optional[int] = None,
+    target_fps: Optional[float] = None,
+) -> Iterator[Tuple[None, int, np.ndarray]]:
+    """
+    Yields the frames of a video in this process.
+
+    Args:
+        cap (cv2.VideoCapture): The opened video.
+        start (int, optional): The first frame. Defaults to 0.
+        end (Optional[int], optional): The frame to stop before. Defaults to None, the end of the video.
+        target_fps (Optional[float], optional): The most frames per second to keep, see FrameSampler. Defaults to None, every frame.
+
+    Yields:
+        Tuple[None, int, np.ndarray]: No slot to release, the index of the frame and the BGR frame.
+    """
+    for frame_id in sample_video(cap, start, end, target_fps):
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+        yield None, frame_id, frame
+
+
+def detection_input(image: np.ndarray, max_side: Optional[int] = None) -> np.ndarray:
+    """
+    Converts a BGR frame to the RGB input of Holistic, scaled down so its longest side is at most max_side.
+
+    The frame is scaled before it is converted, so only the small image is
+    converted; frames that already fit are converted as they are.
+
+    Args:
+        image (np.ndarray): The BGR frame.
+        max_side (Optional[int], optional): The longest side of the input in pixels. Defaults to None, the size of the frame.
+
+    Returns:
+        np.ndarray: The RGB input, a new array.
+    """
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def decode_frames(
+    video_path: str,
+    ring: FrameRing,
+    start: int = 0,
+    end: Optional[int] = None,
+    target_fps: Optional[float] = None,
+) -> None:
+    """
+    Decodes a video straight into the slots of a FrameRing; the target of a decoder process.
+
+    Args:
+        video_path (str): The path of the video.
+        ring (FrameRing): The ring, sized for the frames of the video.
+        start (int, optional): The first frame. Defaults to 0.
+        end (Optional[int], optional): The frame to stop before. Defaults to None, the end of the video.
+        target_fps (Optional[float], optional): The most frames per second to keep, see FrameSampler. Defaults to None, every frame.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        for frame_id in sample_video(cap, start, end, target_fps):
+            slot = ring.acquire()
+            ret, _ = cap.retrieve(ring.frame(slot))
+            if not ret:
+                ring.release(slot)
+                break
+            ring.put(slot, frame_id)
+    finally:
+        cap.release()
+        ring.finish()
+        ring.close()
+
+
+def ring_frames(
+    ring: FrameRing, decoder: Optional[BaseProcess] = None
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Yields the frames a decoder process writes into a FrameRing.
+
+    Args:
+        ring (FrameRing): The ring.
+        decoder (Optional[BaseProcess], optional): The decoder process; raises RuntimeError if it dies. Defaults to None.
+
+    Yields:
+        Tuple[int, int, np.ndarray]: The slot to release once the frame is read, the index of the frame and the BGR frame, a view of the slot.
+    """
+    for frame_id, slot, frame in ring.frames(decoder):
+        yield slot, frame_id, frame
@@ -0,0 +1,217 @@
+import numpy as np
+from typing import Any, List, Optional, Tuple
+from config import NUMBER_OF_FRAMES, ROWS_PER_FRAME, COMPACT_LANDMARKS
+
+# Row ranges of each Holistic part inside a (ROWS_PER_FRAME, 3) frame block.
+FACE_ROWS = slice(0, 468)
+LHAND_ROWS = slice(468, 489)
+POSE_ROWS = slice(489, 522)
+RHAND_ROWS = slice(522, 543)
+
+# Filler for parts that Holistic did not detect.
+NAN_FRAME = np.full((ROWS_PER_FRAME, 3), np.nan, dtype=np.float32)
+
+# Wire layout of a serialized NormalizedLandmark record: a length-delimited
+# entry whose first fields are fixed32 x, y and z, each behind a one-byte tag.
+_HEADER_COLUMNS = np.array([0, 2, 7, 12])
+_HEADER_TAGS = np.array([0x0A, 0x0D, 0x15, 0x1D], dtype=np.uint8)
+_MIN_RECORD, _MAX_RECORD = 17, 129
+
+
+class LandmarkBuffer(object):
+    """
+    A growable, preallocated float32 store of landmark frames.
+
+    Frames are written in place into a (capacity, rows, 3) array, so no
+    per-landmark objects are created on the hot path.
+
+    Attributes:
+      rows (int): The number of landmark rows per frame.
+      data (np.ndarray): The backing array of shape (capacity, rows, 3).
+      length (int): The number of frames written so far.
+    """
+
+    def __init__(
+        self, capacity: int = NUMBER_OF_FRAMES, rows: int = ROWS_PER_FRAME
+    ) -> None:
+        """
+        Initializes the LandmarkBuffer object.
+
+        Args:
+          capacity (int, optional): The initial number of frame slots. Defaults to NUMBER_OF_FRAMES.
+          rows (int, optional): The number of landmark rows per frame. Defaults to ROWS_PER_FRAME.
+        """
+        self.rows: int = rows
+        self.data: np.ndarray = np.empty((max(capacity, 1), rows, 3), dtype=np.float32)
+        self.length: int = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def next_frame(self) -> np.ndarray:
+        """
+        Reserves the next frame slot, growing the buffer if it is full.
+
+        Returns:
+          np.ndarray: A writable (rows, 3) view of the reserved slot.
+        """
+        if self.length == len(self.data):
+            self._grow()
+        frame = self.data[self.length]
+        self.length += 1
+        return frame
+
+    def append(self, frame: np.ndarray) -> None:
+        """
+        Copies a (rows, 3) frame into the next slot.
+
+        Args:
+          frame (np.ndarray): The frame to append.
+        """
+        self.next_frame()[...] = frame
+
+    def view(self) -> np.ndarray:
+        """
+        Returns the written frames without copying.
+
+        Returns:
+          np.ndarray: A (length, rows, 3) view of the buffer.
+        """
+        return self.data[: self.length]
+
+    def clear(self) -> None:
+        """
+        Discards all frames while keeping the allocated memory.
+        """
+        self.length = 0
+
+    def _grow(self) -> None:
+        data = np.empty((2 * len(self.data), self.rows, 3), dtype=np.float32)
+        data[: self.length] = self.data[: self.length]
+        self.data = data
+
+
+def landmarks_to_array(
+    landmarks: Any, out: np.ndarray, indices: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Copies a NormalizedLandmarkList into an (N, 3) float32 block in bulk.
+
+    The list is serialized once and the x/y/z floats are sliced out of the
+    fixed-size wire records with NumPy. Lists whose records are not uniform
+    fall back to reading the attributes.
+
+    Args:
+      landmarks (Any): The NormalizedLandmarkList returned by MediaPipe.
+      out (np.ndarray): The (N, 3) float32 block to write into.
+      indices (Optional[np.ndarray], optional): The landmarks to copy, in order. Defaults to all of them.
+
+    Returns:
+      np.ndarray: The filled block.
+    """
+    buf = landmarks.SerializeToString()
+    n = len(landmarks.landmark)
+    stride = len(buf) // n if n else 0
+    if _MIN_RECORD <= stride <= _MAX_RECORD and stride * n == len(buf):
+        records = np.frombuffer(buf, dtype=np.uint8).reshape(n, stride)
+        header = records[:, _HEADER_COLUMNS]
+        if (header == _HEADER_TAGS).all() and (records[:, 1] == stride - 2).all():
+            xyz = np.ndarray(
+                (n, 3), dtype="<f4", buffer=buf, offset=3, strides=(stride, 5)
+            )
+            out[...] = xyz if indices is None else xyz[indices]
+            return out
+
+    points = landmarks.landmark
+    if indices is not None:
+        points = [points[i] for i in indices]
+    out[...] = [(p.x, p.y, p.z) for p in points]
+    return out
+
+
+def results_to_array(results: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Converts MediaPipe Holistic results into a (ROWS_PER_FRAME, 3) frame block.
+
+    Missing parts are filled with NaN, in the face, left hand, pose, right
+    hand row order the model expects.
+
+    Args:
+      results (Any): The Holistic detection results.
+      out (Optional[np.ndarray], optional): The block to write into, e.g. LandmarkBuffer.next_frame(). Defaults to a new array.
+
+    Returns:
+      np.ndarray: The filled frame block.
+    """
+    if out is None:
+        out = np.empty((ROWS_PER_FRAME, 3), dtype=np.float32)
+
+    parts = (
+        (results.face_landmarks, FACE_ROWS),
+        (results.left_hand_landmarks, LHAND_ROWS),
+        (results.pose_landmarks, POSE_ROWS),
+        (results.right_hand_landmarks, RHAND_ROWS),
+    )
+    for landmarks, rows in parts:
+        if landmarks:
+            landmarks_to_array(landmarks, out[rows])
+        else:
+            out[rows] = NAN_FRAME[rows]
+
+    return out
+
+
+def _compact_parts() -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Maps each Holistic part onto the rows it fills in the compact layout.
+
+    Returns:
+      List[Tuple[str, np.ndarray, np.ndarray]]: The results attribute, the compact rows and the landmark indices within the part. Parts the compact layout does not use are left out.
+    """
+    compact = np.asarray(COMPACT_LANDMARKS)
+    parts = []
+    for name, rows in (
+        ("face_landmarks", FACE_ROWS),
+        ("left_hand_landmarks", LHAND_ROWS),
+        ("pose_landmarks", POSE_ROWS),
+        ("right_hand_landmarks", RHAND_ROWS),
+    ):
+        dst = np.flatnonzero((compact >= rows.start) & (compact < rows.stop))
+        if len(dst):
+            parts.append((name, dst, compact[dst] - rows.start))
+    return parts
+
+
+COMPACT_PARTS = _compact_parts()
+
+
+def results_to_compact(results: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Converts MediaPipe Holistic results into a compact (len(COMPACT_LANDMARKS), 3) block.
+
+    Only the landmarks the classifier reads are materialized; the rest of the
+    face and the whole pose are never touched.
+
+    Args:
+      results (Any): The Holistic detection results.
+      out (Optional[np.ndarray], optional): The block to write into. Defaults to a new array.
+
+    Returns:
+      np.ndarray: The filled compact block.
+    """
+    if out is None:
+        out = np.empty((len(COMPACT_LANDMARKS), 3), dtype=np.float32)
+
+    for name, dst, src in COMPACT_PARTS:
+        landmarks = getattr(results, name)
+        if landmarks:
+            if dst[-1] - dst[0] + 1 == len(dst):
+                landmarks_to_array(landmarks, out[dst[0] : dst[-1] + 1], src)
+            else:
+                out[dst] = landmarks_to_array(
+                    landmarks, np.empty((len(dst), 3), dtype=np.float32), src
+                )
+        else:
+            out[dst] = np.nan
+
+    return out
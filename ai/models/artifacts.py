@@ -0,0 +1,78 @@
+import os
+import shutil
+import tensorflow as tf
+from typing import Any
+from config import CHANNELS, NUM_CLASSES
+from models.cache import file_digest
+
+# The modules that define the keras backend graph: editing one changes the key.
+ARCHITECTURE_SOURCES = ("model.py", "layers.py", "graph.py", "ensemble.py")
+
+
+def artifact_key(model: Any) -> str:
+    """
+    Hashes the weights of a keras backend Model with everything its traced graph depends on.
+
+    Args:
+      model (Model): The model, with its precision already resolved for this CPU.
+
+    Returns:
+      str: The hex digest naming the artifact.
+    """
+    sources = [
+        os.path.join(os.path.dirname(__file__), name) for name in ARCHITECTURE_SOURCES
+    ]
+    return file_digest(
+        list(model.model_path) + sources,
+        tf.__version__,
+        CHANNELS,
+        NUM_CLASSES,
+        model.compact,
+        model.precision,
+        model.ensemble,
+        model.dim,
+        model.fold,
+        model.xla,
+        model.buckets,
+    )
+
+
+def save_artifact(
+    module: tf.Module, function: tf.types.experimental.PolymorphicFunction, path: str
+) -> None:
+    """
+    Saves the traced functions of a keras backend Model as a SavedModel.
+
+    The concrete functions traced for each length bucket are saved as they
+    are, so loading the artifact neither rebuilds the networks nor traces.
+    Concurrent writers each save to a temporary directory and the first to
+    finish wins.
+
+    Args:
+      module (tf.Module): The TFLiteModel the functions run.
+      function (tf.types.experimental.PolymorphicFunction): The bucket function, with one concrete function per bucket.
+      path (str): The artifact directory.
+    """
+    archive = tf.Module()
+    archive.module = module
+    archive.logits = function
+    archive.batch = module.batch
+    tmp = f"{path}.{os.getpid()}.tmp"
+    tf.saved_model.save(archive, tmp)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_artifact(path: str) -> Any:
+    """
+    Loads an artifact written by save_artifact.
+
+    Args:
+      path (str): The artifact directory.
+
+    Returns:
+      Any: The restored object, with the bucket function as `logits` and the generic TFLiteModel.batch as `batch`.
+    """
+    return tf.saved_model.load(path)
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from config import (
+    PREDICTION_CACHE_BYTES,
+    PREDICTION_CACHE_PATH,
+    PREDICTION_CACHE_QUANTUM,
+)
+
+
+def file_digest(paths: Iterable[str], *settings: Any) -> str:
+    """
+    Hashes the content of model files together with the settings the logits depend on.
+
+    Args:
+      paths (Iterable[str]): The model files.
+      *settings (Any): Other values the logits depend on, e.g. the backend and precision.
+
+    Returns:
+      str: The hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+
+class PredictionCache(object):
+    """
+    A bounded LRU cache of window logits, optionally persisted to disk.
+
+    Keys hash the window quantized to `quantum` together with the model
+    version, a file_digest of the weights, so identical windows of a
+    reprocessed or re-uploaded video skip the model. A saved cache is only
+    reloaded by the same model version: after the weights change it starts
+    empty.
+
+    Attributes:
+      max_bytes (int): The memory budget of the cached logits and keys; the least recently used entries are evicted past it.
+      path (Optional[str]): The .npz file the cache is saved to and loaded from, None to keep it in memory.
+      quantum (float): The step landmarks are rounded to before hashing.
+      version (Optional[str]): The model version, set by open.
+      entries (OrderedDict[bytes, np.ndarray]): The cached logits, least recently used first.
+      size (int): The bytes used by the entries.
+      stats (Dict[str, int]): The hits, misses and evictions so far.
+      lock (threading.Lock): Guards the entries, so worker threads can share the cache.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = PREDICTION_CACHE_BYTES,
+        path: Optional[str] = PREDICTION_CACHE_PATH,
+        quantum: float = PREDICTION_CACHE_QUANTUM,
+    ) -> None:
+        """
+        Initializes the PredictionCache object.
+
+        Args:
+          max_bytes (int, optional): The memory budget. Defaults to PREDICTION_CACHE_BYTES.
+          path (Optional[str], optional): The .npz file to persist to. Defaults to PREDICTION_CACHE_PATH.
+          quantum (float, optional): The quantization step of the keys. Defaults to PREDICTION_CACHE_QUANTUM.
+        """
+        self.max_bytes = max_bytes
+        self.path = path
+        self.quantum = quantum
+        self.version = None
+        self.entries = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+    def open(self, version: str) -> None:
+        """
+        Binds the cache to a model version and loads the saved entries of that version.
+
+        Args:
+          version (str): The model version, see file_digest.
+        """
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.size = 0
+            self.version = version
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with np.load(self.path) as saved:
+            if str(saved["version"]) != version:
+                print("[INFO] Discarded the prediction cache of other weights")
+                return
+            for key, logits in zip(saved["keys"], saved["logits"]):
+                self.put(key.tobytes(), logits)
+        print(f"[INFO] Loaded {len(self.entries)} cached predictions")
+
+    def save(self) -> None:
+        """
+        Writes the entries to the cache file, replacing it atomically.
+        """
+        if self.path is None or self.version is None:
+            return
+        with self.lock:
+            keys = np.array(
+                [np.frombuffer(k, dtype=np.uint8) for k in self.entries]
+            ).reshape(len(self.entries), -1)
+            logits = np.array(list(self.entries.values()), dtype=np.float32)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, version=self.version, keys=keys, logits=logits)
+        os.replace(tmp, self.path)
+
+    def key(self, window: np.ndarray) -> bytes:
+        """
+        Hashes a window of landmarks with the model version.
+
+        Args:
+          window (np.ndarray): The unpadded window of shape (T, rows, 3).
+
+        Returns:
+          bytes: The 16-byte key.
+        """
+        quantized = np.round(window * (1 / self.quantum))
+        quantized = np.where(np.isnan(quantized), np.iinfo(np.int32).min, quantized)
+        digest = hashlib.blake2b(str(self.version).encode(), digest_size=16)
+        digest.update(np.array(window.shape, dtype=np.int64).tobytes())
+        digest.update(quantized.astype(np.int32).tobytes())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Returns the cached logits of a key, marking them recently used.
+
+        Args:
+          key (bytes): The key, see key.
+
+        Returns:
+          Optional[np.ndarray]: The (NUM_CLASSES,) logits, or None on a miss.
+        """
+        with self.lock:
+            logits = self.entries.get(key)
+            if logits is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return logits
+
+    def put(self, key: bytes, logits: np.ndarray) -> None:
+        """
+        Caches the logits of a key, evicting the least recently used entries past the budget.
+
+        Args:
+          key (bytes): The key, see key.
+          logits (np.ndarray): The (NUM_CLASSES,) logits.
+        """
+        logits = np.array(logits, dtype=np.float32)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.nbytes + len(key)
+            self.entries[key] = logits
+            self.size += logits.nbytes + len(key)
+            while self.size > self.max_bytes and self.entries:
+                evicted, old = self.entries.popitem(last=False)
+                self.size -= old.nbytes + len(evicted)
+                self.stats["evictions"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the cache counters.
+
+        Returns:
+          Dict[str, Any]: The hits, misses, evictions, hit rate, entries and bytes used.
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / lookups if lookups else None,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
@@ -0,0 +1,141 @@
+import time
+import numpy as np
+from typing import Any, Dict
+from config import CASCADE_MIN_MARGIN, CASCADE_MIN_PROBABILITY
+from models.cache import file_digest
+from models.outputs import softmax, top_k
+from models.predictor import Predictor
+
+
+class CascadeModel(Predictor):
+    """
+    A sign classifier that only runs a larger model on the windows a smaller one is unsure about.
+
+    Every batch runs through the small model. A window is escalated when its
+    top-1 probability is below min_probability or the margin between its two
+    most probable labels is below min_margin; the escalated windows run
+    through the large model, whose logits replace the small model's.
+
+    Attributes:
+      small (Predictor): The model every window runs through.
+      large (Predictor): The model unsure windows are escalated to, e.g. a 384-dim Model or an ensemble.
+      min_probability (float): The top-1 probability below which a window is escalated.
+      min_margin (float): The top-1 minus top-2 probability below which a window is escalated.
+      cascade_stats (Dict[str, float]): The windows seen and escalated so far and the seconds spent in each model.
+
+    """
+
+    def __init__(
+        self,
+        small: Predictor,
+        large: Predictor,
+        min_probability: float = CASCADE_MIN_PROBABILITY,
+        min_margin: float = CASCADE_MIN_MARGIN,
+    ) -> None:
+        """
+        Initializes the CascadeModel object.
+
+        Args:
+          small (Predictor): The model every window runs through.
+          large (Predictor): The model unsure windows are escalated to. It must take the landmark layout of the small model.
+          min_probability (float, optional): The top-1 probability below which a window is escalated. Defaults to CASCADE_MIN_PROBABILITY.
+          min_margin (float, optional): The top-1 minus top-2 probability below which a window is escalated. Defaults to CASCADE_MIN_MARGIN.
+
+        Raises:
+          ValueError: If the models take different landmark layouts.
+
+        """
+        if small.rows != large.rows:
+            raise ValueError(
+                f"The models take {small.rows} and {large.rows} rows per frame"
+            )
+        super().__init__(compact=small.compact, buckets=small.buckets)
+        self.small = small
+        self.large = large
+        self.min_probability = min_probability
+        self.min_margin = min_margin
+        self.cascade_stats = {
+            "windows": 0,
+            "escalated": 0,
+            "small_seconds": 0.0,
+            "large_seconds": 0.0,
+        }
+
+    def __load__(self) -> None:
+        """
+        Loads both models.
+        """
+        for model in (self.small, self.large):
+            if not model.loaded:
+                model.__load__()
+        self.loaded = True
+
+    def version(self) -> str:
+        return file_digest(
+            [],
+            self.small.version(),
+            self.large.version(),
+            self.min_probability,
+            self.min_margin,
+        )
+
+    def escalate(self, logits: np.ndarray) -> np.ndarray:
+        """
+        Selects the windows the small model is unsure about.
+
+        Args:
+          logits (np.ndarray): The small model logits of shape (N, NUM_CLASSES).
+
+        Returns:
+          np.ndarray: The (N,) boolean mask of the windows to escalate.
+
+        """
+        _, probs = top_k(softmax(logits), 2)
+        return (probs[:, 0] < self.min_probability) | (
+            probs[:, 0] - probs[:, 1] < self.min_margin
+        )
+
+    def invoke(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        stats = self.cascade_stats
+        start = time.perf_counter()
+        logits = np.array(self.small.invoke(inputs, lengths))
+        escalate = self.escalate(logits)
+        stats["small_seconds"] += time.perf_counter() - start
+        if escalate.any():
+            start = time.perf_counter()
+            logits[escalate] = self.large.invoke(
+                np.ascontiguousarray(inputs[escalate]), lengths[escalate]
+            )
+            stats["large_seconds"] += time.perf_counter() - start
+        stats["windows"] += len(logits)
+        stats["escalated"] += int(escalate.sum())
+        return logits
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the inference metrics of the cascade.
+
+        Returns:
+          Dict[str, Any]: The per-bucket metrics of Predictor, which time both models, the share of windows the small model answered alone, the time spent per window in each model and the metrics of each model.
+
+        """
+        metrics = super().metrics()
+        stats = self.cascade_stats
+        windows, escalated = stats["windows"], stats["escalated"]
+        metrics["cascade"] = {
+            "windows": windows,
+            "escalated": escalated,
+            "hit_rate": (windows - escalated) / windows if windows else None,
+            "escalation_rate": escalated / windows if windows else None,
+            "small_ms_per_window": (
+                stats["small_seconds"] / windows * 1e3 if windows else None
+            ),
+            "large_ms_per_window": (
+                stats["large_seconds"] / escalated * 1e3 if escalated else None
+            ),
+            "min_probability": self.min_probability,
+            "min_margin": self.min_margin,
+        }
+        metrics["small"] = self.small.metrics()
+        metrics["large"] = self.large.metrics()
+        return metrics
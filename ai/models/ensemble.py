@@ -0,0 +1,256 @@
+import numpy as np
+import tensorflow as tf
+from typing import Any, Dict, List, Optional, Tuple
+from config import PAD
+from models.graph import build_inference_model, parse_blocks
+
+# How Model combines several checkpoints: run each network in turn and
+# average the logits, run one network on the averaged weights, or run all
+# networks in one pass with a leading member axis.
+ENSEMBLE_MODES = ("sequential", "average", "fused")
+
+
+def average_models(models: List[tf.keras.Model]) -> tf.keras.Model:
+    """
+    Averages the weights of checkpoints of the same architecture into the first model.
+
+    Averaging suits checkpoints fine-tuned from a shared initialization; for
+    independently trained folds it can cost accuracy, which scripts.benchmark
+    ensemble reports.
+
+    Args:
+      models (List[tf.keras.Model]): The models, built by Model.get_model with their weights loaded.
+
+    Returns:
+      tf.keras.Model: The first model, holding the averaged weights.
+
+    Raises:
+      ValueError: If the models have different weight shapes.
+    """
+    weights = [m.get_weights() for m in models]
+    shapes = [[w.shape for w in ws] for ws in weights]
+    if any(s != shapes[0] for s in shapes):
+        raise ValueError("Only checkpoints of the same architecture can be averaged")
+    models[0].set_weights([np.mean(ws, axis=0) for ws in zip(*weights)])
+    return models[0]
+
+
+class _StackedDense(object):
+    """
+    The Dense layers of one role in every member, applied to a [members, ...] tensor.
+    """
+
+    def __init__(self, layers: List[tf.keras.layers.Dense]) -> None:
+        self.kernel: tf.Variable = tf.Variable(
+            np.stack([np.asarray(layer.kernel) for layer in layers]), trainable=False
+        )
+        self.bias: Optional[tf.Variable] = (
+            tf.Variable(
+                np.stack([np.asarray(layer.bias) for layer in layers]), trainable=False
+            )
+            if layers[0].use_bias
+            else None
+        )
+        self.activation = tf.keras.activations.get(layers[0].get_config()["activation"])
+
+    def __call__(self, x: tf.Tensor, shared: bool = False) -> tf.Tensor:
+        """
+        Applies every member's layer to its slice of x, or to all of x when shared.
+        """
+        # A batched matmul over flattened frames; einsum takes a far slower path.
+        members, units = self.kernel.shape[0], self.kernel.shape[-1]
+        shape = tf.shape(x)
+        if shared:
+            y = tf.matmul(tf.reshape(x, [1, -1, shape[-1]]), self.kernel)
+            shape = tf.concat([[members], shape[:-1], [units]], 0)
+        else:
+            y = tf.matmul(tf.reshape(x, [members, -1, shape[-1]]), self.kernel)
+            shape = tf.concat([shape[:-1], [units]], 0)
+        if self.bias is not None:
+            y = y + self.bias[:, None, :]
+        return self.activation(tf.reshape(y, shape))
+
+
+def _masked_mean(x: tf.Tensor, mask: tf.Tensor) -> tf.Tensor:
+    """
+    Averages a [members, windows, frames, channels] tensor over its unmasked frames.
+    """
+    mask = tf.cast(mask, x.dtype)[None, :, :, None]
+    return tf.reduce_sum(x * mask, axis=2) / tf.reduce_sum(mask, axis=2)
+
+
+class FusedEnsemble(tf.Module):
+    """
+    Runs the networks of an ensemble in one pass.
+
+    The weights of every member are stacked along a leading member axis, so
+    each layer runs once for the whole ensemble: Dense layers as one batched
+    matmul, attention with the members as an extra batch dimension and the
+    depthwise convolutions with the members side by side as channels.
+    Members must share the architecture. Their outputs are averaged like
+    TFLiteModel does.
+
+    Attributes:
+      members (List[tf.keras.Model]): The folded networks the weights come from.
+      blocks (List[Tuple[str, Dict[str, Any]]]): The stacked weights of each block, in parse_blocks order.
+      unrolled (bool): Whether to compute the depthwise convolutions as one multiply-add per kernel tap, see CausalDWConv1D.
+    """
+
+    def __init__(self, members: List[tf.keras.Model]) -> None:
+        """
+        Initializes the FusedEnsemble object.
+
+        Args:
+          members (List[tf.keras.Model]): The networks, built by Model.get_model or build_inference_model.
+
+        Raises:
+          ValueError: If the members do not share the architecture.
+        """
+        super().__init__()
+        self.members: List[tf.keras.Model] = [build_inference_model(m) for m in members]
+        parsed = [parse_blocks(m) for m in self.members]
+        if len({tuple(kind for kind, _ in blocks) for blocks in parsed}) != 1:
+            raise ValueError("Only networks of the same architecture can be fused")
+        self.blocks: List[Tuple[str, Dict[str, Any]]] = []
+        for blocks in zip(*parsed):
+            kind = blocks[0][0]
+            layers = [b[1] for b in blocks]
+            self.blocks.append((kind, getattr(self, "_stack_" + kind)(layers)))
+        self.unrolled: bool = False
+
+    def __call__(self, x: tf.Tensor) -> tf.Tensor:
+        """
+        Runs every member on a batch of preprocessed windows.
+
+        Args:
+          x (tf.Tensor): The [windows, frames, CHANNELS] Preprocess output.
+
+        Returns:
+          tf.Tensor: The [windows, NUM_CLASSES] logits averaged over the members.
+        """
+        mask = tf.reduce_any(tf.not_equal(x, PAD), axis=-1)
+        for kind, weights in self.blocks:
+            x = getattr(self, "_apply_" + kind)(x, mask, weights)
+        return tf.reduce_mean(x, axis=0)
+
+    def _stack_stem(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"dense": _StackedDense([layer["dense"] for layer in layers])}
+
+    def _apply_stem(
+        self, x: tf.Tensor, mask: tf.Tensor, weights: Dict[str, Any]
+    ) -> tf.Tensor:
+        # Every member reads the same features.
+        return weights["dense"](x, shared=True)
+
+    def _stack_conv(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        dwconv = [layer["dwconv"].dw_conv for layer in layers]
+        return {
+            "expand": _StackedDense([layer["expand"] for layer in layers]),
+            "dwconv": tf.Variable(
+                np.stack([np.asarray(c.kernel)[:, :, 0] for c in dwconv], axis=1),
+                trainable=False,
+            ),
+            "dwconv_bias": tf.Variable(
+                np.stack([np.asarray(c.bias) for c in dwconv]), trainable=False
+            ),
+            "dilation": dwconv[0].dilation_rate[0],
+            "eca": tf.Variable(
+                np.stack(
+                    [np.asarray(layer["eca"].conv.kernel)[:, 0, 0] for layer in layers]
+                ),
+                trainable=False,
+            ),
+            "project": _StackedDense([layer["project"] for layer in layers]),
+            "residual": layers[0]["residual"],
+        }
+
+    def _apply_conv(
+        self, x: tf.Tensor, mask: tf.Tensor, weights: Dict[str, Any]
+    ) -> tf.Tensor:
+        skip = x
+        x = weights["expand"](x)
+
+        kernel, dilation = weights["dwconv"], weights["dilation"]
+        taps = kernel.shape[0]
+        if self.unrolled:
+            # One multiply-add per tap, like CausalDWConv1D.unrolled.
+            length = tf.shape(x)[2]
+            x = tf.pad(x, [[0, 0], [0, 0], [dilation * (taps - 1), 0], [0, 0]])
+            y = x[:, :, :length] * kernel[0][:, None, None, :]
+            for i in range(1, taps):
+                y += (
+                    x[:, :, i * dilation : i * dilation + length]
+                    * kernel[i][:, None, None, :]
+                )
+            x = y + weights["dwconv_bias"][:, None, None, :]
+        else:
+            # One depthwise convolution with the members side by side as channels.
+            shape = tf.shape(x)
+            x = tf.reshape(tf.transpose(x, [1, 2, 0, 3]), [shape[1], shape[2], -1])
+            x = tf.pad(x, [[0, 0], [dilation * (taps - 1), 0], [0, 0]])
+            x = tf.nn.depthwise_conv2d(
+                x[:, None],
+                tf.reshape(kernel, [1, taps, -1, 1]),
+                strides=[1, 1, 1, 1],
+                padding="VALID",
+                dilations=[1, dilation],
+            )[:, 0]
+            x = tf.reshape(x, [shape[1], shape[2], shape[0], shape[3]])
+            x = tf.transpose(x, [2, 0, 1, 3])
+            x = x + weights["dwconv_bias"][:, None, None, :]
+
+        # ECA: a "same" convolution across the channels of the pooled frames.
+        eca = weights["eca"]
+        size = eca.shape[1]
+        pooled = _masked_mean(x, mask)
+        channels = pooled.shape[-1]
+        pooled = tf.pad(pooled, [[0, 0], [0, 0], [(size - 1) // 2, size // 2]])
+        gate = sum(
+            pooled[:, :, i : i + channels] * eca[:, i][:, None, None]
+            for i in range(size)
+        )
+        x = x * tf.sigmoid(gate)[:, :, None, :]
+
+        x = weights["project"](x)
+        return x + skip if weights["residual"] else x
+
+    def _stack_transformer(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        attn = [layer["attn"] for layer in layers]
+        return {
+            "qkv": _StackedDense([a.qkv for a in attn]),
+            "proj": _StackedDense([a.proj for a in attn]),
+            "num_heads": attn[0].num_heads,
+            "scale": attn[0].scale,
+            "expand": _StackedDense([layer["expand"] for layer in layers]),
+            "project": _StackedDense([layer["project"] for layer in layers]),
+        }
+
+    def _apply_transformer(
+        self, x: tf.Tensor, mask: tf.Tensor, weights: Dict[str, Any]
+    ) -> tf.Tensor:
+        inputs = x
+        qkv = weights["qkv"](x)
+        heads = weights["num_heads"]
+        dim = qkv.shape[-1] // 3
+        shape = tf.shape(qkv)
+        qkv = tf.reshape(qkv, [shape[0], shape[1], shape[2], heads, 3 * dim // heads])
+        qkv = tf.transpose(qkv, [0, 1, 3, 2, 4])
+        q, k, v = tf.split(qkv, 3, axis=-1)
+        attn = tf.matmul(q, k, transpose_b=True) * weights["scale"]
+        # The same masking as tf.keras.layers.Softmax.
+        attn += (1.0 - tf.cast(mask, attn.dtype))[None, :, None, None, :] * -1e9
+        x = tf.matmul(tf.nn.softmax(attn, axis=-1), v)
+        x = tf.reshape(tf.transpose(x, [0, 1, 3, 2, 4]), tf.shape(inputs))
+        x = inputs + weights["proj"](x)
+        return x + weights["project"](weights["expand"](x))
+
+    def _stack_head(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "top": _StackedDense([layer["top"] for layer in layers]),
+            "classifier": _StackedDense([layer["classifier"] for layer in layers]),
+        }
+
+    def _apply_head(
+        self, x: tf.Tensor, mask: tf.Tensor, weights: Dict[str, Any]
+    ) -> tf.Tensor:
+        return weights["classifier"](_masked_mean(weights["top"](x), mask))
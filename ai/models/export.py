@@ -0,0 +1,236 @@
+import re
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from typing import Iterator, List, Optional
+from tensorflow.python.framework.convert_to_constants import (
+    convert_variables_to_constants_v2,
+)
+from config import COMPACT_LANDMARKS, NUMBER_OF_FRAMES, ROWS_PER_FRAME
+from models.model import Model
+from models.windowing import sliding_windows
+
+try:
+    import tf2onnx
+except ImportError:  # Only the onnx export needs it.
+    tf2onnx = None
+
+# Post-training quantization modes: "dynamic" stores int8 weights, "int8"
+# also runs the network on int8 activations calibrated on landmark windows.
+QUANTIZATION_MODES = ("dynamic", "int8")
+ONNX_OPSET = 17
+
+
+def inference_function(model: Model) -> tf.types.experimental.ConcreteFunction:
+    """
+    Traces the batched ensemble, Preprocess included, with its weights frozen.
+
+    The landmark row count is fixed in the signature, so an exported file
+    cannot be fed the other layout by mistake.
+
+    Args:
+      model (Model): The keras backend model to export. It is loaded if needed.
+
+    Returns:
+      tf.types.experimental.ConcreteFunction: A function of (inputs [windows, frames, rows, 3], lengths [windows]) returning the [windows, NUM_CLASSES] logits.
+
+    Raises:
+      ValueError: If the model does not use the keras backend.
+    """
+    if model.backend != "keras":
+        raise ValueError("Only keras backend models can be exported")
+    if not model.loaded:
+        model.__load__()
+    module = model.tflite_keras_model
+
+    @tf.function(
+        input_signature=[
+            tf.TensorSpec(
+                shape=[None, None, model.rows, 3], dtype=tf.float32, name="inputs"
+            ),
+            tf.TensorSpec(shape=[None], dtype=tf.int32, name="lengths"),
+        ]
+    )
+    def batch(inputs: tf.Tensor, lengths: tf.Tensor) -> tf.Tensor:
+        return module.batch(inputs, lengths)["outputs"]
+
+    # Keras variables are folded into constants first: the TFLite converter
+    # cannot read them through the resource ops Keras 3 traces.
+    return convert_variables_to_constants_v2(batch.get_concrete_function())
+
+
+def tflite_converter(model: Model) -> tf.lite.TFLiteConverter:
+    """
+    Returns a TFLite converter for the batched ensemble of a model.
+
+    Args:
+      model (Model): The model to convert.
+
+    Returns:
+      tf.lite.TFLiteConverter: The converter, restricted to builtin ops.
+    """
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [inference_function(model)]
+    )
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    return converter
+
+
+def load_landmarks(path: str) -> np.ndarray:
+    """
+    Loads recorded landmarks in the full ROWS_PER_FRAME layout.
+
+    Args:
+      path (str): A .csv file with x, y and z columns and ROWS_PER_FRAME rows per frame, like tests/test_keypoints.csv, or a .npy file of shape (T, ROWS_PER_FRAME, 3), like a saved LandmarkBuffer.view().
+
+    Returns:
+      np.ndarray: The (T, ROWS_PER_FRAME, 3) float32 landmarks.
+    """
+    if path.endswith(".npy"):
+        data = np.load(path)
+    else:
+        data = pd.read_csv(path, usecols=["x", "y", "z"])[["x", "y", "z"]].to_numpy()
+    return data.reshape(-1, ROWS_PER_FRAME, 3).astype(np.float32)
+
+
+def calibration_windows(
+    paths: List[str],
+    compact: bool = False,
+    window: int = NUMBER_OF_FRAMES,
+    stride: int = NUMBER_OF_FRAMES // 2,
+) -> List[np.ndarray]:
+    """
+    Cuts recorded landmarks into the windows the model sees when serving.
+
+    Args:
+      paths (List[str]): The recordings, see load_landmarks.
+      compact (bool, optional): Whether to project onto COMPACT_LANDMARKS. Defaults to False.
+      window (int, optional): The number of frames per window. Defaults to NUMBER_OF_FRAMES.
+      stride (int, optional): The number of frames between window starts. Defaults to NUMBER_OF_FRAMES // 2.
+
+    Returns:
+      List[np.ndarray]: The windows, each of shape (T_i, rows, 3). Recordings shorter than a window give one shorter window.
+    """
+    windows = []
+    for path in paths:
+        data = load_landmarks(path)
+        if compact:
+            data = data[:, COMPACT_LANDMARKS]
+        windows.extend(sliding_windows(data, window, stride))
+    return windows
+
+
+def quantized_flatbuffer(
+    model: Model, mode: str, windows: Optional[List[np.ndarray]] = None
+) -> bytes:
+    """
+    Converts the batched ensemble of a model with post-training quantization.
+
+    In "int8" mode the network runs on int8 activations while Preprocess
+    stays in float: its inputs hold NaN for missing landmarks and PAD past
+    each length, which no int8 range can represent.
+
+    Args:
+      model (Model): The keras backend model to convert.
+      mode (str): One of QUANTIZATION_MODES.
+      windows (Optional[List[np.ndarray]], optional): The calibration windows, required in "int8" mode.
+
+    Returns:
+      bytes: The quantized flatbuffer.
+
+    Raises:
+      ValueError: If the mode is unknown or "int8" has no calibration windows.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown mode {mode}, expected one of {QUANTIZATION_MODES}")
+    converter = tflite_converter(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "dynamic":
+        return converter.convert()
+    if not windows:
+        raise ValueError("int8 quantization needs calibration windows")
+
+    def dataset() -> Iterator[List[np.ndarray]]:
+        for w in windows:
+            yield [
+                np.ascontiguousarray(w[None], dtype=np.float32),
+                np.array([len(w)], dtype=np.int32),
+            ]
+
+    # Converted tensor names carry the layer name with a trace suffix,
+    # e.g. "StatefulPartitionedCall/preprocess_1/Sum".
+    preprocess = re.compile(
+        rf"/{re.escape(model.tflite_keras_model.prep_inputs.name)}(_\d+)?/"
+    )
+    float_model = tf.lite.Interpreter(model_content=tflite_converter(model).convert())
+    converter.representative_dataset = dataset
+    debugger = tf.lite.experimental.QuantizationDebugger(
+        converter=converter,
+        debug_dataset=dataset,
+        debug_options=tf.lite.experimental.QuantizationDebugOptions(
+            denylisted_nodes=[
+                t["name"]
+                for t in float_model.get_tensor_details()
+                if preprocess.search(t["name"])
+            ]
+        ),
+    )
+    return debugger.get_nondebug_quantized_model()
+
+
+def export_tflite(
+    model: Model,
+    path: str,
+    quantize: Optional[str] = None,
+    windows: Optional[List[np.ndarray]] = None,
+) -> int:
+    """
+    Exports the batched ensemble of a model to a .tflite file.
+
+    Args:
+      model (Model): The model to export.
+      path (str): The file to write.
+      quantize (Optional[str], optional): One of QUANTIZATION_MODES. Defaults to None, a float model.
+      windows (Optional[List[np.ndarray]], optional): The calibration windows of "int8" quantization.
+
+    Returns:
+      int: The size of the file in bytes.
+    """
+    if quantize is None:
+        flatbuffer = tflite_converter(model).convert()
+    else:
+        flatbuffer = quantized_flatbuffer(model, quantize, windows)
+    with open(path, "wb") as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+
+def export_onnx(model: Model, path: str, opset: int = ONNX_OPSET) -> int:
+    """
+    Exports the batched ensemble of a model to an .onnx file.
+
+    The graph is the inference form of get_model: dropout is inactive and
+    LateDropout's branch is resolved by freezing its step counter.
+
+    Args:
+      model (Model): The model to export.
+      path (str): The file to write.
+      opset (int, optional): The ONNX opset. Defaults to ONNX_OPSET.
+
+    Returns:
+      int: The size of the file in bytes.
+
+    Raises:
+      ImportError: If tf2onnx is not installed.
+    """
+    if tf2onnx is None:
+        raise ImportError("The onnx export needs tf2onnx installed")
+    function = inference_function(model)
+    proto, _ = tf2onnx.convert.from_graph_def(
+        function.graph.as_graph_def(),
+        input_names=[t.name for t in function.inputs],
+        output_names=[t.name for t in function.outputs],
+        opset=opset,
+        output_path=path,
+    )
+    return proto.ByteSize()
@@ -0,0 +1,268 @@
+import numpy as np
+import tensorflow as tf
+from typing import Any, Dict, List, Optional, Tuple
+from models.layers import (
+    ECA,
+    CausalDWConv1D,
+    LateDropout,
+    MultiHeadSelfAttention,
+    PaddingMask,
+)
+
+# Layers that only matter for training or carry no weights of their own.
+_SKIPPED_LAYERS = (
+    tf.keras.layers.InputLayer,
+    tf.keras.layers.Dropout,
+    tf.keras.layers.GlobalAveragePooling1D,
+    LateDropout,
+    PaddingMask,
+)
+
+
+def parse_blocks(model: tf.keras.Model) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Splits a model built by Model.get_model or build_inference_model into its blocks.
+
+    The layers are walked in the order Keras tracks them, which follows the
+    order get_model creates them in. Folded models have no BatchNormalization
+    layers, and their "bn" roles are None.
+
+    Args:
+      model (tf.keras.Model): The model.
+
+    Returns:
+      List[Tuple[str, Dict[str, Any]]]: The kind of each block ("stem", "conv", "transformer" or "head") and its layers by role.
+
+    Raises:
+      ValueError: If the model does not have the get_model layout.
+    """
+    layers = [layer for layer in model.layers if not isinstance(layer, _SKIPPED_LAYERS)]
+    blocks = []
+    i = 0
+
+    def take(*types: type) -> List[tf.keras.layers.Layer]:
+        nonlocal i
+        taken = layers[i : i + len(types)]
+        if len(taken) != len(types) or not all(
+            isinstance(layer, t) for layer, t in zip(taken, types)
+        ):
+            raise ValueError(
+                f"Unexpected layers at {i}: {[layer.name for layer in taken]}"
+            )
+        i += len(types)
+        return taken
+
+    def next_is(*types: type) -> bool:
+        return len(layers) >= i + len(types) and all(
+            isinstance(layer, t) for layer, t in zip(layers[i:], types)
+        )
+
+    Dense = tf.keras.layers.Dense
+    BatchNorm = tf.keras.layers.BatchNormalization
+    Add = tf.keras.layers.Add
+
+    def optional(layer_type: type) -> Optional[tf.keras.layers.Layer]:
+        return take(layer_type)[0] if next_is(layer_type) else None
+
+    (dense,) = take(Dense)
+    blocks.append(("stem", {"dense": dense, "bn": optional(BatchNorm)}))
+    while i < len(layers):
+        if next_is(Dense, CausalDWConv1D):
+            expand, dwconv = take(Dense, CausalDWConv1D)
+            bn = optional(BatchNorm)
+            eca, project = take(ECA, Dense)
+            residual = next_is(Add)
+            if residual:
+                take(Add)
+            blocks.append(
+                (
+                    "conv",
+                    {
+                        "expand": expand,
+                        "dwconv": dwconv,
+                        "bn": bn,
+                        "eca": eca,
+                        "project": project,
+                        "residual": residual,
+                    },
+                )
+            )
+        elif next_is(BatchNorm, MultiHeadSelfAttention) or next_is(
+            MultiHeadSelfAttention
+        ):
+            attn_bn = optional(BatchNorm)
+            attn, _ = take(MultiHeadSelfAttention, Add)
+            ffn_bn = optional(BatchNorm)
+            expand, project, _ = take(Dense, Dense, Add)
+            blocks.append(
+                (
+                    "transformer",
+                    {
+                        "attn_bn": attn_bn,
+                        "attn": attn,
+                        "ffn_bn": ffn_bn,
+                        "expand": expand,
+                        "project": project,
+                    },
+                )
+            )
+        else:
+            top, classifier = take(Dense, Dense)
+            blocks.append(("head", {"top": top, "classifier": classifier}))
+    if blocks[-1][0] != "head":
+        raise ValueError("The model has no classifier head")
+    return blocks
+
+
+def batch_norm_affine(
+    layer: Optional[tf.keras.layers.BatchNormalization],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the inference-time scale and shift of a BatchNormalization layer.
+
+    Args:
+      layer (Optional[tf.keras.layers.BatchNormalization]): The layer, or None for an identity.
+
+    Returns:
+      Tuple[np.ndarray, np.ndarray]: The float32 scale and shift, so that the layer computes x * scale + shift.
+    """
+    if layer is None:
+        return np.float32(1.0), np.float32(0.0)
+    scale = np.asarray(layer.gamma) / np.sqrt(
+        np.asarray(layer.moving_variance) + layer.epsilon
+    )
+    shift = np.asarray(layer.beta) - np.asarray(layer.moving_mean) * scale
+    return scale.astype(np.float32), shift.astype(np.float32)
+
+
+def _fold_before(
+    dense: tf.keras.layers.Dense, bn: tf.keras.layers.BatchNormalization
+) -> List[np.ndarray]:
+    """
+    Returns the weights of a Dense layer applied to the output of a BatchNormalization.
+    """
+    kernel = np.asarray(dense.kernel)
+    bias = np.asarray(dense.bias) if dense.use_bias else 0.0
+    scale, shift = batch_norm_affine(bn)
+    return [kernel * scale[:, None], shift @ kernel + bias]
+
+
+def _folded_dense(
+    dense: tf.keras.layers.Dense, weights: List[np.ndarray]
+) -> tf.keras.layers.Dense:
+    return tf.keras.layers.Dense(
+        weights[0].shape[1],
+        activation=dense.get_config()["activation"],
+        use_bias=True,
+        name=dense.name,
+    )
+
+
+def _stem(x: tf.Tensor, mask: tf.Tensor, layers: Dict[str, Any]) -> tf.Tensor:
+    dense = layers["dense"]
+    if layers["bn"] is None:
+        return dense(x)
+    scale, shift = batch_norm_affine(layers["bn"])
+    weights = [np.asarray(dense.kernel) * scale, shift]
+    if dense.use_bias:
+        weights[1] = weights[1] + np.asarray(dense.bias) * scale
+    stem = _folded_dense(dense, weights)
+    x = stem(x)
+    stem.set_weights(weights)
+    return x
+
+
+def _conv(x: tf.Tensor, mask: tf.Tensor, layers: Dict[str, Any]) -> tf.Tensor:
+    skip = x
+    x = layers["expand"](x)
+    dwconv = layers["dwconv"]
+    if layers["bn"] is None:
+        x = dwconv(x)
+    else:
+        scale, shift = batch_norm_affine(layers["bn"])
+        weights = [np.asarray(dwconv.dw_conv.kernel) * scale[None, :, None], shift]
+        if dwconv.dw_conv.use_bias:
+            weights[1] = weights[1] + np.asarray(dwconv.dw_conv.bias) * scale
+        folded = CausalDWConv1D(
+            dwconv.dw_conv.kernel_size[0],
+            dilation_rate=dwconv.dw_conv.dilation_rate[0],
+            use_bias=True,
+            name=dwconv.name,
+        )
+        x = folded(x)
+        folded.dw_conv.set_weights(weights)
+    x = layers["eca"](x, mask=mask)
+    x = layers["project"](x)
+    if layers["residual"]:
+        x = tf.keras.layers.Add()([x, skip])
+    return x
+
+
+def _transformer(x: tf.Tensor, mask: tf.Tensor, layers: Dict[str, Any]) -> tf.Tensor:
+    inputs = x
+    attn = layers["attn"]
+    if layers["attn_bn"] is not None:
+        qkv = _fold_before(attn.qkv, layers["attn_bn"])
+        folded = MultiHeadSelfAttention(
+            dim=attn.dim, num_heads=attn.num_heads, use_bias=True, name=attn.name
+        )
+        x = folded(x, mask=mask)
+        folded.qkv.set_weights(qkv)
+        folded.proj.set_weights(attn.proj.get_weights())
+    else:
+        x = attn(x, mask=mask)
+    x = tf.keras.layers.Add()([inputs, x])
+    attn_out = x
+
+    expand = layers["expand"]
+    if layers["ffn_bn"] is not None:
+        weights = _fold_before(expand, layers["ffn_bn"])
+        folded = _folded_dense(expand, weights)
+        x = folded(x)
+        folded.set_weights(weights)
+    else:
+        x = expand(x)
+    x = layers["project"](x)
+    return tf.keras.layers.Add()([attn_out, x])
+
+
+def _head(x: tf.Tensor, mask: tf.Tensor, layers: Dict[str, Any]) -> tf.Tensor:
+    x = layers["top"](x)
+    x = tf.keras.layers.GlobalAveragePooling1D()(x, mask=mask)
+    return layers["classifier"](x)
+
+
+_BLOCK_BUILDERS = {
+    "stem": _stem,
+    "conv": _conv,
+    "transformer": _transformer,
+    "head": _head,
+}
+
+
+def build_inference_model(model: tf.keras.Model) -> tf.keras.Model:
+    """
+    Builds the lean inference form of a trained model.
+
+    Every BatchNormalization is folded into its neighbouring layer: the stem
+    Dense and the depthwise convolutions before it, the attention qkv and the
+    feed-forward expansion after it. Dropout and LateDropout, whose tf.cond
+    only selects between training and inference, are left out. The other
+    layers are shared with the trained model, so no weights are copied.
+
+    Args:
+      model (tf.keras.Model): A model built by Model.get_model, with its weights loaded.
+
+    Returns:
+      tf.keras.Model: A model with the same input and outputs.
+
+    Raises:
+      ValueError: If the model does not have the get_model layout.
+    """
+    blocks = parse_blocks(model)
+    inp = tf.keras.Input(model.input_shape[1:])
+    mask = PaddingMask()(inp)
+    x = inp
+    for kind, layers in blocks:
+        x = _BLOCK_BUILDERS[kind](x, mask, layers)
+    return tf.keras.Model(inp, x, name=model.name + "_inference")
@@ -0,0 +1,444 @@
+import tensorflow as tf
+import numpy as np
+from typing import Optional, Callable
+from models.helpers import tf_nan_mean, tf_nan_std
+from config import (
+    MAX_LEN,
+    POINT_LANDMARKS,
+    CENTER_LANDMARKS,
+    COMPACT_LANDMARKS,
+    PAD,
+)
+
+
+class Preprocess(tf.keras.layers.Layer):
+    def __init__(
+        self,
+        max_len: int = MAX_LEN,
+        point_landmarks: list[int] = POINT_LANDMARKS,
+        center_landmarks: list[int] = CENTER_LANDMARKS,
+        **kwargs,
+    ) -> None:
+        """
+        Preprocess layer for input data.
+
+        Args:
+          max_len (int, optional): Maximum length of the input sequence. Defaults to MAX_LEN.
+          point_landmarks (list[int], optional): List of indices of the point landmarks. Defaults to POINT_LANDMARKS.
+          center_landmarks (list[int], optional): List of indices used to center the landmarks. Defaults to CENTER_LANDMARKS.
+          **kwargs: Additional keyword arguments.
+
+        Returns:
+          None
+        """
+        super().__init__(**kwargs)
+        self.max_len = max_len
+        self.point_landmarks = point_landmarks
+        self.center_landmarks = center_landmarks
+
+    def call(self, inputs: tf.Tensor, lengths: Optional[tf.Tensor] = None) -> tf.Tensor:
+        """
+        Perform preprocessing on the input data.
+
+        Args:
+          inputs (tf.Tensor): Input tensor.
+          lengths (Optional[tf.Tensor], optional): The number of valid frames of each sequence in a padded batch. Frames past it are ignored by the normalization and set to PAD, which the models mask out. Defaults to None.
+
+        Returns:
+          tf.Tensor: Preprocessed tensor.
+        """
+        if inputs.shape.rank == 3:
+            x = inputs[None, ...]
+        else:
+            x = inputs
+
+        if lengths is not None:
+            mask = tf.sequence_mask(lengths, tf.shape(x)[1])
+            # expand_dims rather than None indexing: TFLite has no builtin
+            # strided slice with new axes for bool tensors.
+            x = tf.where(
+                tf.expand_dims(tf.expand_dims(mask, -1), -1),
+                x,
+                tf.constant(np.nan, x.dtype),
+            )
+
+        mean = tf_nan_mean(
+            tf.gather(x, self.center_landmarks, axis=2), axis=[1, 2], keepdims=True
+        )
+        mean = tf.where(tf.math.is_nan(mean), tf.constant(0.5, x.dtype), mean)
+        x = tf.gather(x, self.point_landmarks, axis=2)  # N,T,P,C
+        std = tf_nan_std(x, center=mean, axis=[1, 2], keepdims=True)
+
+        x = (x - mean) / std
+
+        if self.max_len is not None:
+            x = x[:, : self.max_len]
+        length = tf.shape(x)[1]
+        x = x[..., :2]
+
+        # Padding then slicing back to length gives zeros for sequences too
+        # short to difference, without a tf.cond in the graph.
+        dx = tf.pad(x[:, 1:] - x[:, :-1], [[0, 0], [0, 1], [0, 0], [0, 0]])
+        dx = dx[:, :length]
+
+        dx2 = tf.pad(x[:, 2:] - x[:, :-2], [[0, 0], [0, 2], [0, 0], [0, 0]])
+        dx2 = dx2[:, :length]
+
+        x = tf.concat(
+            [
+                tf.reshape(x, (-1, length, 2 * len(self.point_landmarks))),
+                tf.reshape(dx, (-1, length, 2 * len(self.point_landmarks))),
+                tf.reshape(dx2, (-1, length, 2 * len(self.point_landmarks))),
+            ],
+            axis=-1,
+        )
+
+        x = tf.where(tf.math.is_nan(x), tf.constant(0.0, x.dtype), x)
+
+        if lengths is not None:
+            x = tf.where(
+                tf.expand_dims(mask[:, :length], -1), x, tf.constant(PAD, x.dtype)
+            )
+
+        return x
+
+
+class CompactPreprocess(Preprocess):
+    """
+    Preprocess layer for inputs in the compact layout.
+
+    The compact layout keeps only COMPACT_LANDMARKS per frame, so the point and
+    center landmark indices are remapped onto it. The output is identical to
+    Preprocess applied to the full ROWS_PER_FRAME layout.
+    """
+
+    def __init__(
+        self,
+        max_len: int = MAX_LEN,
+        compact_landmarks: list[int] = COMPACT_LANDMARKS,
+        **kwargs,
+    ) -> None:
+        super().__init__(
+            max_len=max_len,
+            point_landmarks=[compact_landmarks.index(i) for i in POINT_LANDMARKS],
+            center_landmarks=[compact_landmarks.index(i) for i in CENTER_LANDMARKS],
+            **kwargs,
+        )
+
+
+class PaddingMask(tf.keras.layers.Layer):
+    """
+    Computes the padding mask of a batch of preprocessed sequences.
+
+    A frame is padding when all of its features equal PAD, which is how
+    Preprocess fills the frames past each sequence length.
+    """
+
+    def call(self, inputs: tf.Tensor) -> tf.Tensor:
+        return tf.reduce_any(tf.not_equal(inputs, PAD), axis=-1)
+
+
+class ECA(tf.keras.layers.Layer):
+    """
+    Efficient Channel Attention (ECA) layer.
+
+    Args:
+      kernel_size (int): Size of the kernel for the convolutional layer.
+
+    Attributes:
+      supports_masking (bool): Whether the layer supports masking.
+      kernel_size (int): Size of the kernel for the convolutional layer.
+      conv (tf.keras.layers.Conv1D): Convolutional layer.
+
+    """
+
+    def __init__(self, kernel_size: int = 5, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.supports_masking: bool = True
+        self.kernel_size: int = kernel_size
+        self.conv: tf.keras.layers.Conv1D = tf.keras.layers.Conv1D(
+            filters=1,
+            kernel_size=kernel_size,
+            strides=1,
+            padding="same",
+            use_bias=False,
+        )
+
+    def call(self, inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
+        pool = tf.keras.layers.GlobalAveragePooling1D(dtype=self.dtype_policy)
+        nn: tf.Tensor = pool(inputs, mask=mask)
+        nn: tf.Tensor = tf.expand_dims(nn, axis=-1)
+        nn: tf.Tensor = self.conv(nn)
+        nn: tf.Tensor = tf.squeeze(nn, axis=-1)
+        nn: tf.Tensor = tf.nn.sigmoid(nn)
+        nn: tf.Tensor = nn[:, None, :]
+        return inputs * nn
+
+
+class LateDropout(tf.keras.layers.Layer):
+    """A custom Keras layer that applies dropout after a certain number of training steps.
+
+    Args:
+      rate (float): The dropout rate.
+      noise_shape (Optional[tf.TensorShape], optional): The shape of the binary dropout mask that will be multiplied with the input. Defaults to None.
+      start_step (int, optional): The training step at which dropout will start being applied. Defaults to 0.
+
+    Attributes:
+      supports_masking (bool): Whether the layer supports masking.
+      rate (float): The dropout rate.
+      start_step (int): The training step at which dropout will start being applied.
+      dropout (tf.keras.layers.Dropout): The dropout layer.
+
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        noise_shape: Optional[tf.TensorShape] = None,
+        start_step: int = 0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.supports_masking: bool = True
+        self.rate: float = rate
+        self.start_step: int = start_step
+        self.dropout: tf.keras.layers.Dropout = tf.keras.layers.Dropout(
+            rate, noise_shape=noise_shape
+        )
+
+    def build(self, input_shape):
+        super().build(input_shape)
+        agg: tf.VariableAggregation = tf.VariableAggregation.ONLY_FIRST_REPLICA
+        self._train_counter: tf.Variable = tf.Variable(
+            0, dtype=tf.int64, aggregation=agg, trainable=False
+        )
+
+    def call(self, inputs: tf.Tensor, training: bool = False) -> tf.Tensor:
+        """Applies dropout to the input tensor after a certain number of training steps.
+
+        Args:
+          inputs (tf.Tensor): The input tensor.
+          training (bool, optional): Whether the model is in training mode. Defaults to False.
+
+        Returns:
+          tf.Tensor: The output tensor after applying dropout.
+
+        """
+        x: tf.Tensor = tf.cond(
+            self._train_counter < self.start_step,
+            lambda: inputs,
+            lambda: self.dropout(inputs, training=training),
+        )
+        if training:
+            self._train_counter.assign_add(1)
+        return x
+
+
+class CausalDWConv1D(tf.keras.layers.Layer):
+    """
+    CausalDWConv1D is a custom Keras layer that performs causal depthwise convolution on 1D input tensors.
+
+    Args:
+      kernel_size (int): The size of the convolutional kernel.
+      dilation_rate (int): The dilation rate for the convolution.
+      use_bias (bool): Whether to include a bias term in the convolution.
+      depthwise_initializer (str): The initializer for the depthwise convolution kernel.
+      name (str): The name of the layer.
+
+    Attributes:
+      causal_pad (tf.keras.layers.ZeroPadding1D): The zero-padding layer for causal padding.
+      dw_conv (tf.keras.layers.DepthwiseConv1D): The depthwise convolution layer.
+      unrolled (bool): Whether to compute the convolution as one multiply-add per kernel tap instead of with dw_conv.
+      supports_masking (bool): Whether the layer supports masking.
+    """
+
+    def __init__(
+        self,
+        kernel_size: int = 17,
+        dilation_rate: int = 1,
+        use_bias: bool = False,
+        depthwise_initializer: str = "glorot_uniform",
+        name: str = "",
+        **kwargs,
+    ):
+        super().__init__(name=name, **kwargs)
+        self.causal_pad: tf.keras.layers.ZeroPadding1D = tf.keras.layers.ZeroPadding1D(
+            (dilation_rate * (kernel_size - 1), 0), name=name + "_pad"
+        )
+        self.dw_conv: tf.keras.layers.DepthwiseConv1D = tf.keras.layers.DepthwiseConv1D(
+            kernel_size,
+            strides=1,
+            dilation_rate=dilation_rate,
+            padding="valid",
+            use_bias=use_bias,
+            depthwise_initializer=depthwise_initializer,
+            name=name + "_dwconv",
+        )
+        self.unrolled: bool = False
+        self.supports_masking: bool = True
+
+    def call(self, inputs: tf.Tensor) -> tf.Tensor:
+        x: tf.Tensor = self.causal_pad(inputs)
+        if not self.unrolled:
+            return self.dw_conv(x)
+
+        # XLA fuses the taps into one loop, while its CPU depthwise
+        # convolution is about ten times slower than the graph kernel.
+        kernel: tf.Tensor = tf.cast(self.dw_conv.kernel, x.dtype)[:, :, 0]
+        taps: int = self.dw_conv.kernel.shape[0]
+        dilation: int = self.dw_conv.dilation_rate[0]
+        length: tf.Tensor = tf.shape(x)[1] - dilation * (taps - 1)
+        y: tf.Tensor = x[:, :length] * kernel[0]
+        for i in range(1, taps):
+            y += x[:, i * dilation : i * dilation + length] * kernel[i]
+        if self.dw_conv.use_bias:
+            y += tf.cast(self.dw_conv.bias, x.dtype)
+        return y
+
+
+def Conv1DBlock(
+    channel_size: int,
+    kernel_size: int,
+    dilation_rate: int = 1,
+    drop_rate: float = 0.0,
+    expand_ratio: int = 2,
+    se_ratio: float = 0.25,
+    activation: str = "swish",
+    name: str = None,
+) -> Callable[[tf.Tensor, Optional[tf.Tensor]], tf.Tensor]:
+    """
+    Creates an efficient Conv1D block.
+
+    Args:
+      channel_size (int): The number of output channels.
+      kernel_size (int): The size of the convolutional kernel.
+      dilation_rate (int, optional): The dilation rate for the convolutional layer. Defaults to 1.
+      drop_rate (float, optional): The dropout rate. Defaults to 0.0.
+      expand_ratio (int, optional): The expansion ratio for the dense layer. Defaults to 2.
+      se_ratio (float, optional): The squeeze-and-excitation ratio. Defaults to 0.25.
+      activation (str, optional): The activation function to use. Defaults to "swish".
+      name (str, optional): The name of the block. If not provided, a unique name will be generated.
+
+    Returns:
+      Callable[[tf.Tensor, Optional[tf.Tensor]], tf.Tensor]: A function that applies the Conv1D block to the input tensor and its optional padding mask.
+    """
+    if name is None:
+        name = str(tf.keras.backend.get_uid("mbblock"))
+
+    # Expansion phase
+    def apply(inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
+        channels_in: int = tf.keras.backend.int_shape(inputs)[-1]
+        channels_expand: int = channels_in * expand_ratio
+
+        skip: tf.Tensor = inputs
+
+        x: tf.Tensor = tf.keras.layers.Dense(
+            channels_expand,
+            use_bias=True,
+            activation=activation,
+            name=name + "_expand_conv",
+        )(inputs)
+
+        # Depthwise Convolution
+        x: tf.Tensor = CausalDWConv1D(
+            kernel_size,
+            dilation_rate=dilation_rate,
+            use_bias=False,
+            name=name + "_dwconv",
+        )(x)
+
+        x: tf.Tensor = tf.keras.layers.BatchNormalization(
+            momentum=0.95, name=name + "_bn"
+        )(x)
+
+        x: tf.Tensor = ECA()(x, mask=mask)
+
+        x: tf.Tensor = tf.keras.layers.Dense(
+            channel_size, use_bias=True, name=name + "_project_conv"
+        )(x)
+
+        if drop_rate > 0:
+            x: tf.Tensor = tf.keras.layers.Dropout(
+                drop_rate, noise_shape=(None, 1, 1), name=name + "_drop"
+            )(x)
+
+        if channels_in == channel_size:
+            x: tf.Tensor = tf.keras.layers.add([x, skip], name=name + "_add")
+        return x
+
+    return apply
+
+
+class MultiHeadSelfAttention(tf.keras.layers.Layer):
+    """
+    Multi-Head Self Attention layer.
+
+    Args:
+      dim (int): The dimensionality of the output space (default: 256).
+      num_heads (int): The number of attention heads (default: 4).
+      dropout (float): The dropout rate (default: 0).
+      use_bias (bool): Whether the qkv layer has a bias, as after folding a BatchNormalization into it (default: False).
+
+    Attributes:
+      dim (int): The dimensionality of the output space.
+      scale (float): The scaling factor for the attention scores.
+      num_heads (int): The number of attention heads.
+      qkv (tf.keras.layers.Dense): The dense layer for computing the query, key, and value.
+      drop1 (tf.keras.layers.Dropout): The dropout layer.
+      proj (tf.keras.layers.Dense): The dense layer for projecting the attended values.
+      supports_masking (bool): Whether the layer supports masking.
+
+    Methods:
+      call(inputs, mask=None): Performs the forward pass of the layer.
+
+    Returns:
+      tf.Tensor: The output tensor.
+    """
+
+    def __init__(
+        self,
+        dim: int = 256,
+        num_heads: int = 4,
+        dropout: float = 0,
+        use_bias: bool = False,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.dim: int = dim
+        self.scale: float = self.dim**-0.5
+        self.num_heads: int = num_heads
+        self.qkv: tf.keras.layers.Dense = tf.keras.layers.Dense(
+            3 * dim, use_bias=use_bias
+        )
+        self.drop1: tf.keras.layers.Dropout = tf.keras.layers.Dropout(dropout)
+        self.proj: tf.keras.layers.Dense = tf.keras.layers.Dense(dim, use_bias=False)
+        self.supports_masking: bool = True
+
+    def call(self, inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
+        qkv: tf.Tensor = self.qkv(inputs)
+        # Layers created here follow this layer's dtype policy, so a mixed
+        # precision model does not cast back to float32 in between.
+        policy = self.dtype_policy
+        qkv: tf.Tensor = tf.keras.layers.Permute((2, 1, 3), dtype=policy)(
+            tf.keras.layers.Reshape(
+                (-1, self.num_heads, self.dim * 3 // self.num_heads), dtype=policy
+            )(qkv)
+        )
+        q, k, v = tf.split(qkv, [self.dim // self.num_heads] * 3, axis=-1)
+
+        attn: tf.Tensor = tf.matmul(q, k, transpose_b=True) * self.scale
+
+        if mask is not None:
+            mask = tf.expand_dims(tf.expand_dims(mask, 1), 1)
+
+        attn: tf.Tensor = tf.keras.layers.Softmax(axis=-1, dtype=policy)(
+            attn, mask=mask
+        )
+        attn: tf.Tensor = self.drop1(attn)
+
+        x: tf.Tensor = attn @ v
+        x: tf.Tensor = tf.keras.layers.Reshape((-1, self.dim), dtype=policy)(
+            tf.keras.layers.Permute((2, 1, 3), dtype=policy)(x)
+        )
+        x: tf.Tensor = self.proj(x)
+        return x
@@ -1,404 +1,70 @@
+import os
 import tensorflow as tf
 import numpy as np
 import pandas as pd
-from typing import List, Optional, Callable, Dict
-from models.helpers import tf_nan_mean, tf_nan_std
+from typing import Any, List, Optional, Callable, Dict, Sequence, Union
+from models.artifacts import artifact_key, load_artifact, save_artifact
+from models.cache import file_digest
+from models.ensemble import ENSEMBLE_MODES, FusedEnsemble, average_models
+from models.graph import build_inference_model
+from models.layers import (
+    Preprocess,
+    CompactPreprocess,
+    PaddingMask,
+    LateDropout,
+    CausalDWConv1D,
+    Conv1DBlock,
+    MultiHeadSelfAttention,
+)
+from models.predictor import Predictor
+from models.runtime import OnnxModel
+from models.windowing import bucket_length
 from config import (
     MAX_LEN,
-    POINT_LANDMARKS,
+    NUMBER_OF_FRAMES,
+    INFERENCE_BATCH_SIZE,
+    FOLD_BATCH_NORM,
+    INFERENCE_THREADS,
+    LENGTH_BUCKETS,
+    INFERENCE_XLA,
+    INFERENCE_PRECISION,
+    ENSEMBLE_MODE,
+    MODEL_DIM,
     CHANNELS,
     FILE_PATH,
     NUM_CLASSES,
-    ROWS_PER_FRAME,
-    s2p_map,
-    p2s_map,
 )
 
+# Runtimes Model can serve from.
+BACKENDS = ("keras", "tflite", "onnx")
+# Keras dtype policy of each compute precision and the CPU flags, any of
+# which makes it native.
+PRECISIONS = {
+    "float32": ("float32", ()),
+    "bfloat16": ("mixed_bfloat16", ("avx512_bf16", "amx_bf16")),
+    "float16": ("mixed_float16", ("avx512_fp16",)),
+}
 
-class Converter(object):
-    """
-    A class that converts between sign names and sign indices.
 
-    Methods:
-      encoder(x: str) -> int: Encodes a sign name to its corresponding index.
-      decoder(x: int) -> str: Decodes a sign index to its corresponding name.
+def cpu_supports(precision: str) -> bool:
     """
-
-    def encoder(self, x: str) -> int:
-        """
-        Encodes a sign name to its corresponding index.
-
-        Args:
-          x (str): The sign name.
-
-        Returns:
-          int: The corresponding sign index.
-        """
-        return s2p_map.get(x.lower())
-
-    def decoder(self, x: int) -> str:
-        """
-        Decodes a sign index to its corresponding name.
-
-        Args:
-          x (int): The sign index.
-
-        Returns:
-          str: The corresponding sign name.
-        """
-        return p2s_map.get(x)
-
-
-class Preprocess(tf.keras.layers.Layer):
-    def __init__(
-        self,
-        max_len: int = MAX_LEN,
-        point_landmarks: list[int] = POINT_LANDMARKS,
-        **kwargs,
-    ) -> None:
-        """
-        Preprocess layer for input data.
-
-        Args:
-          max_len (int, optional): Maximum length of the input sequence. Defaults to MAX_LEN.
-          point_landmarks (list[int], optional): List of indices of the point landmarks. Defaults to POINT_LANDMARKS.
-          **kwargs: Additional keyword arguments.
-
-        Returns:
-          None
-        """
-        super().__init__(**kwargs)
-        self.max_len = max_len
-        self.point_landmarks = point_landmarks
-
-    def call(self, inputs: tf.Tensor) -> tf.Tensor:
-        """
-        Perform preprocessing on the input data.
-
-        Args:
-          inputs (tf.Tensor): Input tensor.
-
-        Returns:
-          tf.Tensor: Preprocessed tensor.
-        """
-        if tf.rank(inputs) == 3:
-            x = inputs[None, ...]
-        else:
-            x = inputs
-
-        mean = tf_nan_mean(tf.gather(x, [17], axis=2), axis=[1, 2], keepdims=True)
-        mean = tf.where(tf.math.is_nan(mean), tf.constant(0.5, x.dtype), mean)
-        x = tf.gather(x, self.point_landmarks, axis=2)  # N,T,P,C
-        std = tf_nan_std(x, center=mean, axis=[1, 2], keepdims=True)
-
-        x = (x - mean) / std
-
-        if self.max_len is not None:
-            x = x[:, : self.max_len]
-        length = tf.shape(x)[1]
-        x = x[..., :2]
-
-        dx = tf.cond(
-            tf.shape(x)[1] > 1,
-            lambda: tf.pad(x[:, 1:] - x[:, :-1], [[0, 0], [0, 1], [0, 0], [0, 0]]),
-            lambda: tf.zeros_like(x),
-        )
-
-        dx2 = tf.cond(
-            tf.shape(x)[1] > 2,
-            lambda: tf.pad(x[:, 2:] - x[:, :-2], [[0, 0], [0, 2], [0, 0], [0, 0]]),
-            lambda: tf.zeros_like(x),
-        )
-
-        x = tf.concat(
-            [
-                tf.reshape(x, (-1, length, 2 * len(self.point_landmarks))),
-                tf.reshape(dx, (-1, length, 2 * len(self.point_landmarks))),
-                tf.reshape(dx2, (-1, length, 2 * len(self.point_landmarks))),
-            ],
-            axis=-1,
-        )
-
-        x = tf.where(tf.math.is_nan(x), tf.constant(0.0, x.dtype), x)
-
-        return x
-
-
-class ECA(tf.keras.layers.Layer):
-    """
-    Efficient Channel Attention (ECA) layer.
+    Checks whether the CPU runs a compute precision natively.
 
     Args:
-      kernel_size (int): Size of the kernel for the convolutional layer.
-
-    Attributes:
-      supports_masking (bool): Whether the layer supports masking.
-      kernel_size (int): Size of the kernel for the convolutional layer.
-      conv (tf.keras.layers.Conv1D): Convolutional layer.
-
-    """
-
-    def __init__(self, kernel_size: int = 5, **kwargs) -> None:
-        super().__init__(**kwargs)
-        self.supports_masking: bool = True
-        self.kernel_size: int = kernel_size
-        self.conv: tf.keras.layers.Conv1D = tf.keras.layers.Conv1D(
-            filters=1,
-            kernel_size=kernel_size,
-            strides=1,
-            padding="same",
-            use_bias=False,
-        )
-
-    def call(self, inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
-        nn: tf.Tensor = tf.keras.layers.GlobalAveragePooling1D()(inputs, mask=mask)
-        nn: tf.Tensor = tf.expand_dims(nn, axis=-1)
-        nn: tf.Tensor = self.conv(nn)
-        nn: tf.Tensor = tf.squeeze(nn, axis=-1)
-        nn: tf.Tensor = tf.nn.sigmoid(nn)
-        nn: tf.Tensor = nn[:, None, :]
-        return inputs * nn
-
-
-class LateDropout(tf.keras.layers.Layer):
-    """A custom Keras layer that applies dropout after a certain number of training steps.
-
-    Args:
-      rate (float): The dropout rate.
-      noise_shape (Optional[tf.TensorShape], optional): The shape of the binary dropout mask that will be multiplied with the input. Defaults to None.
-      start_step (int, optional): The training step at which dropout will start being applied. Defaults to 0.
-
-    Attributes:
-      supports_masking (bool): Whether the layer supports masking.
-      rate (float): The dropout rate.
-      start_step (int): The training step at which dropout will start being applied.
-      dropout (tf.keras.layers.Dropout): The dropout layer.
-
-    """
-
-    def __init__(
-        self,
-        rate: float,
-        noise_shape: Optional[tf.TensorShape] = None,
-        start_step: int = 0,
-        **kwargs,
-    ):
-        super().__init__(**kwargs)
-        self.supports_masking: bool = True
-        self.rate: float = rate
-        self.start_step: int = start_step
-        self.dropout: tf.keras.layers.Dropout = tf.keras.layers.Dropout(
-            rate, noise_shape=noise_shape
-        )
-
-    def build(self, input_shape):
-        super().build(input_shape)
-        agg: tf.VariableAggregation = tf.VariableAggregation.ONLY_FIRST_REPLICA
-        self._train_counter: tf.Variable = tf.Variable(
-            0, dtype=tf.int64, aggregation=agg, trainable=False
-        )
-
-    def call(self, inputs: tf.Tensor, training: bool = False) -> tf.Tensor:
-        """Applies dropout to the input tensor after a certain number of training steps.
-
-        Args:
-          inputs (tf.Tensor): The input tensor.
-          training (bool, optional): Whether the model is in training mode. Defaults to False.
-
-        Returns:
-          tf.Tensor: The output tensor after applying dropout.
-
-        """
-        x: tf.Tensor = tf.cond(
-            self._train_counter < self.start_step,
-            lambda: inputs,
-            lambda: self.dropout(inputs, training=training),
-        )
-        if training:
-            self._train_counter.assign_add(1)
-        return x
-
-
-class CausalDWConv1D(tf.keras.layers.Layer):
-    """
-    CausalDWConv1D is a custom Keras layer that performs causal depthwise convolution on 1D input tensors.
-
-    Args:
-      kernel_size (int): The size of the convolutional kernel.
-      dilation_rate (int): The dilation rate for the convolution.
-      use_bias (bool): Whether to include a bias term in the convolution.
-      depthwise_initializer (str): The initializer for the depthwise convolution kernel.
-      name (str): The name of the layer.
-
-    Attributes:
-      causal_pad (tf.keras.layers.ZeroPadding1D): The zero-padding layer for causal padding.
-      dw_conv (tf.keras.layers.DepthwiseConv1D): The depthwise convolution layer.
-      supports_masking (bool): Whether the layer supports masking.
-    """
-
-    def __init__(
-        self,
-        kernel_size: int = 17,
-        dilation_rate: int = 1,
-        use_bias: bool = False,
-        depthwise_initializer: str = "glorot_uniform",
-        name: str = "",
-        **kwargs,
-    ):
-        super().__init__(name=name, **kwargs)
-        self.causal_pad: tf.keras.layers.ZeroPadding1D = tf.keras.layers.ZeroPadding1D(
-            (dilation_rate * (kernel_size - 1), 0), name=name + "_pad"
-        )
-        self.dw_conv: tf.keras.layers.DepthwiseConv1D = tf.keras.layers.DepthwiseConv1D(
-            kernel_size,
-            strides=1,
-            dilation_rate=dilation_rate,
-            padding="valid",
-            use_bias=use_bias,
-            depthwise_initializer=depthwise_initializer,
-            name=name + "_dwconv",
-        )
-        self.supports_masking: bool = True
-
-    def call(self, inputs: tf.Tensor) -> tf.Tensor:
-        x: tf.Tensor = self.causal_pad(inputs)
-        x: tf.Tensor = self.dw_conv(x)
-        return x
-
-
-def Conv1DBlock(
-    channel_size: int,
-    kernel_size: int,
-    dilation_rate: int = 1,
-    drop_rate: float = 0.0,
-    expand_ratio: int = 2,
-    se_ratio: float = 0.25,
-    activation: str = "swish",
-    name: str = None,
-) -> Callable[[tf.Tensor], tf.Tensor]:
-    """
-    Creates an efficient Conv1D block.
-
-    Args:
-      channel_size (int): The number of output channels.
-      kernel_size (int): The size of the convolutional kernel.
-      dilation_rate (int, optional): The dilation rate for the convolutional layer. Defaults to 1.
-      drop_rate (float, optional): The dropout rate. Defaults to 0.0.
-      expand_ratio (int, optional): The expansion ratio for the dense layer. Defaults to 2.
-      se_ratio (float, optional): The squeeze-and-excitation ratio. Defaults to 0.25.
-      activation (str, optional): The activation function to use. Defaults to "swish".
-      name (str, optional): The name of the block. If not provided, a unique name will be generated.
+      precision (str): One of PRECISIONS.
 
     Returns:
-      Callable[[tf.Tensor], tf.Tensor]: A function that applies the Conv1D block to the input tensor.
+      bool: True for "float32", and for 16-bit precisions when /proc/cpuinfo lists one of their flags.
     """
-    if name is None:
-        name = str(tf.keras.backend.get_uid("mbblock"))
-
-    # Expansion phase
-    def apply(inputs: tf.Tensor) -> tf.Tensor:
-        channels_in: int = tf.keras.backend.int_shape(inputs)[-1]
-        channels_expand: int = channels_in * expand_ratio
-
-        skip: tf.Tensor = inputs
-
-        x: tf.Tensor = tf.keras.layers.Dense(
-            channels_expand,
-            use_bias=True,
-            activation=activation,
-            name=name + "_expand_conv",
-        )(inputs)
-
-        # Depthwise Convolution
-        x: tf.Tensor = CausalDWConv1D(
-            kernel_size,
-            dilation_rate=dilation_rate,
-            use_bias=False,
-            name=name + "_dwconv",
-        )(x)
-
-        x: tf.Tensor = tf.keras.layers.BatchNormalization(
-            momentum=0.95, name=name + "_bn"
-        )(x)
-
-        x: tf.Tensor = ECA()(x)
-
-        x: tf.Tensor = tf.keras.layers.Dense(
-            channel_size, use_bias=True, name=name + "_project_conv"
-        )(x)
-
-        if drop_rate > 0:
-            x: tf.Tensor = tf.keras.layers.Dropout(
-                drop_rate, noise_shape=(None, 1, 1), name=name + "_drop"
-            )(x)
-
-        if channels_in == channel_size:
-            x: tf.Tensor = tf.keras.layers.add([x, skip], name=name + "_add")
-        return x
-
-    return apply
-
-
-class MultiHeadSelfAttention(tf.keras.layers.Layer):
-    """
-    Multi-Head Self Attention layer.
-
-    Args:
-      dim (int): The dimensionality of the output space (default: 256).
-      num_heads (int): The number of attention heads (default: 4).
-      dropout (float): The dropout rate (default: 0).
-
-    Attributes:
-      dim (int): The dimensionality of the output space.
-      scale (float): The scaling factor for the attention scores.
-      num_heads (int): The number of attention heads.
-      qkv (tf.keras.layers.Dense): The dense layer for computing the query, key, and value.
-      drop1 (tf.keras.layers.Dropout): The dropout layer.
-      proj (tf.keras.layers.Dense): The dense layer for projecting the attended values.
-      supports_masking (bool): Whether the layer supports masking.
-
-    Methods:
-      call(inputs, mask=None): Performs the forward pass of the layer.
-
-    Returns:
-      tf.Tensor: The output tensor.
-    """
-
-    def __init__(
-        self, dim: int = 256, num_heads: int = 4, dropout: float = 0, **kwargs
-    ):
-        super().__init__(**kwargs)
-        self.dim: int = dim
-        self.scale: float = self.dim**-0.5
-        self.num_heads: int = num_heads
-        self.qkv: tf.keras.layers.Dense = tf.keras.layers.Dense(3 * dim, use_bias=False)
-        self.drop1: tf.keras.layers.Dropout = tf.keras.layers.Dropout(dropout)
-        self.proj: tf.keras.layers.Dense = tf.keras.layers.Dense(dim, use_bias=False)
-        self.supports_masking: bool = True
-
-    def call(self, inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
-        qkv: tf.Tensor = self.qkv(inputs)
-        qkv: tf.Tensor = tf.keras.layers.Permute((2, 1, 3))(
-            tf.keras.layers.Reshape(
-                (-1, self.num_heads, self.dim * 3 // self.num_heads)
-            )(qkv)
-        )
-        q, k, v = tf.split(qkv, [self.dim // self.num_heads] * 3, axis=-1)
-
-        attn: tf.Tensor = tf.matmul(q, k, transpose_b=True) * self.scale
-
-        if mask is not None:
-            mask = mask[:, None, None, :]
-
-        attn: tf.Tensor = tf.keras.layers.Softmax(axis=-1)(attn, mask=mask)
-        attn: tf.Tensor = self.drop1(attn)
-
-        x: tf.Tensor = attn @ v
-        x: tf.Tensor = tf.keras.layers.Reshape((-1, self.dim))(
-            tf.keras.layers.Permute((2, 1, 3))(x)
-        )
-        x: tf.Tensor = self.proj(x)
-        return x
+    flags = PRECISIONS[precision][1]
+    if not flags:
+        return True
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpuinfo = set(f.read().split())
+    except OSError:
+        return False
+    return any(flag in cpuinfo for flag in flags)
 
 
 class TFLiteModel(tf.Module):
@@ -407,6 +73,7 @@ class TFLiteModel(tf.Module):
 
     Args:
       islr_models (List[tf.keras.Model]): List of tf.keras.Model objects representing individual models.
+      compact (bool): Whether inputs use the compact COMPACT_LANDMARKS layout.
 
     Attributes:
       prep_inputs (Preprocess): Preprocess object for input data preprocessing.
@@ -414,14 +81,16 @@ class TFLiteModel(tf.Module):
 
     """
 
-    def __init__(self, islr_models: List[tf.keras.Model]) -> None:
+    def __init__(
+        self, islr_models: List[tf.keras.Model], compact: bool = False
+    ) -> None:
         super(TFLiteModel, self).__init__()
-        self.prep_inputs: Preprocess = Preprocess()
+        self.prep_inputs: Preprocess = CompactPreprocess() if compact else Preprocess()
         self.islr_models: List[tf.keras.Model] = islr_models
 
     @tf.function(
         input_signature=[
-            tf.TensorSpec(shape=[None, 543, 3], dtype=tf.float32, name="inputs")
+            tf.TensorSpec(shape=[None, None, 3], dtype=tf.float32, name="inputs")
         ]
     )
     def __call__(self, inputs: tf.Tensor) -> Dict[str, tf.Tensor]:
@@ -429,7 +98,7 @@ class TFLiteModel(tf.Module):
         Perform inference on the input data.
 
         Args:
-          inputs (tf.Tensor): Input tensor of shape [batch_size, 543, 3].
+          inputs (tf.Tensor): Input tensor of shape [batch_size, 543, 3], or [batch_size, len(COMPACT_LANDMARKS), 3] in compact mode.
 
         Returns:
           Dict[str, tf.Tensor]: Dictionary containing the output tensor.
@@ -440,42 +109,156 @@ class TFLiteModel(tf.Module):
         outputs: tf.Tensor = tf.keras.layers.Average()(outputs)[0]
         return {"outputs": outputs}
 
+    @tf.function(
+        input_signature=[
+            tf.TensorSpec(shape=[None, None, None, 3], dtype=tf.float32, name="inputs"),
+            tf.TensorSpec(shape=[None], dtype=tf.int32, name="lengths"),
+        ]
+    )
+    def batch(self, inputs: tf.Tensor, lengths: tf.Tensor) -> Dict[str, tf.Tensor]:
+        """
+        Perform inference on a padded batch of windows.
+
+        Args:
+          inputs (tf.Tensor): Input tensor of shape [windows, frames, rows, 3].
+          lengths (tf.Tensor): The number of valid frames of each window.
+
+        Returns:
+          Dict[str, tf.Tensor]: Dictionary containing the [windows, NUM_CLASSES] output tensor.
+
+        """
+        return {"outputs": self.logits(inputs, lengths)}
+
+    def logits(self, inputs: tf.Tensor, lengths: tf.Tensor) -> tf.Tensor:
+        """
+        The untraced body of batch, for tracing at other input signatures.
+
+        Args:
+          inputs (tf.Tensor): Input tensor of shape [windows, frames, rows, 3].
+          lengths (tf.Tensor): The number of valid frames of each window.
+
+        Returns:
+          tf.Tensor: The [windows, NUM_CLASSES] output tensor.
+
+        """
+        x: tf.Tensor = self.prep_inputs(
+            tf.cast(inputs, dtype=tf.float32), lengths=lengths
+        )
+        outputs: List[tf.Tensor] = [model(x) for model in self.islr_models]
+        return tf.keras.layers.Average()(outputs)
+
 
-class Model(object):
+class Model(Predictor):
     """
     A class representing a machine learning model.
 
+    Windowing, batching and decoding are inherited from Predictor.
+
     Attributes:
-      model_path (str): The path to the model file.
-      tflite_keras_model (TFLiteModel): The TFLite model.
+      model_path (List[str]): The path to the model file, or the checkpoints of a keras backend ensemble.
+      compact (bool): Whether the model takes the compact COMPACT_LANDMARKS layout.
+      rows (int): The number of landmark rows per input frame.
+      backend (str): The runtime the model is served from, one of BACKENDS.
+      num_threads (int): The number of threads of the tflite interpreter or the onnx session.
+      fallback_path (Optional[str]): The tflite file loaded when model_path cannot be.
+      fold (bool): Whether keras backend models are served in their build_inference_model form.
+      bucket_functions (Dict[int, tf.types.experimental.ConcreteFunction]): One traced batch function per length bucket, with the keras backend.
+      xla (bool): Whether the bucket functions are XLA-compiled.
+      precision (str): The compute precision of the keras backend networks, one of PRECISIONS.
+      ensemble (str): How a keras backend ensemble runs, one of ENSEMBLE_MODES.
+      dim (int): The width of the keras backend networks, see get_model.
+      compiled_dir (Optional[str]): The directory of the compiled keras backend artifacts, None to always build the networks.
+      networks (List[tf.keras.Model]): The networks of the keras backend, after averaging and folding.
+      tflite_keras_model (TFLiteModel): The TFLite model, with the keras backend, or the restored artifact when loaded from compiled_dir.
+      interpreter (tf.lite.Interpreter): The TFLite interpreter, with the tflite backend.
+      tflite_path (str): The .tflite file the interpreter loaded, model_path or fallback_path.
+      session (OnnxModel): The ONNX Runtime model, with the onnx backend.
       loaded (bool): Indicates whether the model is loaded or not.
 
     Methods:
-      __init__(model_path: str) -> None: Initializes the Model object.
+      __init__(model_path: Union[str, List[str]], compact: bool = False, backend: str = "keras", num_threads: int = INFERENCE_THREADS,
+               fallback_path: Optional[str] = None, fold: bool = FOLD_BATCH_NORM,
+               buckets: Sequence[int] = LENGTH_BUCKETS, xla: bool = INFERENCE_XLA,
+               precision: str = INFERENCE_PRECISION, ensemble: str = ENSEMBLE_MODE,
+               dim: int = MODEL_DIM, compiled_dir: Optional[str] = None) -> None:
+        Initializes the Model object.
       __load__() -> None: Loads the model.
+      __build__() -> None: Builds the keras backend networks and loads their weights.
+      __warmup__() -> None: Traces and runs the batch function of every length bucket.
       TransformerBlock(dim: int = 256, num_heads: int = 4, expand: int = 4, attn_dropout: float = 0.2,
-               drop_rate: float = 0.2, activation: str = "swish") -> Callable[[tf.Tensor], tf.Tensor]:
+               drop_rate: float = 0.2, activation: str = "swish") -> Callable[[tf.Tensor, Optional[tf.Tensor]], tf.Tensor]:
         Returns a callable function representing a transformer block.
       get_model(max_len: int = MAX_LEN, dropout_step: int = 0, dim: int = 192) -> tf.keras.Model:
         Returns the machine learning model.
-      load_relevant_data_csv(data: pd.DataFrame, data_columns: list[str] = ["x", "y", "z"]) -> np.ndarray:
-        Loads relevant data from a CSV file.
-      predict(data: pd.DataFrame) -> tuple[str, float]:
-        Makes a prediction using the model.
+      invoke(inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        Runs one padded batch through the selected backend.
 
     """
 
-    def __init__(self, model_path: str) -> None:
+    def __init__(
+        self,
+        model_path: Union[str, List[str]],
+        compact: bool = False,
+        backend: str = "keras",
+        num_threads: int = INFERENCE_THREADS,
+        fallback_path: Optional[str] = None,
+        fold: bool = FOLD_BATCH_NORM,
+        buckets: Sequence[int] = LENGTH_BUCKETS,
+        xla: bool = INFERENCE_XLA,
+        precision: str = INFERENCE_PRECISION,
+        ensemble: str = ENSEMBLE_MODE,
+        dim: int = MODEL_DIM,
+        compiled_dir: Optional[str] = None,
+    ) -> None:
         """
         Initializes the Model object.
 
         Args:
-          model_path (str): The path to the model file.
+          model_path (Union[str, List[str]]): The path to the model file: .h5 weights for the keras backend, a scripts.export file otherwise. The keras backend also takes a list of checkpoints to ensemble.
+          compact (bool, optional): Whether inputs use the compact COMPACT_LANDMARKS layout. Defaults to False.
+          backend (str, optional): One of BACKENDS. Defaults to "keras".
+          num_threads (int, optional): The number of threads of the tflite interpreter or the onnx session. Defaults to INFERENCE_THREADS.
+          fallback_path (Optional[str], optional): A tflite file to load when model_path cannot be, e.g. the float model behind a quantized one. Defaults to None.
+          fold (bool, optional): Whether to fold the BatchNormalization layers and drop the dropout layers of keras backend models. Defaults to FOLD_BATCH_NORM.
+          buckets (Sequence[int], optional): The window lengths batches are padded up to. Defaults to LENGTH_BUCKETS.
+          xla (bool, optional): Whether to XLA-compile the bucket functions of the keras backend. Defaults to INFERENCE_XLA.
+          precision (str, optional): The compute precision of the keras backend networks, one of PRECISIONS. Defaults to INFERENCE_PRECISION.
+          ensemble (str, optional): How several keras backend checkpoints run, one of ENSEMBLE_MODES. Defaults to ENSEMBLE_MODE.
+          dim (int, optional): The width of the keras backend networks the weights were trained with. Defaults to MODEL_DIM.
+          compiled_dir (Optional[str], optional): Where to save the traced keras backend functions on the first load and restore them from on later ones, see models.artifacts. Defaults to None.
+
+        Raises:
+          ValueError: If the backend, the precision or the ensemble mode is unknown.
 
         """
-        self.model_path = [model_path]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision}, expected one of {tuple(PRECISIONS)}"
+            )
+        if ensemble not in ENSEMBLE_MODES:
+            raise ValueError(
+                f"Unknown ensemble mode {ensemble}, expected one of {ENSEMBLE_MODES}"
+            )
+        super().__init__(compact=compact, buckets=buckets)
+        self.model_path = (
+            [model_path] if isinstance(model_path, str) else list(model_path)
+        )
+        self.backend = backend
+        self.num_threads = num_threads
+        self.fallback_path = fallback_path
+        self.fold = fold
         self.tflite_keras_model = None
-        self.loaded = False
+        self.bucket_functions = {}
+        self.xla = xla
+        self.precision = precision
+        self.ensemble = ensemble
+        self.dim = dim
+        self.compiled_dir = compiled_dir
+        self.networks = []
+        self.interpreter = None
+        self.session = None
 
         print("[INFO] Model initialized...")
 
@@ -489,17 +272,212 @@ class Model(object):
         """
         print("[INFO] Loading model...")
         try:
-            models = [self.get_model() for _ in self.model_path]
-            for model, path in zip(models, self.model_path):
-                model.load_weights(path)
-
-            self.tflite_keras_model = TFLiteModel(islr_models=models)
+            if self.backend == "tflite":
+                try:
+                    self.__load_tflite__(self.model_path[0])
+                except ValueError as e:
+                    if self.fallback_path is None:
+                        raise
+                    print(f"[INFO] {e}, falling back to {self.fallback_path}")
+                    self.__load_tflite__(self.fallback_path)
+            elif self.backend == "onnx":
+                self.session = OnnxModel(
+                    self.model_path[0], self.compact, self.num_threads
+                )
+                self.session.__load__()
+            else:
+                if not cpu_supports(self.precision):
+                    print(
+                        f"[INFO] No native {self.precision} on this CPU, using float32"
+                    )
+                    self.precision = "float32"
+                artifact = None
+                if self.compiled_dir is not None:
+                    artifact = os.path.join(self.compiled_dir, artifact_key(self))
+                if artifact is not None and os.path.isdir(artifact):
+                    self.tflite_keras_model = load_artifact(artifact)
+                    # The restored polymorphic function is slow on the first
+                    # call at every batch size; its concrete functions are not.
+                    self.bucket_functions = {
+                        length: self.tflite_keras_model.logits.get_concrete_function(
+                            tf.TensorSpec([None, length, self.rows, 3], tf.float32),
+                            tf.TensorSpec([None], tf.int32),
+                        )
+                        for length in self.buckets
+                    }
+                    # Restored functions only run the graphs they were saved with.
+                    self.tracing_functions = ()
+                    print(f"[INFO] Restored the compiled model from {artifact}")
+                    self.__warmup__()
+                else:
+                    self.__build__()
+                    self.__warmup__()
+                    if artifact is not None:
+                        save_artifact(
+                            self.tflite_keras_model, self.tracing_functions[0], artifact
+                        )
+                        # Saving traces the functions again.
+                        self.warmup_traces = self.traces()
+                        print(f"[INFO] Saved the compiled model to {artifact}")
             self.loaded = True
             print("[INFO] Model loaded successfully!")
         except Exception as e:
             self.loaded = False
             raise Exception(f"Error loading model: {e}")
 
+    def __build__(self) -> None:
+        """
+        Builds the keras backend networks, loads their weights and wraps them in a TFLiteModel.
+        """
+        # Layers take the global dtype policy when they are created.
+        policy = tf.keras.mixed_precision.global_policy()
+        tf.keras.mixed_precision.set_global_policy(PRECISIONS[self.precision][0])
+        try:
+            models = [
+                self.get_model(max_len=None, dim=self.dim) for _ in self.model_path
+            ]
+            for model, path in zip(models, self.model_path):
+                model.load_weights(path)
+            if self.ensemble == "average" and len(models) > 1:
+                models = [average_models(models)]
+            if self.fold:
+                models = [build_inference_model(model) for model in models]
+        finally:
+            tf.keras.mixed_precision.set_global_policy(policy)
+
+        self.networks = models
+        if self.ensemble == "fused" and len(models) > 1:
+            models = [FusedEnsemble(models)]
+        self.tflite_keras_model = TFLiteModel(islr_models=models, compact=self.compact)
+
+    def __warmup__(self) -> None:
+        """
+        Traces the batch function of every length bucket and runs each once.
+
+        Batches padded to a bucket then reuse a traced function, and longer
+        ones the generic batch function, which is warmed up too. Neither
+        retraces afterwards.
+
+        With xla, the bucket functions are compiled for one window here and
+        for other batch sizes on first use, with the causal depthwise
+        convolutions unrolled into taps. If compilation fails, XLA is turned
+        off and the traced graph is warmed up instead.
+
+        Functions restored from a compiled artifact are only run, in the
+        bucket of a sliding window also at every power of two batch size up to
+        INFERENCE_BATCH_SIZE, the batches predict_windows sends.
+
+        """
+        module = self.tflite_keras_model
+        if self.networks:
+            for model in self.networks:
+                for layer in model.layers:
+                    if isinstance(layer, CausalDWConv1D):
+                        layer.unrolled = self.xla
+            for network in module.islr_models:
+                if isinstance(network, FusedEnsemble):
+                    network.unrolled = self.xla
+            function = tf.function(module.logits, jit_compile=self.xla)
+            self.bucket_functions = {
+                length: function.get_concrete_function(
+                    tf.TensorSpec([None, length, self.rows, 3], tf.float32),
+                    tf.TensorSpec([None], tf.int32),
+                )
+                for length in self.buckets
+            }
+            self.tracing_functions = (function, module.batch)
+        try:
+            for length in self.buckets + (1,):
+                self.invoke(
+                    np.zeros((1, length, self.rows, 3), dtype=np.float32),
+                    np.array([length], dtype=np.int32),
+                )
+        except tf.errors.OpError as e:
+            if not self.xla:
+                raise
+            self.__disable_xla__(e)
+            return
+        if not self.networks:
+            length = bucket_length(NUMBER_OF_FRAMES, self.buckets)
+            size = 2
+            while size <= INFERENCE_BATCH_SIZE:
+                self.invoke(
+                    np.zeros((size, length, self.rows, 3), dtype=np.float32),
+                    np.full(size, length, dtype=np.int32),
+                )
+                size *= 2
+        self.warmup_traces = self.traces()
+        if self.buckets:
+            print(f"[INFO] Warmed up {len(self.buckets)} length buckets")
+
+    def __disable_xla__(self, error: Exception) -> None:
+        """
+        Turns XLA off after a compilation error and warms up the traced graph.
+
+        Args:
+          error (Exception): The compilation error.
+
+        """
+        print(f"[INFO] XLA compilation failed, falling back to the graph: {error}")
+        self.xla = False
+        if not self.networks:
+            self.__build__()
+        self.__warmup__()
+
+    def version(self) -> str:
+        """
+        Returns a digest of the loaded model files and the settings the logits depend on.
+        """
+        paths = [self.tflite_path] if self.backend == "tflite" else self.model_path
+        return file_digest(
+            paths, self.backend, self.compact, self.precision, self.ensemble, self.dim
+        )
+
+    def traces(self) -> int:
+        """
+        Returns how many times the keras backend batch functions were traced.
+        """
+        return sum(f.experimental_get_tracing_count() for f in self.tracing_functions)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the inference metrics of the model.
+
+        Returns:
+          Dict[str, Any]: The per-bucket metrics of Predictor and, with the keras backend, the number of traces and of retraces after warmup.
+
+        """
+        metrics = super().metrics()
+        if self.backend == "keras" and self.loaded:
+            metrics["xla"] = self.xla
+            metrics["precision"] = self.precision
+            metrics["traces"] = self.traces()
+            metrics["retraces"] = metrics["traces"] - self.warmup_traces
+        return metrics
+
+    def __load_tflite__(self, path: str) -> None:
+        """
+        Loads an exported .tflite file into a TFLite interpreter.
+
+        Args:
+          path (str): The .tflite file.
+
+        Raises:
+          ValueError: If the file cannot be read or was exported for the other landmark layout.
+
+        """
+        self.interpreter = tf.lite.Interpreter(
+            model_path=path, num_threads=self.num_threads
+        )
+        self.tflite_path = path
+        inputs = {d["name"]: d for d in self.interpreter.get_input_details()}
+        rows = inputs["inputs"]["shape_signature"][2]
+        if rows != self.rows:
+            raise ValueError(f"The model takes {rows} rows per frame, not {self.rows}")
+        self.tflite_inputs = (inputs["inputs"]["index"], inputs["lengths"]["index"])
+        self.tflite_output = self.interpreter.get_output_details()[0]["index"]
+        self.tflite_shape = None
+
     def TransformerBlock(
         self,
         dim: int = 256,
@@ -508,7 +486,7 @@ class Model(object):
         attn_dropout: float = 0.2,
         drop_rate: float = 0.2,
         activation: str = "swish",
-    ) -> Callable[[tf.Tensor], tf.Tensor]:
+    ) -> Callable[[tf.Tensor, Optional[tf.Tensor]], tf.Tensor]:
         """
         Returns a callable function representing a transformer block.
 
@@ -521,16 +499,16 @@ class Model(object):
           activation (str): The activation function to use.
 
         Returns:
-          Callable[[tf.Tensor], tf.Tensor]: The transformer block function.
+          Callable[[tf.Tensor, Optional[tf.Tensor]], tf.Tensor]: The transformer block function, taking the input tensor and its optional padding mask.
 
         """
 
-        def apply(inputs: tf.Tensor) -> tf.Tensor:
+        def apply(inputs: tf.Tensor, mask: Optional[tf.Tensor] = None) -> tf.Tensor:
             x: tf.Tensor = inputs
             x: tf.Tensor = tf.keras.layers.BatchNormalization(momentum=0.95)(x)
             x: tf.Tensor = MultiHeadSelfAttention(
                 dim=dim, num_heads=num_heads, dropout=attn_dropout
-            )(x)
+            )(x, mask=mask)
             x: tf.Tensor = tf.keras.layers.Dropout(drop_rate, noise_shape=(None, 1, 1))(
                 x
             )
@@ -566,6 +544,7 @@ class Model(object):
 
         """
         inp: tf.keras.Input = tf.keras.Input((max_len, CHANNELS))
+        mask: tf.Tensor = PaddingMask()(inp)
         x: tf.Tensor = inp
         ksize: int = 17
         x: tf.Tensor = tf.keras.layers.Dense(dim, use_bias=False, name="stem_conv")(x)
@@ -573,75 +552,85 @@ class Model(object):
             momentum=0.95, name="stem_bn"
         )(x)
 
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x, mask)
 
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-        x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+        x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x, mask)
 
         if dim == 384:  # for the 4x sized model
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x, mask)
 
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x)
-            x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = Conv1DBlock(dim, ksize, drop_rate=0.2)(x, mask)
+            x: tf.Tensor = self.TransformerBlock(dim, expand=2)(x, mask)
 
         x: tf.Tensor = tf.keras.layers.Dense(dim * 2, activation=None, name="top_conv")(
             x
         )
-        x: tf.Tensor = tf.keras.layers.GlobalAveragePooling1D()(x)
+        x: tf.Tensor = tf.keras.layers.GlobalAveragePooling1D()(x, mask=mask)
         x: tf.Tensor = LateDropout(0.8, start_step=dropout_step)(x)
-        x: tf.Tensor = tf.keras.layers.Dense(NUM_CLASSES, name="classifier")(x)
+        # The logits stay float32 under a mixed precision policy.
+        x: tf.Tensor = tf.keras.layers.Dense(
+            NUM_CLASSES, name="classifier", dtype="float32"
+        )(x)
         return tf.keras.Model(inp, x)
 
-    def load_relevant_data_csv(
-        self, data: pd.DataFrame, data_columns: list[str] = ["x", "y", "z"]
-    ) -> np.ndarray:
+    def invoke(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
         """
-        Loads relevant data from a CSV file.
+        Runs one padded float32 batch through the selected backend.
 
         Args:
-          data (pd.DataFrame): The data to load.
-          data_columns (list[str]): The columns to consider.
+          inputs (np.ndarray): The windows of shape (N, T, rows, 3).
+          lengths (np.ndarray): The (N,) int32 number of valid frames of each window.
 
         Returns:
-          np.ndarray: The loaded data.
-
-        """
-        n_frames = int(len(data) / ROWS_PER_FRAME)
-        data = data.values.reshape(n_frames, ROWS_PER_FRAME, len(data_columns))
-        return data.astype(np.float32)
+          np.ndarray: The logits of shape (N, NUM_CLASSES).
 
-    def predict(self, data: pd.DataFrame) -> tuple[str, float]:
         """
-        Makes a prediction using the model.
-
-        Args:
-          data (pd.DataFrame): The data to predict on.
-
-        Returns:
-          tuple[str, float]: The model prediction and the maximum probability.
-
-        """
-        if not self.loaded:
-            self.__load__()
-
-        demo_output = self.tflite_keras_model(self.load_relevant_data_csv(data))[
-            "outputs"
-        ]
-        output = Converter().decoder(np.argmax(demo_output.numpy(), axis=-1))
-        probs = np.exp(demo_output) / np.sum(np.exp(demo_output))
-        max_prob = np.max(probs)
-
-        return output, max_prob
+        if self.backend == "tflite":
+            if inputs.shape != self.tflite_shape:
+                self.interpreter.resize_tensor_input(
+                    self.tflite_inputs[0], inputs.shape
+                )
+                self.interpreter.resize_tensor_input(
+                    self.tflite_inputs[1], lengths.shape
+                )
+                self.interpreter.allocate_tensors()
+                self.tflite_shape = inputs.shape
+            self.interpreter.set_tensor(self.tflite_inputs[0], inputs)
+            self.interpreter.set_tensor(self.tflite_inputs[1], lengths)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.tflite_output)
+        if self.backend == "onnx":
+            return self.session.invoke(inputs, lengths)
+
+        function = self.bucket_functions.get(inputs.shape[1])
+        if function is None:
+            return self.tflite_keras_model.batch(inputs, lengths)["outputs"].numpy()
+        if not self.xla:
+            return function(inputs, lengths).numpy()
+
+        # XLA compiles every batch size separately, so batches are padded to a
+        # power of two with copies of their first window.
+        count = len(inputs)
+        size = 1 << (count - 1).bit_length()
+        if size > count:
+            inputs = np.concatenate([inputs, np.repeat(inputs[:1], size - count, 0)])
+            lengths = np.concatenate([lengths, np.repeat(lengths[:1], size - count)])
+        try:
+            return function(inputs, lengths).numpy()[:count]
+        except tf.errors.OpError as e:
+            self.__disable_xla__(e)
+            return self.invoke(inputs[:count], lengths[:count])
 
 
 if __name__ == "__main__":
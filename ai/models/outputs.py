@@ -0,0 +1,37 @@
+import numpy as np
+from typing import Tuple
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """
+    Compute a numerically stable softmax over the last axis.
+
+    Args:
+        logits (np.ndarray): The logits of shape (..., classes).
+
+    Returns:
+        np.ndarray: The probabilities, with the same shape as the logits.
+    """
+    exp = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+    return exp / np.sum(exp, axis=-1, keepdims=True)
+
+
+def top_k(probs: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k most probable classes of every row.
+
+    Args:
+        probs (np.ndarray): The probabilities of shape (N, classes).
+        k (int, optional): The number of classes to keep. Defaults to 1.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (N, k) class indices and probabilities, most probable first.
+    """
+    k = min(k, probs.shape[-1])
+    indices = np.argpartition(-probs, k - 1, axis=-1)[:, :k]
+    values = np.take_along_axis(probs, indices, axis=-1)
+    order = np.argsort(-values, axis=-1, kind="stable")
+    return (
+        np.take_along_axis(indices, order, axis=-1),
+        np.take_along_axis(values, order, axis=-1),
+    )
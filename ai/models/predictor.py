@@ -0,0 +1,511 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from models.cache import PredictionCache
+from models.outputs import softmax, top_k
+from models.windowing import (
+    bucket_length,
+    hand_coverage,
+    motion_energy,
+    motion_windows,
+    pad_frames,
+    pad_windows,
+    sliding_windows,
+    window_bounds,
+    window_means,
+)
+from config import (
+    WINDOW_SECONDS,
+    WINDOW_STRIDE_SECONDS,
+    ADAPTIVE_WINDOWS,
+    MIN_WINDOW_SECONDS,
+    MAX_WINDOW_SECONDS,
+    MOTION_SMOOTHING,
+    MIN_MOTION_ENERGY,
+    INFERENCE_BATCH_SIZE,
+    LENGTH_BUCKETS,
+    COMPACT_LANDMARKS,
+    LHAND,
+    RHAND,
+    MIN_HAND_COVERAGE,
+    NO_SIGN,
+    NUM_CLASSES,
+    ROWS_PER_FRAME,
+    s2p_map,
+    p2s_map,
+)
+
+
+class Converter(object):
+    """
+    A class that converts between sign names and sign indices.
+
+    Methods:
+      encoder(x: str) -> int: Encodes a sign name to its corresponding index.
+      decoder(x: int) -> str: Decodes a sign index to its corresponding name.
+    """
+
+    def encoder(self, x: str) -> int:
+        """
+        Encodes a sign name to its corresponding index.
+
+        Args:
+          x (str): The sign name.
+
+        Returns:
+          int: The corresponding sign index.
+        """
+        return s2p_map.get(x.lower())
+
+    def decoder(self, x: int) -> str:
+        """
+        Decodes a sign index to its corresponding name.
+
+        Args:
+          x (int): The sign index.
+
+        Returns:
+          str: The corresponding sign name.
+        """
+        return p2s_map.get(x)
+
+
+class Predictor(object):
+    """
+    The runtime-independent part of a sign classifier.
+
+    Windowing, batching and decoding live here; subclasses load a runtime in
+    __load__ and run padded batches through it in invoke. This module does
+    not import TensorFlow, so runtimes that do not need it stay free of it.
+
+    Attributes:
+      compact (bool): Whether the model takes the compact COMPACT_LANDMARKS layout.
+      rows (int): The number of landmark rows per input frame.
+      buckets (Tuple[int, ...]): The window lengths batches are padded up to.
+      hand_rows (List[int]): The rows of both hands in the input layout.
+      bucket_stats (Dict[int, Dict[str, Any]]): The calls, windows and seconds spent per bucket, and the seconds of the first call at each batch size.
+      gate_stats (Dict[str, int]): The windows predict_windows saw, skipped, and skipped with hands that barely moved.
+      cache (Optional[PredictionCache]): The cache of window logits predict_logits consults, None to always run the model.
+      loaded (bool): Indicates whether the model is loaded or not.
+
+    Methods:
+      __load__() -> None: Loads the model.
+      invoke(inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        Runs one padded batch through the runtime.
+      invoke_bucket(inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        Pads one batch to its length bucket, runs it and records its latency.
+      version() -> str:
+        Returns a digest of the model files and the settings the logits depend on.
+      metrics() -> Dict[str, Any]:
+        Returns the per-bucket call counts and latencies.
+      load_relevant_data_csv(data: pd.DataFrame, data_columns: list[str] = ["x", "y", "z"]) -> np.ndarray:
+        Loads relevant data from a CSV file.
+      predict(data: pd.DataFrame) -> tuple[str, float]:
+        Makes a prediction using the model.
+      predict_array(data: np.ndarray) -> tuple[str, float]:
+        Makes a prediction on a (T, rows, 3) landmark array.
+      predict_windows(data: np.ndarray, fps: float, window: float, stride: float, batch_size: int, min_hand_coverage: float,
+                      adaptive: bool, min_motion_energy: float) -> Tuple[np.ndarray, np.ndarray]:
+        Returns the logits and timestamps of the windows of a sequence.
+      predict_ragged(windows: List[np.ndarray], batch_size: int) -> np.ndarray:
+        Returns the logits of windows of different lengths.
+      predict_batch(windows: List[np.ndarray], k: int, batch_size: int) -> Tuple[List[List[str]], np.ndarray]:
+        Returns the top-k labels and probabilities of windows of different lengths.
+      predict_logits(inputs: np.ndarray, lengths: np.ndarray, batch_size: int) -> np.ndarray:
+        Returns the logits of a padded batch of windows.
+      run_logits(inputs: np.ndarray, lengths: np.ndarray, batch_size: int) -> np.ndarray:
+        Returns the logits of a padded batch of windows without consulting the cache.
+      decode(logits: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        Returns the top label and its probability for each row of logits.
+
+    """
+
+    def __init__(
+        self, compact: bool = False, buckets: Sequence[int] = LENGTH_BUCKETS
+    ) -> None:
+        """
+        Initializes the Predictor object.
+
+        Args:
+          compact (bool, optional): Whether inputs use the compact COMPACT_LANDMARKS layout. Defaults to False.
+          buckets (Sequence[int], optional): The window lengths batches are padded up to. Defaults to LENGTH_BUCKETS.
+
+        """
+        self.compact = compact
+        self.rows = len(COMPACT_LANDMARKS) if compact else ROWS_PER_FRAME
+        self.hand_rows = (
+            [COMPACT_LANDMARKS.index(i) for i in LHAND + RHAND]
+            if compact
+            else LHAND + RHAND
+        )
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_stats = {}
+        self.gate_stats = {"windows": 0, "skipped": 0, "still": 0}
+        self.cache: Optional[PredictionCache] = None
+        self.loaded = False
+
+    def __load__(self) -> None:
+        """
+        Loads the model.
+        """
+        raise NotImplementedError
+
+    def invoke(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        Runs one padded float32 batch through the runtime.
+
+        Args:
+          inputs (np.ndarray): The windows of shape (N, T, rows, 3).
+          lengths (np.ndarray): The (N,) int32 number of valid frames of each window.
+
+        Returns:
+          np.ndarray: The logits of shape (N, NUM_CLASSES).
+
+        """
+        raise NotImplementedError
+
+    def invoke_bucket(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        Runs one batch through the runtime after padding it to its length bucket.
+
+        The padded frames lie past every length, so they are masked out and
+        the logits do not change.
+
+        Args:
+          inputs (np.ndarray): The windows of shape (N, T, rows, 3).
+          lengths (np.ndarray): The (N,) int32 number of valid frames of each window.
+
+        Returns:
+          np.ndarray: The logits of shape (N, NUM_CLASSES).
+
+        """
+        length = bucket_length(inputs.shape[1], self.buckets)
+        if length > inputs.shape[1]:
+            inputs = pad_frames(inputs, length)
+        start = time.perf_counter()
+        logits = self.invoke(np.ascontiguousarray(inputs, dtype=np.float32), lengths)
+        seconds = time.perf_counter() - start
+        stats = self.bucket_stats.setdefault(
+            length, {"calls": 0, "windows": 0, "seconds": 0.0, "first_calls": {}}
+        )
+        stats["calls"] += 1
+        stats["windows"] += len(inputs)
+        stats["seconds"] += seconds
+        # A runtime that is slow on a new shape shows up here, not in the mean.
+        stats["first_calls"].setdefault(len(inputs), seconds)
+        return logits
+
+    def version(self) -> str:
+        """
+        Returns a digest of the model files and the settings the logits depend on.
+        """
+        raise NotImplementedError
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the inference metrics of the model.
+
+        Returns:
+          Dict[str, Any]: The calls, windows, milliseconds per call and milliseconds of the first call at each batch size of each length bucket used so far, the windows the hand and motion gates skipped and the prediction cache counters.
+
+        """
+        metrics = {
+            "buckets": {
+                length: {
+                    "calls": stats["calls"],
+                    "windows": stats["windows"],
+                    "ms_per_call": stats["seconds"] / stats["calls"] * 1e3,
+                    "first_call_ms": {
+                        size: seconds * 1e3
+                        for size, seconds in sorted(stats["first_calls"].items())
+                    },
+                }
+                for length, stats in sorted(self.bucket_stats.items())
+            },
+            "gate": dict(self.gate_stats),
+        }
+        if self.cache is not None:
+            metrics["cache"] = self.cache.metrics()
+        return metrics
+
+    def load_relevant_data_csv(
+        self, data: pd.DataFrame, data_columns: list[str] = ["x", "y", "z"]
+    ) -> np.ndarray:
+        """
+        Loads relevant data from a CSV file.
+
+        Args:
+          data (pd.DataFrame): The data to load.
+          data_columns (list[str]): The columns to consider.
+
+        Returns:
+          np.ndarray: The loaded data.
+
+        """
+        n_frames = int(len(data) / ROWS_PER_FRAME)
+        data = data.values.reshape(n_frames, ROWS_PER_FRAME, len(data_columns))
+        return data.astype(np.float32)
+
+    def predict(self, data: pd.DataFrame) -> tuple[str, float]:
+        """
+        Makes a prediction using the model.
+
+        Args:
+          data (pd.DataFrame): The data to predict on.
+
+        Returns:
+          tuple[str, float]: The model prediction and the maximum probability.
+
+        """
+        data = self.load_relevant_data_csv(data)
+        if self.compact:
+            data = data[:, COMPACT_LANDMARKS]
+        return self.predict_array(data)
+
+    def predict_array(self, data: np.ndarray) -> tuple[str, float]:
+        """
+        Makes a prediction on a landmark array.
+
+        Args:
+          data (np.ndarray): The landmarks of shape (T, rows, 3).
+
+        Returns:
+          tuple[str, float]: The model prediction and the maximum probability.
+
+        """
+        labels, probs = self.decode(
+            self.predict_logits(np.asarray(data, dtype=np.float32)[None])
+        )
+        return labels[0], probs[0]
+
+    def predict_windows(
+        self,
+        data: np.ndarray,
+        fps: float,
+        window: float = WINDOW_SECONDS,
+        stride: float = WINDOW_STRIDE_SECONDS,
+        batch_size: int = INFERENCE_BATCH_SIZE,
+        min_hand_coverage: float = MIN_HAND_COVERAGE,
+        adaptive: bool = ADAPTIVE_WINDOWS,
+        min_motion_energy: float = MIN_MOTION_ENERGY,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the windows of a landmark sequence through the model in batches.
+
+        Windows are either cut at the valleys of hand motion, between
+        MIN_WINDOW_SECONDS and MAX_WINDOW_SECONDS long, or slid every `stride`
+        seconds with a shorter last window over the frames the full ones
+        leave out, see window_bounds; lengths are converted to frames at fps.
+        Windows with a hand in fewer than min_hand_coverage of their frames,
+        or whose hands move less than min_motion_energy, skip the model;
+        their logits are NaN, which decode reports as NO_SIGN.
+
+        Args:
+          data (np.ndarray): The landmarks of shape (T, rows, 3).
+          fps (float): The frames per second of the sequence.
+          window (float, optional): The seconds per sliding window. Defaults to WINDOW_SECONDS.
+          stride (float, optional): The seconds between sliding window starts. Defaults to WINDOW_STRIDE_SECONDS.
+          batch_size (int, optional): The number of windows per model call. Defaults to INFERENCE_BATCH_SIZE.
+          min_hand_coverage (float, optional): The share of frames with a hand below which a window is skipped. Defaults to MIN_HAND_COVERAGE.
+          adaptive (bool, optional): Whether to cut windows at motion valleys instead of sliding them. Defaults to ADAPTIVE_WINDOWS.
+          min_motion_energy (float, optional): The mean motion energy below which a window is skipped, see motion_energy. Defaults to MIN_MOTION_ENERGY.
+
+        Returns:
+          Tuple[np.ndarray, np.ndarray]: The (N, NUM_CLASSES) logits and the (N, 2) start and end time of each window in seconds.
+
+        """
+        if not self.loaded:
+            self.__load__()
+
+        data = np.asarray(data, dtype=np.float32)
+        energy = motion_energy(data, self.hand_rows, MOTION_SMOOTHING)
+        if adaptive:
+            bounds = motion_windows(
+                energy,
+                max(round(MIN_WINDOW_SECONDS * fps), 1),
+                max(round(MAX_WINDOW_SECONDS * fps), 1),
+            )
+        else:
+            window = max(round(window * fps), 1)
+            stride = max(round(stride * fps), 1)
+            windows = sliding_windows(data, window, stride)
+            bounds = window_bounds(len(windows), window, stride, len(data))
+        hands = hand_coverage(data, self.hand_rows, bounds) >= min_hand_coverage
+        moving = window_means(energy, bounds) >= min_motion_energy
+        active = hands & moving
+
+        logits = np.full((len(bounds), NUM_CLASSES), np.nan, dtype=np.float32)
+        if adaptive:
+            logits[active] = self.predict_ragged(
+                [data[start:end] for start, end in bounds[active]], batch_size
+            )
+        else:
+            # Full windows are views; a final partial window is padded and masked.
+            full = active[: len(windows)]
+            inputs, lengths = windows[full], None
+            if len(bounds) > len(windows) and active[-1]:
+                start, end = bounds[-1]
+                tail = pad_frames(data[None, start:end], window)
+                inputs = np.concatenate([inputs, tail])
+                lengths = np.full(len(inputs), window, dtype=np.int32)
+                lengths[-1] = end - start
+            logits[active] = self.predict_logits(inputs, lengths, batch_size=batch_size)
+        self.gate_stats["windows"] += len(bounds)
+        self.gate_stats["skipped"] += int(len(bounds) - active.sum())
+        self.gate_stats["still"] += int((hands & ~moving).sum())
+        return logits, bounds / fps
+
+    def predict_logits(
+        self,
+        inputs: np.ndarray,
+        lengths: Optional[np.ndarray] = None,
+        batch_size: int = INFERENCE_BATCH_SIZE,
+    ) -> np.ndarray:
+        """
+        Runs a padded batch of windows through the model.
+
+        Each model call is padded to its length bucket, see invoke_bucket.
+        With a cache, only the windows it misses run through the model.
+
+        Args:
+          inputs (np.ndarray): The windows of shape (N, T, rows, 3).
+          lengths (Optional[np.ndarray], optional): The number of valid frames of each window. Defaults to T for all.
+          batch_size (int, optional): The number of windows per model call. Defaults to INFERENCE_BATCH_SIZE.
+
+        Returns:
+          np.ndarray: The logits of shape (N, NUM_CLASSES).
+
+        """
+        if not self.loaded:
+            self.__load__()
+
+        if lengths is None:
+            lengths = np.full(len(inputs), inputs.shape[1], dtype=np.int32)
+        if self.cache is None:
+            return self.run_logits(inputs, lengths, batch_size)
+
+        if self.cache.version is None:
+            self.cache.open(self.version())
+        keys = [self.cache.key(w[:n]) for w, n in zip(inputs, lengths)]
+        cached = [self.cache.get(key) for key in keys]
+        missing = np.array([c is None for c in cached], dtype=bool)
+        logits = np.empty((len(inputs), NUM_CLASSES), dtype=np.float32)
+        if missing.any():
+            lengths = np.asarray(lengths)[missing]
+            logits[missing] = self.run_logits(
+                inputs[missing][:, : lengths.max()], lengths, batch_size
+            )
+        for i, value in enumerate(cached):
+            if value is None:
+                self.cache.put(keys[i], logits[i])
+            else:
+                logits[i] = value
+        return logits
+
+    def run_logits(
+        self,
+        inputs: np.ndarray,
+        lengths: np.ndarray,
+        batch_size: int = INFERENCE_BATCH_SIZE,
+    ) -> np.ndarray:
+        """
+        Runs a padded batch of windows through the model, bypassing the cache.
+
+        Args:
+          inputs (np.ndarray): The windows of shape (N, T, rows, 3).
+          lengths (np.ndarray): The number of valid frames of each window.
+          batch_size (int, optional): The number of windows per model call. Defaults to INFERENCE_BATCH_SIZE.
+
+        Returns:
+          np.ndarray: The logits of shape (N, NUM_CLASSES).
+
+        """
+        logits = [
+            self.invoke_bucket(
+                inputs[i : i + batch_size],
+                np.asarray(lengths[i : i + batch_size], dtype=np.int32),
+            )
+            for i in range(0, len(inputs), batch_size)
+        ]
+        if not logits:
+            return np.empty((0, NUM_CLASSES), dtype=np.float32)
+        return np.concatenate(logits)
+
+    def predict_batch(
+        self,
+        windows: List[np.ndarray],
+        k: int = 1,
+        batch_size: int = INFERENCE_BATCH_SIZE,
+    ) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        Makes predictions on many windows of different lengths.
+
+        Each model call pads its windows to the longest one in it and masks the
+        padding, so every window is scored as if it ran alone.
+
+        Args:
+          windows (List[np.ndarray]): The windows, each of shape (T_i, rows, 3).
+          k (int, optional): The number of labels to return per window. Defaults to 1.
+          batch_size (int, optional): The number of windows per model call. Defaults to INFERENCE_BATCH_SIZE.
+
+        Returns:
+          Tuple[List[List[str]], np.ndarray]: The top-k labels of each window and their (N, k) probabilities.
+
+        """
+        logits = self.predict_ragged(windows, batch_size)
+        indices, probs = top_k(softmax(logits), k)
+        converter = Converter()
+        labels = [[converter.decoder(int(i)) for i in row] for row in indices]
+        return labels, probs
+
+    def predict_ragged(
+        self, windows: List[np.ndarray], batch_size: int = INFERENCE_BATCH_SIZE
+    ) -> np.ndarray:
+        """
+        Runs windows of different lengths through the model.
+
+        Windows are batched by length bucket, so no model call pads a window
+        past its bucket, and each window is scored as if it ran alone.
+
+        Args:
+          windows (List[np.ndarray]): The windows, each of shape (T_i, rows, 3).
+          batch_size (int, optional): The number of windows per model call. Defaults to INFERENCE_BATCH_SIZE.
+
+        Returns:
+          np.ndarray: The logits of shape (N, NUM_CLASSES), in the order of the windows.
+
+        """
+        buckets = np.array([bucket_length(len(w), self.buckets) for w in windows])
+        logits = np.empty((len(windows), NUM_CLASSES), dtype=np.float32)
+        for bucket in np.unique(buckets):
+            indices = np.flatnonzero(buckets == bucket)
+            for i in range(0, len(indices), batch_size):
+                batch = indices[i : i + batch_size]
+                logits[batch] = self.predict_logits(
+                    *pad_windows([windows[j] for j in batch])
+                )
+        return logits
+
+    def decode(self, logits: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Decodes a batch of logits.
+
+        Rows of NaN, the windows predict_windows skipped, decode to NO_SIGN
+        with probability 0.
+
+        Args:
+          logits (np.ndarray): The logits of shape (N, NUM_CLASSES).
+
+        Returns:
+          Tuple[List[str], np.ndarray]: The top label and its probability for each row.
+
+        """
+        skipped = np.isnan(logits).all(axis=-1)
+        indices, probs = top_k(softmax(np.where(skipped[:, None], 0, logits)), 1)
+        converter = Converter()
+        labels = [
+            NO_SIGN if skip else converter.decoder(int(i))
+            for i, skip in zip(indices[:, 0], skipped)
+        ]
+        return labels, np.where(skipped, 0, probs[:, 0])
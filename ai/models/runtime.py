@@ -0,0 +1,157 @@
+import numpy as np
+from typing import List, Optional, Sequence, Union
+from config import (
+    CASCADE_DIM,
+    COMPILED_CACHE,
+    COMPILED_CACHE_DIR,
+    INFERENCE_THREADS,
+    LENGTH_BUCKETS,
+    PREDICTION_CACHE,
+)
+from models.cache import PredictionCache, file_digest
+from models.cascade import CascadeModel
+from models.predictor import Predictor
+from models.service import RemoteModel
+
+try:
+    import onnxruntime as ort
+except ImportError:  # Only the onnx backend needs it.
+    ort = None
+
+
+class OnnxModel(Predictor):
+    """
+    A sign classifier served from a scripts.export ONNX file by ONNX Runtime.
+
+    Neither this module nor onnxruntime imports TensorFlow, so workers that
+    serve this backend start faster and stay smaller.
+
+    Attributes:
+      model_path (str): The path to the .onnx file.
+      num_threads (int): The number of intra-op threads of the session.
+      session (ort.InferenceSession): The ONNX Runtime session.
+
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        compact: bool = False,
+        num_threads: int = INFERENCE_THREADS,
+        buckets: Sequence[int] = LENGTH_BUCKETS,
+    ) -> None:
+        """
+        Initializes the OnnxModel object.
+
+        Args:
+          model_path (str): The path to the .onnx file.
+          compact (bool, optional): Whether inputs use the compact COMPACT_LANDMARKS layout. Defaults to False.
+          num_threads (int, optional): The number of intra-op threads. Defaults to INFERENCE_THREADS.
+          buckets (Sequence[int], optional): The window lengths batches are padded up to. Defaults to LENGTH_BUCKETS.
+
+        """
+        super().__init__(compact=compact, buckets=buckets)
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.session = None
+
+        print("[INFO] Model initialized...")
+
+    def __load__(self) -> None:
+        """
+        Opens an ONNX Runtime session on the CPU execution provider.
+
+        Raises:
+          ImportError: If onnxruntime is not installed.
+          ValueError: If the file was exported for the other landmark layout.
+
+        """
+        if ort is None:
+            raise ImportError("The onnx backend needs onnxruntime installed")
+        print("[INFO] Loading model...")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            self.model_path, options, providers=["CPUExecutionProvider"]
+        )
+        inputs = {i.name.split(":")[0]: i for i in self.session.get_inputs()}
+        rows = inputs["inputs"].shape[2]
+        if rows != self.rows:
+            raise ValueError(f"The model takes {rows} rows per frame, not {self.rows}")
+        self.input_names = (inputs["inputs"].name, inputs["lengths"].name)
+        self.loaded = True
+        print("[INFO] Model loaded successfully!")
+
+    def version(self) -> str:
+        return file_digest([self.model_path], "onnx", self.compact)
+
+    def invoke(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        return self.session.run(
+            None, {self.input_names[0]: inputs, self.input_names[1]: lengths}
+        )[0]
+
+
+def create_model(
+    model_path: str,
+    compact: bool = False,
+    backend: str = "keras",
+    num_threads: int = INFERENCE_THREADS,
+    fallback_path: Optional[str] = None,
+    buckets: Sequence[int] = LENGTH_BUCKETS,
+    cascade_path: Optional[Union[str, List[str]]] = None,
+    cache: bool = PREDICTION_CACHE,
+    compiled: bool = COMPILED_CACHE,
+    server: Optional[str] = None,
+) -> Predictor:
+    """
+    Creates a sign classifier for a backend, importing TensorFlow only when the backend needs it.
+
+    Args:
+      model_path (str): The path to the model file of the backend.
+      compact (bool, optional): Whether inputs use the compact COMPACT_LANDMARKS layout. Defaults to False.
+      backend (str, optional): "onnx" or one of the Model backends. Defaults to "keras".
+      num_threads (int, optional): The number of inference threads. Defaults to INFERENCE_THREADS.
+      fallback_path (Optional[str], optional): See Model. Defaults to None.
+      buckets (Sequence[int], optional): The window lengths batches are padded up to. Defaults to LENGTH_BUCKETS.
+      cascade_path (Optional[Union[str, List[str]]], optional): The keras weights of a CASCADE_DIM model, or of an ensemble, to escalate unsure windows to, see CascadeModel. Defaults to None, no cascade.
+      cache (bool, optional): Whether to memoize window logits in a PredictionCache. Defaults to PREDICTION_CACHE.
+      compiled (bool, optional): Whether keras backend models restore their traced functions from COMPILED_CACHE_DIR, see models.artifacts. Defaults to COMPILED_CACHE.
+      server (Optional[str], optional): The socket of an InferenceServer to send batches to instead of loading a model, e.g. INFERENCE_SOCKET. The server then owns the backend, cascade and cache, and the other arguments but compact and buckets are ignored. Defaults to None.
+
+    Returns:
+      Predictor: The unloaded model.
+    """
+    if server is not None:
+        return RemoteModel(server, compact=compact, buckets=buckets)
+    compiled_dir = COMPILED_CACHE_DIR if compiled else None
+    if backend == "onnx":
+        model = OnnxModel(
+            model_path, compact=compact, num_threads=num_threads, buckets=buckets
+        )
+    else:
+        from models.model import Model
+
+        model = Model(
+            model_path,
+            compact=compact,
+            backend=backend,
+            num_threads=num_threads,
+            fallback_path=fallback_path,
+            buckets=buckets,
+            compiled_dir=compiled_dir,
+        )
+    if cascade_path is not None:
+        from models.model import Model
+
+        large = Model(
+            cascade_path,
+            compact=compact,
+            buckets=buckets,
+            dim=CASCADE_DIM,
+            compiled_dir=compiled_dir,
+        )
+        model = CascadeModel(model, large)
+    if cache:
+        model.cache = PredictionCache()
+    return model
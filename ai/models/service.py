@@ -0,0 +1,377 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Sequence
+from config import (
+    INFERENCE_BATCH_SIZE,
+    INFERENCE_SERVER_SAVE_AFTER,
+    INFERENCE_SERVER_SLOT_BYTES,
+    INFERENCE_SERVER_SLOTS,
+    INFERENCE_SOCKET,
+    LENGTH_BUCKETS,
+)
+from models.predictor import Predictor
+from utils.shm_ring import ShmRing
+
+
+class InferenceServer(object):
+    """
+    Serves one loaded Predictor to the RemoteModel of other processes over a Unix socket.
+
+    Every client connection is bound to one slot of the client's ShmRing:
+    the client writes a padded batch into the slot and sends its shape and
+    lengths, and the server writes the logits back into the same slot. A
+    thread per connection receives the requests and a single inference
+    thread runs them, merging the requests waiting for it that share a
+    window length into one call of up to max_batch windows.
+
+    Neither this module nor RemoteModel imports TensorFlow; only the server
+    process loads the model.
+
+    Attributes:
+      model (Predictor): The loaded model, with its own cache and cascade if any.
+      path (str): The Unix socket path.
+      max_batch (int): The number of windows above which waiting requests are no longer merged.
+      save_after (float): The idle seconds after which the prediction cache of the model is saved.
+      jobs (queue.Queue): The received requests, None to stop the inference thread.
+      stats (Dict[str, float]): The requests, model calls and windows served so far and the seconds spent in the model.
+      listener (Optional[Listener]): The socket listener, while serving.
+      unsaved (bool): Whether the model ran since the prediction cache was last saved.
+
+    """
+
+    def __init__(
+        self,
+        model: Predictor,
+        path: str = INFERENCE_SOCKET,
+        max_batch: int = INFERENCE_BATCH_SIZE,
+        save_after: float = INFERENCE_SERVER_SAVE_AFTER,
+    ) -> None:
+        """
+        Initializes the InferenceServer object.
+
+        Args:
+          model (Predictor): The model to serve. It is loaded if it is not yet.
+          path (str, optional): The Unix socket path. Defaults to INFERENCE_SOCKET.
+          max_batch (int, optional): The number of windows above which waiting requests are no longer merged. Defaults to INFERENCE_BATCH_SIZE.
+          save_after (float, optional): The idle seconds after which the prediction cache is saved. Defaults to INFERENCE_SERVER_SAVE_AFTER.
+
+        """
+        self.model = model
+        self.path = path
+        self.max_batch = max_batch
+        self.save_after = save_after
+        self.jobs = queue.Queue()
+        self.stats = {"requests": 0, "calls": 0, "windows": 0, "seconds": 0.0}
+        self.listener = None
+        self.unsaved = False
+
+    def serve_forever(self) -> None:
+        """
+        Accepts clients until close is called.
+        """
+        if not self.model.loaded:
+            self.model.__load__()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.listener = Listener(self.path, family="AF_UNIX")
+        worker = threading.Thread(target=self.run, daemon=True)
+        worker.start()
+        print(f"[INFO] Serving the model on {self.path}")
+        try:
+            while self.listener is not None:
+                try:
+                    connection = self.listener.accept()
+                except OSError:
+                    break
+                if self.listener is None:
+                    connection.close()
+                    break
+                threading.Thread(
+                    target=self.handle, args=(connection,), daemon=True
+                ).start()
+        finally:
+            self.jobs.put(None)
+            worker.join()
+
+    def close(self) -> None:
+        """
+        Stops accepting clients and removes the socket.
+        """
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            # Closing the listener does not wake an accept in another thread.
+            try:
+                Client(self.path, family="AF_UNIX").close()
+            except OSError:
+                pass
+            listener.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def handle(self, connection: Connection) -> None:
+        """
+        Receives the requests of one client connection.
+
+        Args:
+          connection (Connection): The connection, whose first message names the client's ring and slot.
+
+        """
+        hello = connection.recv()
+        ring = ShmRing(hello["slots"], hello["slot_bytes"], name=hello["ring"])
+        connection.send(
+            {
+                "rows": self.model.rows,
+                "buckets": self.model.buckets,
+                "version": self.model.version(),
+            }
+        )
+        try:
+            while True:
+                shape, lengths, inline = connection.recv()
+                inputs = ring.view(hello["slot"], shape) if inline is None else inline
+                self.jobs.put((inputs, lengths, connection, ring, hello["slot"]))
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+            ring.close()
+
+    def run(self) -> None:
+        """
+        Runs the received requests through the model until None is received.
+        """
+        while True:
+            try:
+                job = self.jobs.get(timeout=self.save_after)
+            except queue.Empty:
+                self.save()
+                continue
+            if job is None:
+                self.save()
+                return
+            jobs, windows = [job], len(job[0])
+            while windows < self.max_batch:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                jobs.append(job)
+                windows += len(job[0])
+            groups = {}
+            for job in jobs:
+                groups.setdefault(job[0].shape[1:], []).append(job)
+            for group in groups.values():
+                self.serve(group)
+
+    def serve(self, jobs: List[Any]) -> None:
+        """
+        Runs requests of the same window length in one model call and replies to each.
+
+        Args:
+          jobs (List[Any]): The (inputs, lengths, connection, ring, slot) of each request.
+
+        """
+        start = time.perf_counter()
+        try:
+            if len(jobs) == 1:
+                inputs, lengths = jobs[0][0], jobs[0][1]
+            else:
+                inputs = np.concatenate([job[0] for job in jobs])
+                lengths = np.concatenate([job[1] for job in jobs])
+            logits = np.asarray(
+                self.model.predict_logits(inputs, lengths), dtype=np.float32
+            )
+        except Exception as e:
+            for _, _, connection, _, _ in jobs:
+                self.reply(connection, ("error", str(e)))
+            return
+        self.stats["requests"] += len(jobs)
+        self.stats["calls"] += 1
+        self.stats["windows"] += len(logits)
+        self.stats["seconds"] += time.perf_counter() - start
+        self.unsaved = True
+        offset = 0
+        for inputs, _, connection, ring, slot in jobs:
+            part = logits[offset : offset + len(inputs)]
+            offset += len(inputs)
+            if ring.fits(part.shape):
+                ring.write(slot, part)
+                self.reply(connection, ("ok", part.shape))
+            else:
+                self.reply(connection, ("inline", part))
+
+    def reply(self, connection: Connection, message: Any) -> None:
+        """
+        Sends a reply, ignoring clients that went away.
+        """
+        try:
+            connection.send(message)
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        """
+        Saves the prediction cache of the model if it changed since the last save.
+        """
+        if self.unsaved and self.model.cache is not None:
+            self.model.cache.save()
+        self.unsaved = False
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the serving metrics.
+
+        Returns:
+          Dict[str, Any]: The requests, model calls and windows served, the windows per call and milliseconds per window, and the metrics of the model.
+
+        """
+        stats = self.stats
+        return {
+            **stats,
+            "windows_per_call": (
+                stats["windows"] / stats["calls"] if stats["calls"] else None
+            ),
+            "ms_per_window": (
+                stats["seconds"] / stats["windows"] * 1e3 if stats["windows"] else None
+            ),
+            "model": self.model.metrics(),
+        }
+
+
+class RemoteModel(Predictor):
+    """
+    A sign classifier that runs its batches on an InferenceServer.
+
+    Windowing, batching and decoding run in this process; only the padded
+    batches go to the server, through a ShmRing this process creates. Each
+    slot has its own connection, so up to `slots` threads can have a batch
+    in flight.
+
+    Attributes:
+      path (str): The Unix socket path of the server.
+      slots (int): The number of ring slots and connections.
+      slot_bytes (int): The size of each slot; larger batches and logits go over the socket.
+      connect_timeout (float): The seconds to wait for the server to come up.
+      ring (Optional[ShmRing]): The ring, once loaded.
+      connections (queue.Queue): The idle (slot, connection) pairs.
+      server_version (Optional[str]): The version of the served model.
+
+    """
+
+    def __init__(
+        self,
+        path: str = INFERENCE_SOCKET,
+        compact: bool = False,
+        buckets: Sequence[int] = LENGTH_BUCKETS,
+        slots: int = INFERENCE_SERVER_SLOTS,
+        slot_bytes: int = INFERENCE_SERVER_SLOT_BYTES,
+        connect_timeout: float = 60.0,
+    ) -> None:
+        """
+        Initializes the RemoteModel object.
+
+        Args:
+          path (str, optional): The Unix socket path of the server. Defaults to INFERENCE_SOCKET.
+          compact (bool, optional): Whether inputs use the compact COMPACT_LANDMARKS layout. It must match the served model. Defaults to False.
+          buckets (Sequence[int], optional): The window lengths batches are padded up to. Defaults to LENGTH_BUCKETS.
+          slots (int, optional): The number of ring slots and connections. Defaults to INFERENCE_SERVER_SLOTS.
+          slot_bytes (int, optional): The size of each slot in bytes. Defaults to INFERENCE_SERVER_SLOT_BYTES.
+          connect_timeout (float, optional): The seconds to wait for the server to come up. Defaults to 60.
+
+        """
+        super().__init__(compact=compact, buckets=buckets)
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.connect_timeout = connect_timeout
+        self.ring = None
+        self.connections = queue.Queue()
+        self.server_version = None
+
+        print("[INFO] Model initialized...")
+
+    def __load__(self) -> None:
+        """
+        Creates the ring and connects each slot to the server.
+
+        Raises:
+          ValueError: If the server serves the other landmark layout.
+
+        """
+        print(f"[INFO] Connecting to the inference server on {self.path}...")
+        self.ring = ShmRing(self.slots, self.slot_bytes)
+        for slot in range(self.slots):
+            connection = self.connect()
+            connection.send(
+                {
+                    "ring": self.ring.name,
+                    "slots": self.slots,
+                    "slot_bytes": self.slot_bytes,
+                    "slot": slot,
+                }
+            )
+            info = connection.recv()
+            if info["rows"] != self.rows:
+                self.close()
+                raise ValueError(
+                    f"The server takes {info['rows']} rows per frame, not {self.rows}"
+                )
+            self.connections.put((slot, connection))
+        self.server_version = info["version"]
+        self.loaded = True
+        print("[INFO] Model loaded successfully!")
+
+    def connect(self) -> Connection:
+        """
+        Opens a connection to the server, waiting up to connect_timeout for it to come up.
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(self.path, family="AF_UNIX")
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def close(self) -> None:
+        """
+        Closes the connections and frees the ring.
+        """
+        while not self.connections.empty():
+            self.connections.get()[1].close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self.loaded = False
+
+    def version(self) -> str:
+        if not self.loaded:
+            self.__load__()
+        return self.server_version
+
+    def invoke(self, inputs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        slot, connection = self.connections.get()
+        try:
+            if self.ring.fits(inputs.shape, inputs.dtype):
+                self.ring.write(slot, inputs)
+                connection.send((inputs.shape, lengths, None))
+            else:
+                connection.send((inputs.shape, lengths, inputs))
+            status, value = connection.recv()
+            if status == "error":
+                raise RuntimeError(f"The inference server failed: {value}")
+            if status == "inline":
+                return value
+            # The slot is reused by the next call.
+            return np.array(self.ring.view(slot, value))
+        finally:
+            self.connections.put((slot, connection))
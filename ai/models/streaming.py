@@ -0,0 +1,444 @@
+import numpy as np
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import (
+    NUMBER_OF_FRAMES,
+    POINT_LANDMARKS,
+    CENTER_LANDMARKS,
+    COMPACT_LANDMARKS,
+)
+from models.graph import batch_norm_affine, parse_blocks
+from models.model import Model
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _swish(x: np.ndarray) -> np.ndarray:
+    return x * _sigmoid(x)
+
+
+_ACTIVATIONS: Dict[str, Optional[Callable[[np.ndarray], np.ndarray]]] = {
+    "linear": None,
+    "swish": _swish,
+    "silu": _swish,
+}
+
+
+def _dense(layer: Any) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[Callable]]:
+    """
+    Returns the kernel, bias and activation of a Dense layer.
+    """
+    kernel = np.asarray(layer.kernel, dtype=np.float32)
+    bias = np.asarray(layer.bias, dtype=np.float32) if layer.use_bias else None
+    return kernel, bias, _ACTIVATIONS[layer.get_config()["activation"]]
+
+
+def _apply_dense(
+    x: np.ndarray, dense: Tuple[np.ndarray, Optional[np.ndarray], Optional[Callable]]
+) -> np.ndarray:
+    kernel, bias, activation = dense
+    x = x @ kernel
+    if bias is not None:
+        x = x + bias
+    return x if activation is None else activation(x)
+
+
+class RingBuffer(object):
+    """
+    A fixed-size buffer of the most recent rows and their running sum.
+
+    Attributes:
+      data (np.ndarray): The rows, of shape (size, *shape). Zero until written.
+      pos (int): The slot the next row is written to.
+      count (int): The number of rows written, up to size.
+      total (np.ndarray): The float64 sum of the buffered rows.
+    """
+
+    def __init__(self, size: int, shape: Tuple[int, ...]) -> None:
+        self.data: np.ndarray = np.zeros((size,) + shape, dtype=np.float32)
+        self.pos: int = 0
+        self.count: int = 0
+        self.total: np.ndarray = np.zeros(shape, dtype=np.float64)
+
+    def push(self, row: np.ndarray) -> None:
+        """
+        Writes a row, evicting the oldest one when the buffer is full.
+        """
+        if self.count == len(self.data):
+            self.total -= self.data[self.pos]
+        else:
+            self.count += 1
+        self.data[self.pos] = row
+        self.total += row
+        self.pos = (self.pos + 1) % len(self.data)
+
+    def rows(self) -> np.ndarray:
+        """
+        Returns the buffered rows, in slot order rather than time order.
+        """
+        return self.data[: self.count]
+
+    def mean(self) -> np.ndarray:
+        return (self.total / max(self.count, 1)).astype(np.float32)
+
+    def clear(self) -> None:
+        self.data[...] = 0
+        self.pos = 0
+        self.count = 0
+        self.total[...] = 0
+
+
+class StreamingPreprocess(object):
+    """
+    Frame-by-frame version of the Preprocess layer.
+
+    The centering mean and the scale are running statistics over the last
+    `history` frames. Since the dx and dx2 features look two frames ahead,
+    the features of a frame are emitted once two more frames have arrived.
+
+    Attributes:
+      point_landmarks (np.ndarray): The indices of the point landmarks.
+      center_landmarks (np.ndarray): The indices used to center the landmarks.
+      stats (RingBuffer): Per-frame sums, squared sums and counts of the points and of the center landmarks.
+      frames (deque): The points of the last three frames.
+    """
+
+    def __init__(
+        self,
+        history: int = NUMBER_OF_FRAMES,
+        point_landmarks: List[int] = POINT_LANDMARKS,
+        center_landmarks: List[int] = CENTER_LANDMARKS,
+    ) -> None:
+        self.point_landmarks: np.ndarray = np.asarray(point_landmarks)
+        self.center_landmarks: np.ndarray = np.asarray(center_landmarks)
+        self.stats: RingBuffer = RingBuffer(history, (15,))
+        self.frames: deque = deque(maxlen=3)
+
+    def push(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Adds a (rows, 3) frame.
+
+        Returns:
+          Optional[np.ndarray]: The CHANNELS features of the frame two steps back, or None while fewer than three frames were pushed.
+        """
+        points = frame[self.point_landmarks]
+        center = frame[self.center_landmarks]
+        valid = ~np.isnan(points)
+        center_valid = ~np.isnan(center)
+        points0 = np.where(valid, points, 0.0)
+        center0 = np.where(center_valid, center, 0.0)
+        self.stats.push(
+            np.concatenate(
+                [
+                    points0.sum(0),
+                    (points0 * points0).sum(0),
+                    valid.sum(0),
+                    center0.sum(0),
+                    center_valid.sum(0),
+                ]
+            )
+        )
+        self.frames.append(points)
+        if len(self.frames) < 3:
+            return None
+        return self._features(self.frames[0], self.frames[1], self.frames[2])
+
+    def flush(self) -> List[np.ndarray]:
+        """
+        Emits the frames still waiting for lookahead, padding their differences with zeros like Preprocess does at the end of a sequence.
+        """
+        frames = list(self.frames)[-2:] if len(self.frames) == 3 else list(self.frames)
+        features = []
+        for i, frame in enumerate(frames):
+            ahead = frames[i + 1 :]
+            features.append(
+                self._features(
+                    frame,
+                    ahead[0] if len(ahead) > 0 else None,
+                    ahead[1] if len(ahead) > 1 else None,
+                )
+            )
+        self.frames.clear()
+        return features
+
+    def clear(self) -> None:
+        self.stats.clear()
+        self.frames.clear()
+
+    def _features(
+        self,
+        frame: np.ndarray,
+        next1: Optional[np.ndarray],
+        next2: Optional[np.ndarray],
+    ) -> np.ndarray:
+        total = self.stats.total
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s, ss, n = total[0:3], total[3:6], total[6:9]
+            mean = total[9:12] / total[12:15]
+            mean = np.where(np.isnan(mean), 0.5, mean)
+            std = np.sqrt(ss / n - 2 * mean * s / n + mean * mean)
+
+            def normalize(x):
+                return ((x - mean) / std)[:, :2].astype(np.float32)
+
+            x = normalize(frame)
+            dx = normalize(next1) - x if next1 is not None else np.zeros_like(x)
+            dx2 = normalize(next2) - x if next2 is not None else np.zeros_like(x)
+        features = np.concatenate([x.ravel(), dx.ravel(), dx2.ravel()])
+        return np.where(np.isnan(features), 0.0, features).astype(np.float32)
+
+
+class StreamingCausalConv(object):
+    """
+    Step-by-step version of a CausalDWConv1D layer.
+
+    A rolling buffer keeps the last dilation * (kernel_size - 1) inputs, so
+    every step matches the layer's output at the newest frame exactly.
+    """
+
+    def __init__(self, layer: Any) -> None:
+        kernel = np.asarray(layer.dw_conv.kernel, dtype=np.float32)
+        self.kernel: np.ndarray = kernel[:, :, 0]
+        self.bias: Optional[np.ndarray] = (
+            np.asarray(layer.dw_conv.bias, dtype=np.float32)
+            if layer.dw_conv.use_bias
+            else None
+        )
+        kernel_size = len(self.kernel)
+        dilation = layer.dw_conv.dilation_rate[0]
+        self.buffer: RingBuffer = RingBuffer(
+            dilation * (kernel_size - 1) + 1, kernel.shape[1:2]
+        )
+        # How far back each kernel tap reads, oldest tap first.
+        self.offsets: np.ndarray = dilation * np.arange(kernel_size - 1, -1, -1)
+
+    def step(self, x: np.ndarray) -> np.ndarray:
+        self.buffer.push(x)
+        taps = (self.buffer.pos - 1 - self.offsets) % len(self.buffer.data)
+        x = np.einsum("kc,kc->c", self.buffer.data[taps], self.kernel)
+        return x if self.bias is None else x + self.bias
+
+    def clear(self) -> None:
+        self.buffer.clear()
+
+
+class StreamingAttention(object):
+    """
+    Step-by-step version of a MultiHeadSelfAttention layer.
+
+    Keys and values of the last `history` frames are cached, and each new
+    frame attends over them. This matches the layer's output at the newest
+    frame of a window of the same frames exactly.
+    """
+
+    def __init__(self, layer: Any, history: int = NUMBER_OF_FRAMES) -> None:
+        self.num_heads: int = layer.num_heads
+        self.head_dim: int = layer.dim // layer.num_heads
+        self.scale: float = layer.scale
+        self.qkv: Tuple[np.ndarray, Optional[np.ndarray], Optional[Callable]] = _dense(
+            layer.qkv
+        )
+        self.proj: np.ndarray = np.asarray(layer.proj.kernel, dtype=np.float32)
+        self.keys: RingBuffer = RingBuffer(history, (self.num_heads, self.head_dim))
+        self.values: RingBuffer = RingBuffer(history, (self.num_heads, self.head_dim))
+
+    def step(self, x: np.ndarray) -> np.ndarray:
+        qkv = _apply_dense(x, self.qkv).reshape(self.num_heads, 3 * self.head_dim)
+        q, k, v = np.split(qkv, 3, axis=-1)
+        self.keys.push(k)
+        self.values.push(v)
+        attn = np.einsum("hd,nhd->hn", q, self.keys.rows()) * self.scale
+        attn = np.exp(attn - attn.max(axis=-1, keepdims=True))
+        attn /= attn.sum(axis=-1, keepdims=True)
+        x = np.einsum("hn,nhd->hd", attn, self.values.rows())
+        return x.reshape(-1) @ self.proj
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.values.clear()
+
+
+class StreamingNetwork(object):
+    """
+    Step-by-step version of one network built by Model.get_model.
+
+    The causal convolutions and the attention keep exact cached state. The
+    ECA gates and the final average pooling use running means over the last
+    `history` frames instead of the whole window.
+    """
+
+    def __init__(self, model: Any, history: int = NUMBER_OF_FRAMES) -> None:
+        self.history: int = history
+        self.steps: List[Callable[[np.ndarray], np.ndarray]] = []
+        self.states: List[Any] = []
+        for kind, layers in parse_blocks(model):
+            getattr(self, "_add_" + kind)(layers)
+
+    def step(self, x: np.ndarray) -> np.ndarray:
+        """
+        Feeds the features of one frame and returns the logits so far.
+        """
+        for step in self.steps:
+            x = step(x)
+        return x
+
+    def clear(self) -> None:
+        for state in self.states:
+            state.clear()
+
+    def _add_stem(self, layers: Dict[str, Any]) -> None:
+        kernel, bias, _ = _dense(layers["dense"])
+        scale, shift = batch_norm_affine(layers["bn"])
+        kernel = kernel * scale
+        if bias is not None:
+            shift = shift + bias * scale
+        self.steps.append(lambda x: x @ kernel + shift)
+
+    def _add_conv(self, layers: Dict[str, Any]) -> None:
+        expand = _dense(layers["expand"])
+        conv = StreamingCausalConv(layers["dwconv"])
+        scale, shift = batch_norm_affine(layers["bn"])
+        eca = np.asarray(layers["eca"].conv.kernel, dtype=np.float32)[:, 0, 0]
+        pad = (len(eca) - 1) // 2
+        history = RingBuffer(self.history, conv.kernel.shape[1:])
+        project = _dense(layers["project"])
+        residual = layers["residual"]
+        self.states += [conv, history]
+
+        def step(inputs: np.ndarray) -> np.ndarray:
+            x = conv.step(_apply_dense(inputs, expand)) * scale + shift
+            history.push(x)
+            mean = np.pad(history.mean(), (pad, len(eca) - 1 - pad))
+            x = x * _sigmoid(np.correlate(mean, eca, mode="valid"))
+            x = _apply_dense(x, project)
+            return x + inputs if residual else x
+
+        self.steps.append(step)
+
+    def _add_transformer(self, layers: Dict[str, Any]) -> None:
+        attn_scale, attn_shift = batch_norm_affine(layers["attn_bn"])
+        attn = StreamingAttention(layers["attn"], self.history)
+        ffn_scale, ffn_shift = batch_norm_affine(layers["ffn_bn"])
+        expand = _dense(layers["expand"])
+        project = _dense(layers["project"])
+        self.states.append(attn)
+
+        def step(inputs: np.ndarray) -> np.ndarray:
+            x = inputs + attn.step(inputs * attn_scale + attn_shift)
+            return x + _apply_dense(
+                _apply_dense(x * ffn_scale + ffn_shift, expand), project
+            )
+
+        self.steps.append(step)
+
+    def _add_head(self, layers: Dict[str, Any]) -> None:
+        top = _dense(layers["top"])
+        classifier = _dense(layers["classifier"])
+        pooled = RingBuffer(self.history, top[0].shape[1:])
+        self.states.append(pooled)
+
+        def step(x: np.ndarray) -> np.ndarray:
+            pooled.push(_apply_dense(x, top))
+            return _apply_dense(pooled.mean(), classifier)
+
+        self.steps.append(step)
+
+
+class StreamingModel(object):
+    """
+    A causal approximation of the model, for live feedback while frames arrive.
+
+    Frames are pushed one at a time and the logits are updated from cached
+    per-layer state instead of recomputing a whole window, so the cost per
+    frame does not grow with the history. It does not replace full-window
+    inference: only the causal convolutions and the attention of the newest
+    frame are exact. The ECA gates, the pooling and the normalization
+    statistics are running averages, and earlier frames never attend to later
+    ones, so the logits can pick a different word than predict_windows on the
+    same frames; `benchmark.py streaming` reports how often. Show them as a
+    provisional word and classify with the Predictor methods.
+
+    Attributes:
+      compact (bool): Whether frames use the compact COMPACT_LANDMARKS layout.
+      rows (int): The number of landmark rows per frame.
+      preprocess (StreamingPreprocess): The streaming preprocessing.
+      networks (List[StreamingNetwork]): The streaming networks of the ensemble.
+      logits (Optional[np.ndarray]): The latest (NUM_CLASSES,) logits, or None before the first emitted frame.
+    """
+
+    def __init__(self, model: Model, history: int = NUMBER_OF_FRAMES) -> None:
+        """
+        Initializes the StreamingModel object.
+
+        Args:
+          model (Model): The keras backend model to take the weights from. It is loaded if needed.
+          history (int, optional): The number of frames the cached state covers. Defaults to NUMBER_OF_FRAMES.
+
+        Raises:
+          ValueError: If the model does not use the keras backend, or was restored from a compiled artifact without its networks.
+        """
+        if model.backend != "keras":
+            raise ValueError("Streaming needs the keras backend weights")
+        if not model.loaded:
+            model.__load__()
+        if not model.networks:
+            raise ValueError(
+                "Streaming needs the keras backend networks, load the model without compiled_dir"
+            )
+        self.compact: bool = model.compact
+        self.rows: int = model.rows
+        landmarks = COMPACT_LANDMARKS if self.compact else None
+        self.preprocess: StreamingPreprocess = StreamingPreprocess(
+            history,
+            point_landmarks=(
+                [landmarks.index(i) for i in POINT_LANDMARKS]
+                if landmarks
+                else POINT_LANDMARKS
+            ),
+            center_landmarks=(
+                [landmarks.index(i) for i in CENTER_LANDMARKS]
+                if landmarks
+                else CENTER_LANDMARKS
+            ),
+        )
+        self.networks: List[StreamingNetwork] = [
+            StreamingNetwork(m, history) for m in model.networks
+        ]
+        self.logits: Optional[np.ndarray] = None
+
+    def push(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Adds a (rows, 3) landmark frame.
+
+        Args:
+          frame (np.ndarray): The frame, e.g. from results_to_array.
+
+        Returns:
+          Optional[np.ndarray]: The latest logits. They lag two frames behind, see StreamingPreprocess.
+        """
+        features = self.preprocess.push(np.asarray(frame, dtype=np.float32))
+        if features is not None:
+            self._step(features)
+        return self.logits
+
+    def finish(self) -> Optional[np.ndarray]:
+        """
+        Emits the frames still waiting for lookahead and returns the final logits.
+
+        The cached state is kept, so more frames can be pushed afterwards;
+        call reset() to start a new sequence.
+        """
+        for features in self.preprocess.flush():
+            self._step(features)
+        return self.logits
+
+    def reset(self) -> None:
+        self.preprocess.clear()
+        for network in self.networks:
+            network.clear()
+        self.logits = None
+
+    def _step(self, features: np.ndarray) -> None:
+        self.logits = np.mean([n.step(features) for n in self.networks], axis=0)
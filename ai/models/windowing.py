@@ -0,0 +1,217 @@
+import numpy as np
+from typing import List, Sequence, Tuple
+
+
+def sliding_windows(landmarks: np.ndarray, window: int, stride: int) -> np.ndarray:
+    """
+    Splits a landmark sequence into overlapping windows without copying.
+
+    Windows start every `stride` frames and only full windows are returned. A
+    sequence shorter than `window` yields a single window covering all of it.
+
+    Args:
+        landmarks (np.ndarray): The landmarks of shape (T, rows, 3).
+        window (int): The number of frames per window.
+        stride (int): The number of frames between window starts.
+
+    Returns:
+        np.ndarray: A read-only view of shape (N, window, rows, 3).
+    """
+    if window < 1 or stride < 1:
+        raise ValueError(f"Invalid window {window} or stride {stride}")
+    if len(landmarks) == 0:
+        return np.empty((0, window) + landmarks.shape[1:], dtype=landmarks.dtype)
+    if len(landmarks) < window:
+        return landmarks[None]
+
+    windows = np.lib.stride_tricks.sliding_window_view(landmarks, window, axis=0)
+    return np.moveaxis(windows, -1, 1)[::stride]
+
+
+def window_bounds(
+    n_windows: int, window: int, stride: int, n_frames: int
+) -> np.ndarray:
+    """
+    Returns the frame range covered by each window of sliding_windows, and by a final partial window.
+
+    sliding_windows only returns full windows. If they leave frames at the
+    end uncovered, one more window starts `stride` frames after the last one
+    and runs to the end of the sequence, so no frame goes unclassified.
+
+    Args:
+        n_windows (int): The number of windows.
+        window (int): The number of frames per window.
+        stride (int): The number of frames between window starts.
+        n_frames (int): The number of frames in the sequence.
+
+    Returns:
+        np.ndarray: The [start, end) frame of each window, of shape (N, 2), or (N + 1, 2) with a partial window.
+    """
+    starts = np.arange(n_windows) * stride
+    ends = np.minimum(starts + window, n_frames)
+    if n_windows and ends[-1] < n_frames and starts[-1] + stride < n_frames:
+        starts = np.append(starts, starts[-1] + stride)
+        ends = np.append(ends, n_frames)
+    return np.stack([starts, ends], axis=1)
+
+
+def pad_windows(windows: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stacks windows of different lengths into one NaN-padded batch.
+
+    Args:
+        windows (List[np.ndarray]): The windows, each of shape (T_i, rows, 3).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (N, max T_i, rows, 3) batch and the (N,) int32 lengths.
+    """
+    lengths = np.array([len(w) for w in windows], dtype=np.int32)
+    rows = windows[0].shape[1:] if windows else (0, 3)
+    batch = np.full(
+        (len(windows), lengths.max(initial=0)) + rows, np.nan, dtype=np.float32
+    )
+    for i, w in enumerate(windows):
+        batch[i, : len(w)] = w
+    return batch, lengths
+
+
+def bucket_length(length: int, buckets: Sequence[int]) -> int:
+    """
+    Returns the smallest bucket a window of `length` frames fits in.
+
+    Args:
+        length (int): The number of frames.
+        buckets (Sequence[int]): The bucket lengths.
+
+    Returns:
+        int: The smallest bucket of at least `length` frames, or `length` itself when no bucket is long enough.
+    """
+    return min((b for b in buckets if b >= length), default=length)
+
+
+def pad_frames(batch: np.ndarray, length: int) -> np.ndarray:
+    """
+    NaN-pads a batch of windows along the frame axis.
+
+    Args:
+        batch (np.ndarray): The windows of shape (N, T, rows, 3).
+        length (int): The number of frames to pad to, at least T.
+
+    Returns:
+        np.ndarray: The (N, length, rows, 3) float32 batch.
+    """
+    padded = np.full((len(batch), length) + batch.shape[2:], np.nan, dtype=np.float32)
+    padded[:, : batch.shape[1]] = batch
+    return padded
+
+
+def hand_coverage(
+    landmarks: np.ndarray, hand_rows: Sequence[int], bounds: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the share of frames of each window in which a hand was detected.
+
+    Args:
+        landmarks (np.ndarray): The landmarks of shape (T, rows, 3), NaN where nothing was detected.
+        hand_rows (Sequence[int]): The rows of both hands in the layout.
+        bounds (np.ndarray): The (N, 2) [start, end) frame of each window, see window_bounds.
+
+    Returns:
+        np.ndarray: The (N,) coverage of each window, between 0 and 1.
+    """
+    return window_means(~np.isnan(landmarks[:, hand_rows, 0]).all(axis=1), bounds)
+
+
+def window_means(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """
+    Averages a per-frame value over each window.
+
+    Args:
+        values (np.ndarray): The (T,) value of each frame.
+        bounds (np.ndarray): The (N, 2) [start, end) frame of each window.
+
+    Returns:
+        np.ndarray: The (N,) mean of each window, 0 for empty windows.
+    """
+    sums = np.concatenate([[0], np.cumsum(values, dtype=np.float64)])
+    return (sums[bounds[:, 1]] - sums[bounds[:, 0]]) / np.maximum(
+        bounds[:, 1] - bounds[:, 0], 1
+    )
+
+
+def motion_energy(
+    landmarks: np.ndarray, hand_rows: Sequence[int], smoothing: int = 1
+) -> np.ndarray:
+    """
+    Returns how far the hands move in each frame.
+
+    The energy of frame t is the mean x, y distance its detected hand
+    landmarks moved since frame t - 1, the frame-to-frame delta Preprocess
+    computes as dx, and 0 where no hand was detected in either frame.
+
+    Args:
+        landmarks (np.ndarray): The landmarks of shape (T, rows, 3), NaN where nothing was detected.
+        hand_rows (Sequence[int]): The rows of both hands in the layout.
+        smoothing (int, optional): The length of the moving average applied to the energy, in frames, shorter at the ends of the sequence. Defaults to 1, none.
+
+    Returns:
+        np.ndarray: The (T,) float32 motion energy.
+    """
+    hands = landmarks[:, hand_rows, :2]
+    steps = np.linalg.norm(hands[1:] - hands[:-1], axis=-1)
+    detected = ~np.isnan(steps)
+    energy = np.zeros(len(landmarks), dtype=np.float32)
+    energy[1:] = np.where(detected, steps, 0).sum(axis=1) / np.maximum(
+        detected.sum(axis=1), 1
+    )
+    if smoothing > 1:
+        # A centered moving average, over the frames that exist near the ends.
+        starts = np.arange(len(energy)) - smoothing // 2
+        bounds = np.stack([starts, starts + smoothing], axis=1)
+        energy = window_means(energy, np.clip(bounds, 0, len(energy)))
+    return energy.astype(np.float32)
+
+
+def motion_windows(energy: np.ndarray, min_length: int, max_length: int) -> np.ndarray:
+    """
+    Cuts a sequence into windows at the valleys of its motion energy.
+
+    A frame is a valley when no frame within min_length // 2 of it has lower
+    energy. Windows run from valley to valley, skipping valleys that would
+    leave a window shorter than min_length or that the hands did not move
+    up to, as along a still stretch. Windows longer than max_length are
+    split evenly.
+
+    Args:
+        energy (np.ndarray): The (T,) energy of each frame, see motion_energy.
+        min_length (int): The minimum number of frames per window, unless the sequence is shorter.
+        max_length (int): The maximum number of frames per window, at least min_length.
+
+    Returns:
+        np.ndarray: The [start, end) frame of each window, of shape (N, 2), in order and covering the sequence.
+    """
+    if min_length < 1 or max_length < min_length:
+        raise ValueError(f"Invalid window lengths {min_length} and {max_length}")
+    length = len(energy)
+    if length == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    radius = min_length // 2
+    lowest = np.lib.stride_tricks.sliding_window_view(
+        np.pad(energy, radius, mode="edge"), 2 * radius + 1
+    ).min(axis=-1)
+    cuts = [0]
+    for valley in np.flatnonzero(energy <= lowest):
+        if (
+            valley - cuts[-1] >= min_length
+            and length - valley >= min_length
+            and energy[cuts[-1] : valley].max() > energy[valley]
+        ):
+            cuts.append(int(valley))
+    cuts.append(length)
+
+    bounds = []
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        pieces = -(-(end - start) // max_length)
+        edges = np.linspace(start, end, pieces + 1).round().astype(int)
+        bounds.extend(zip(edges[:-1], edges[1:]))
+    return np.array(bounds, dtype=np.int64).reshape(-1, 2)
@@ -0,0 +1,1448 @@
+import argparse
+import cv2
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import h5py
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+from config import (
+    CASCADE_DIM,
+    CASCADE_MIN_MARGIN,
+    FILE_PATH,
+    NUMBER_OF_FRAMES,
+    INFERENCE_THREADS,
+    LENGTH_BUCKETS,
+    LHAND,
+    MIN_HAND_COVERAGE,
+    MIN_MOTION_ENERGY,
+    MODEL_PATHS,
+    RHAND,
+    ROWS_PER_FRAME,
+    TARGET_FPS,
+    WINDOW_SECONDS,
+    WINDOW_STRIDE_SECONDS,
+)
+from detection.landmarks import (
+    POSE_ROWS,
+    results_to_array,
+    results_to_compact,
+)
+from models.cache import PredictionCache
+from models.cascade import CascadeModel
+from models.export import (
+    calibration_windows,
+    export_onnx,
+    export_tflite,
+    load_landmarks,
+)
+from models.ensemble import ENSEMBLE_MODES
+from models.model import PRECISIONS, Model, cpu_supports
+from models.windowing import pad_windows, sliding_windows
+from models.streaming import StreamingModel
+from tests.holistic import (
+    legacy_extract_keypoints,
+    loop_extract_keypoints,
+    make_holistic_results,
+)
+
+WEIGHTS_PATH = MODEL_PATHS["keras"]
+
+
+def time_call(fn: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """
+    Time a callable.
+
+    Args:
+        fn (Callable[[], Any]): The callable to time.
+        number (int): The number of calls per measurement.
+        repeat (int, optional): The number of measurements. Defaults to 5.
+
+    Returns:
+        float: The best time per call in microseconds.
+    """
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_landmarks(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare Holistic results to array conversions.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        Dict[str, float]: Microseconds per frame for each implementation.
+    """
+    results = make_holistic_results()
+    out = np.empty_like(results_to_array(results))
+
+    timings = {
+        "legacy_objects": time_call(
+            lambda: legacy_extract_keypoints(results), args.number
+        ),
+        "per_landmark_loop": time_call(
+            lambda: loop_extract_keypoints(results, out), args.number
+        ),
+        "results_to_array": time_call(
+            lambda: results_to_array(results, out), args.number
+        ),
+    }
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/frame")
+    return timings
+
+
+def make_windows(count: int, length: int = NUMBER_OF_FRAMES) -> np.ndarray:
+    """
+    Build landmark windows from the recorded test keypoints and fake results.
+
+    The recorded frame is jittered to fill a window; the fake results drop
+    the left hand in every other frame.
+
+    Args:
+        count (int): The number of windows.
+        length (int, optional): The number of frames per window. Defaults to NUMBER_OF_FRAMES.
+
+    Returns:
+        np.ndarray: The windows of shape (count, length, ROWS_PER_FRAME, 3).
+    """
+    rng = np.random.default_rng(0)
+    recorded = pd.read_csv(FILE_PATH + "/tests/test_keypoints.csv")
+    frame = recorded[["x", "y", "z"]].to_numpy(dtype=np.float32)
+    windows = []
+    for i in range(count):
+        if i % 2 == 0:
+            noise = rng.normal(0, 0.01, (length,) + frame.shape)
+            windows.append((frame + noise).astype(np.float32))
+        else:
+            windows.append(
+                np.stack(
+                    [
+                        results_to_array(make_holistic_results(i * length + t, t % 2))
+                        for t in range(length)
+                    ]
+                )
+            )
+    return np.stack(windows)
+
+
+def bench_compact(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare compact extraction with the full layout.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        Dict[str, float]: Microseconds per frame for each extraction mode.
+    """
+    results = make_holistic_results()
+    full = results_to_array(results)
+    compact = results_to_compact(results)
+
+    timings = {
+        "results_to_array": time_call(lambda: results_to_array(results, full), 200),
+        "results_to_compact": time_call(
+            lambda: results_to_compact(results, compact), 200
+        ),
+    }
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/frame")
+    print(f"[INFO]: bytes per frame {full.nbytes} full, {compact.nbytes} compact")
+    return timings
+
+
+def bench_streaming(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time streaming inference against recomputing a full window on every frame.
+
+    Streaming only approximates the full-window model, see StreamingModel, so
+    the deviation of its logits and its top-1 agreement are reported; the
+    exact conv and attention steps are checked in tests/test_streaming.py.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Microseconds per frame for each mode.
+    """
+    model = Model(model_path=args.weights)
+    model.__load__()
+
+    streaming = StreamingModel(model)
+    windows = make_windows(args.windows)
+    max_diff, agree = 0.0, 0
+    for window in windows:
+        expected = model.predict_logits(window[None])[0]
+        streaming.reset()
+        for frame in window:
+            streaming.push(frame)
+        actual = streaming.finish()
+        max_diff = max(max_diff, float(np.max(np.abs(expected - actual))))
+        agree += int(np.argmax(expected) == np.argmax(actual))
+    print(
+        f"[INFO]: {args.windows} windows, max logit difference {max_diff:.2e}, "
+        f"top-1 agreement {agree}/{args.windows}"
+    )
+
+    frames = iter(np.concatenate(windows))
+    window = windows[0][None]
+    timings = {
+        "full_window": time_call(lambda: model.predict_logits(window), 20),
+        "streaming": time_call(lambda: streaming.push(next(frames)), 20),
+    }
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/frame")
+    return timings
+
+
+def graph_ops(model: Model) -> int:
+    """
+    Count the ops of the traced batched ensemble, including nested functions.
+
+    Args:
+      model (Model): A loaded keras backend model.
+
+    Returns:
+      int: The number of ops.
+    """
+    graph = model.tflite_keras_model.batch.get_concrete_function().graph.as_graph_def()
+    return len(graph.node) + sum(len(f.node_def) for f in graph.library.function)
+
+
+def bench_fold(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare the folded inference graph with the trained graph.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Microseconds per call for each graph and batch size.
+    """
+    trained = Model(model_path=args.weights, fold=False)
+    folded = Model(model_path=args.weights, fold=True)
+    trained.__load__()
+    folded.__load__()
+    for name, model in (("trained", trained), ("folded", folded)):
+        print(
+            f"[INFO]: {name} graph: "
+            f"{len(model.networks[0].layers)} layers, "
+            f"{graph_ops(model)} ops"
+        )
+
+    windows = make_windows(args.windows)
+    timings = {}
+    for name, model in (("trained", trained), ("folded", folded)):
+        timings[f"{name}_1_window"] = time_call(
+            lambda: model.predict_logits(windows[:1]), 20
+        )
+        timings[f"{name}_{args.windows}_windows"] = time_call(
+            lambda: model.predict_logits(windows), 5
+        )
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/call")
+    return timings
+
+
+def bench_buckets(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare length-bucketed inference with running every window length as is.
+
+    Windows of many lengths are scored one at a time, as a video's last
+    window or adaptive windows would be. The first pass over the lengths
+    shows the cost of shapes a runtime has not seen yet, the second the
+    steady state.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per window for each mode and pass.
+    """
+    windows = make_windows(2, length=128).reshape(-1, ROWS_PER_FRAME, 3)
+    lengths = [1, 3, 7, 12, 20, 29, 30, 41, 57, 90, 128]
+    timings = {}
+    for name, buckets in (("unbucketed", ()), ("bucketed", LENGTH_BUCKETS)):
+        start = time.perf_counter()
+        model = Model(model_path=args.weights, buckets=buckets)
+        model.__load__()
+        print(f"[INFO]: {name} load {time.perf_counter() - start:.2f} s")
+        for run in ("first", "second"):
+            start = time.perf_counter()
+            for n in lengths:
+                model.predict_logits(windows[None, :n])
+            seconds = time.perf_counter() - start
+            timings[f"{name}_{run}_pass"] = seconds / len(lengths) * 1e3
+        metrics = model.metrics()
+        print(
+            f"[INFO]: {name} {len(metrics['buckets'])} shapes, "
+            f"{metrics['traces']} traces, {metrics['retraces']} after warmup"
+        )
+    for name, ms in timings.items():
+        print(f"[INFO]: {name:<24} {ms:8.2f} ms/window")
+    return timings
+
+
+def bench_xla(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare XLA-compiled bucket functions with the traced graph.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Microseconds per call for each mode and batch size.
+    """
+    windows = make_windows(args.windows)
+    models = {}
+    for name, xla in (("graph", False), ("xla", True)):
+        start = time.perf_counter()
+        models[name] = Model(model_path=args.weights, xla=xla)
+        models[name].__load__()
+        print(
+            f"[INFO]: {name} load and warmup {time.perf_counter() - start:.2f} s, "
+            f"xla {models[name].metrics()['xla']}"
+        )
+
+    batch, lengths = pad_windows(
+        [w[: NUMBER_OF_FRAMES - i % 7] for i, w in enumerate(windows)]
+    )
+    expected = models["graph"].predict_logits(batch, lengths)
+    actual = models["xla"].predict_logits(batch, lengths)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    print(f"[INFO]: {args.windows} windows, max logit difference {max_diff:.2e}")
+
+    timings = {}
+    for name, model in models.items():
+        timings[f"{name}_1_window"] = time_call(
+            lambda: model.predict_logits(windows[:1]), 20
+        )
+        timings[f"{name}_{args.windows}_windows"] = time_call(
+            lambda: model.predict_logits(windows), 5
+        )
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/call")
+    return timings
+
+
+def bench_precision(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare 16-bit compute precisions with float32 on a fixed evaluation set.
+
+    The set is the seeded make_windows windows plus the windows of any
+    --recordings. Each precision runs in the traced graph and compiled by
+    XLA; precisions the CPU has no native support for are skipped.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Windows per second for each precision and mode.
+    """
+    paths = sorted({p for pattern in args.recordings for p in glob.glob(pattern)})
+    windows = list(make_windows(args.windows)) + calibration_windows(paths)
+    batch, lengths = pad_windows(windows)
+    print(f"[INFO]: {len(windows)} windows, {len(paths)} recordings")
+
+    timings, expected = {}, None
+    for precision in PRECISIONS:
+        if not cpu_supports(precision):
+            print(f"[INFO]: {precision} skipped, no native support on this CPU")
+            continue
+        for xla in (False, True):
+            name = f"{precision}_{'xla' if xla else 'graph'}"
+            model = Model(
+                model_path=args.weights,
+                buckets=sorted(set(lengths)),
+                xla=xla,
+                precision=precision,
+            )
+            model.__load__()
+            logits = model.predict_logits(batch, lengths)
+            if expected is None:
+                expected = logits
+            _, expected_probs = model.decode(expected)
+            _, probs = model.decode(logits)
+            seconds = min(
+                timeit.repeat(
+                    lambda: model.predict_logits(batch, lengths), number=1, repeat=3
+                )
+            )
+            timings[name] = len(windows) / seconds
+            print(
+                f"[INFO]: {name:<16} top-1 agreement "
+                f"{np.mean(np.argmax(expected, -1) == np.argmax(logits, -1)):.3f}, "
+                f"max logit difference {np.max(np.abs(expected - logits)):.2e}, "
+                f"mean top-1 probability difference "
+                f"{np.mean(np.abs(expected_probs - probs)):.2e}, "
+                f"{timings[name]:.0f} windows/s"
+            )
+    return timings
+
+
+def bench_ensemble(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare the ensemble modes of the --members checkpoints with the sequential one.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per call of one and of --windows windows for each mode.
+    """
+    members = args.members or [args.weights]
+    paths = sorted({p for pattern in args.recordings for p in glob.glob(pattern)})
+    windows = list(make_windows(args.windows)) + calibration_windows(paths)
+    batch, lengths = pad_windows(windows)
+    print(f"[INFO]: {len(members)} members, {len(windows)} windows")
+
+    timings, expected = {}, None
+    for mode in ENSEMBLE_MODES:
+        model = Model(
+            model_path=members, buckets=sorted(set(lengths) | {1}), ensemble=mode
+        )
+        model.__load__()
+        logits = model.predict_logits(batch, lengths)
+        if expected is None:
+            expected = logits
+        for name, count in (("1", 1), (str(args.windows), args.windows)):
+            seconds = min(
+                timeit.repeat(
+                    lambda: model.predict_logits(batch[:count], lengths[:count]),
+                    number=10,
+                    repeat=3,
+                )
+            )
+            timings[f"{mode}_{name}"] = seconds / 10 * 1e3
+        print(
+            f"[INFO]: {mode:<10} top-1 agreement "
+            f"{np.mean(np.argmax(expected, -1) == np.argmax(logits, -1)):.3f}, "
+            f"max logit difference {np.max(np.abs(expected - logits)):.2e}, "
+            f"{timings[f'{mode}_1']:.2f} ms for 1 window, "
+            f"{timings[f'{mode}_{args.windows}']:.2f} ms for {args.windows}"
+        )
+    return timings
+
+
+def bench_cascade(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Sweep the cascade thresholds between the --weights model and the --large model.
+
+    Both models score the whole evaluation set once; each threshold pair is
+    then replayed on those logits. Accuracy is reported as top-1 agreement
+    with the large model and latency is estimated from the per-window cost
+    of each model. The configured thresholds also run through CascadeModel.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: The escalation rate of each threshold pair.
+    """
+    paths = sorted({p for pattern in args.recordings for p in glob.glob(pattern)})
+    windows = list(make_windows(args.windows)) + calibration_windows(paths)
+    batch, lengths = pad_windows(windows)
+    buckets = sorted(set(lengths))
+    print(f"[INFO]: {len(windows)} windows, {len(paths)} recordings")
+
+    small = Model(model_path=args.weights, buckets=buckets)
+    large = Model(model_path=args.large, buckets=buckets, dim=CASCADE_DIM)
+    costs, logits = {}, {}
+    for name, model in (("small", small), ("large", large)):
+        model.__load__()
+        logits[name] = model.predict_logits(batch, lengths)
+        seconds = min(
+            timeit.repeat(
+                lambda: model.predict_logits(batch, lengths), number=1, repeat=3
+            )
+        )
+        costs[name] = seconds / len(windows) * 1e3
+        print(f"[INFO]: {name} model {costs[name]:.2f} ms/window")
+
+    expected = np.argmax(logits["large"], -1)
+    rates = {}
+    for min_probability in args.thresholds:
+        for min_margin in (0.0, CASCADE_MIN_MARGIN):
+            cascade = CascadeModel(small, large, min_probability, min_margin)
+            escalate = cascade.escalate(logits["small"])
+            predicted = np.where(escalate, expected, np.argmax(logits["small"], -1))
+            name = f"p{min_probability:g}_m{min_margin:g}"
+            rates[name] = float(np.mean(escalate))
+            print(
+                f"[INFO]: min probability {min_probability:<5g} "
+                f"min margin {min_margin:<5g} escalation rate {rates[name]:.3f}, "
+                f"agreement with the large model {np.mean(predicted == expected):.3f}, "
+                f"~{costs['small'] + rates[name] * costs['large']:.2f} ms/window"
+            )
+
+    cascade = CascadeModel(small, large)
+    cascade.predict_logits(batch, lengths)
+    for key, value in cascade.metrics()["cascade"].items():
+        print(f"[INFO]: {key:<20} {value}")
+    return rates
+
+
+def idle_recordings(args: argparse.Namespace) -> List[np.ndarray]:
+    """
+    Loads the --recordings, each followed by as many idle frames without hands.
+
+    The idle frames stand in for the idle stretches of a lecture-style video.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      List[np.ndarray]: The (T, ROWS_PER_FRAME, 3) recordings.
+    """
+    paths = sorted({p for pattern in args.recordings for p in glob.glob(pattern)})
+    recordings = []
+    for path in paths or [FILE_PATH + "/tests/test_keypoints.csv"]:
+        data = load_landmarks(path)
+        idle = np.repeat(data[-1:], len(data), axis=0)
+        idle[:, LHAND + RHAND] = np.nan
+        recordings.append(np.concatenate([data, idle]))
+    return recordings
+
+
+def time_windows(
+    model: Model, recordings: List[np.ndarray], **kwargs: Any
+) -> Tuple[float, List[np.ndarray], List[np.ndarray]]:
+    """
+    Times predict_windows over recordings.
+
+    Args:
+      model (Model): The loaded model.
+      recordings (List[np.ndarray]): The recordings, see idle_recordings.
+      **kwargs (Any): The predict_windows arguments.
+
+    Returns:
+      Tuple[float, List[np.ndarray], List[np.ndarray]]: The milliseconds per recording and the logits and timestamps of each recording.
+    """
+    outputs = [model.predict_windows(r, 30, **kwargs) for r in recordings]
+    seconds = min(
+        timeit.repeat(
+            lambda: [model.predict_windows(r, 30, **kwargs) for r in recordings],
+            number=1,
+            repeat=3,
+        )
+    )
+    return (
+        seconds / len(recordings) * 1e3,
+        [logits for logits, _ in outputs],
+        [timestamps for _, timestamps in outputs],
+    )
+
+
+def bench_gate(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time sliding windows over the --recordings with the gates off, with the hand gate and with a --motion-energy gate as well.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per recording of each gating.
+    """
+    model = Model(model_path=args.weights)
+    model.__load__()
+    recordings = idle_recordings(args)
+
+    timings, outputs = {}, {}
+    for name, coverage, energy in (
+        ("ungated", 0.0, 0.0),
+        ("hands", MIN_HAND_COVERAGE, 0.0),
+        ("gated", MIN_HAND_COVERAGE, args.motion_energy),
+    ):
+        timings[name], outputs[name], _ = time_windows(
+            model,
+            recordings,
+            adaptive=False,
+            min_hand_coverage=coverage,
+            min_motion_energy=energy,
+        )
+        skipped = sum(int(np.isnan(o[:, 0]).sum()) for o in outputs[name])
+        windows = sum(len(o) for o in outputs[name])
+        print(
+            f"[INFO]: {name:<8} {timings[name]:.1f} ms/recording, "
+            f"skipped {skipped} of {windows} windows"
+        )
+
+    ran = [~np.isnan(g[:, 0]) for g in outputs["gated"]]
+    diff = max(
+        (np.max(np.abs(u[r] - g[r]), initial=0.0))
+        for u, g, r in zip(outputs["ungated"], outputs["gated"], ran)
+    )
+    print(f"[INFO]: max logit difference on the windows that ran {diff:.2e}")
+    return timings
+
+
+def bench_adaptive(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare sliding windows with windows cut at motion valleys over the --recordings.
+
+    Both run with the configured gates. Entries are the timeline
+    predict_video keeps once consecutive duplicates are dropped.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per recording of each windowing.
+    """
+    model = Model(model_path=args.weights)
+    model.__load__()
+    recordings = idle_recordings(args)
+
+    timings = {}
+    for name, adaptive in (("sliding", False), ("adaptive", True)):
+        timings[name], logits, timestamps = time_windows(
+            model, recordings, adaptive=adaptive
+        )
+        for i, (scores, t) in enumerate(zip(logits, timestamps)):
+            words, _ = model.decode(scores)
+            entries = [w for j, w in enumerate(words) if j == 0 or w != words[j - 1]]
+            ran = int((~np.isnan(scores[:, 0])).sum())
+            print(
+                f"[INFO]: {name:<8} recording {i}: {ran} "
+                f"model calls of {len(scores)} windows, {len(entries)} timeline entries, "
+                f"cuts at {np.round(t[1:, 0], 2).tolist()} s"
+            )
+        print(f"[INFO]: {name:<8} {timings[name]:.1f} ms/recording")
+    return timings
+
+
+def bench_cache(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time reprocessing the --recordings with the prediction cache.
+
+    The recordings run cold, again, as a new video that shares their first
+    windows as an intro, and through a fresh model that loads the saved
+    cache. Last, a copy of the weights with one value changed must not hit.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per recording of each pass.
+    """
+    recordings = idle_recordings(args)
+    intro = round(2 * WINDOW_STRIDE_SECONDS * 30)
+    shared = [
+        np.concatenate([r[:intro], r[intro:][::-1]])
+        for r in recordings
+        if len(r) > intro
+    ]
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        weights = os.path.join(tmp, os.path.basename(args.weights))
+        shutil.copy(args.weights, weights)
+
+        def run(model: Model, name: str, data: List[np.ndarray]) -> None:
+            before = model.cache.metrics()
+            start = time.perf_counter()
+            for r in data:
+                model.predict_windows(r, 30, adaptive=False)
+            timings[name] = (time.perf_counter() - start) / len(data) * 1e3
+            model.cache.save()
+            after = model.cache.metrics()
+            print(
+                f"[INFO]: {name:<9} {timings[name]:.1f} ms/recording, "
+                f"{after['hits'] - before['hits']} hits, "
+                f"{after['misses'] - before['misses']} misses, "
+                f"{after['entries']} entries, {after['bytes']} bytes"
+            )
+
+        def load() -> Model:
+            model = Model(model_path=weights)
+            model.cache = PredictionCache(path=os.path.join(tmp, "cache.npz"))
+            model.__load__()
+            return model
+
+        model = load()
+        run(model, "cold", recordings)
+        run(model, "again", recordings)
+        run(model, "intro", shared)
+        run(load(), "reloaded", recordings)
+
+        with h5py.File(weights, "r+") as f:
+            datasets = []
+            f.visititems(
+                lambda name, item: (
+                    datasets.append(item) if isinstance(item, h5py.Dataset) else None
+                )
+            )
+            datasets[-1][(0,) * datasets[-1].ndim] += 1
+        run(load(), "retrained", recordings)
+    return timings
+
+
+def bench_tflite(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare the tflite backend with the keras backend.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Microseconds per call for each backend and batch size.
+    """
+    keras_model = Model(model_path=args.weights)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.tflite")
+        size = export_tflite(keras_model, path)
+        tflite_model = Model(path, backend="tflite", num_threads=args.threads)
+        tflite_model.__load__()
+    print(f"[INFO]: exported {size / 1e6:.1f} MB, {args.threads} threads")
+
+    windows = make_windows(args.windows)
+    timings = {}
+    for name, model in (("keras", keras_model), ("tflite", tflite_model)):
+        timings[f"{name}_1_window"] = time_call(
+            lambda: model.predict_logits(windows[:1]), 20
+        )
+        timings[f"{name}_{args.windows}_windows"] = time_call(
+            lambda: model.predict_logits(windows), 5
+        )
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/call")
+    return timings
+
+
+# Loads a model in a fresh worker-like process and reports what it cost.
+WORKER_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from models.runtime import create_model
+model = create_model(sys.argv[1], backend=sys.argv[2])
+model.__load__()
+model.predict_array(model.load_relevant_data_csv(
+    __import__("pandas").read_csv(sys.argv[3], usecols=["x", "y", "z"])))
+peak = [l for l in open("/proc/self/status") if l.startswith("VmHWM")][0]
+print(time.perf_counter() - start, int(peak.split()[1]) / 1024,
+      "tensorflow" in sys.modules)
+"""
+
+
+def bench_onnx(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Compare the onnx backend with the keras backend.
+
+    Besides call latency, each backend is started in a fresh
+    process the way a worker would be, to measure startup time, peak
+    resident memory and whether TensorFlow was imported.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Microseconds per call for each backend and batch size.
+    """
+    keras_model = Model(model_path=args.weights)
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "model.onnx")
+    size = export_onnx(keras_model, path)
+    onnx_model = Model(path, backend="onnx", num_threads=args.threads)
+    print(f"[INFO]: exported {size / 1e6:.1f} MB, {args.threads} threads")
+
+    windows = make_windows(args.windows)
+    timings = {}
+    for name, model in (("keras", keras_model), ("onnx", onnx_model)):
+        timings[f"{name}_1_window"] = time_call(
+            lambda: model.predict_logits(windows[:1]), 20
+        )
+        timings[f"{name}_{args.windows}_windows"] = time_call(
+            lambda: model.predict_logits(windows), 5
+        )
+    for name, us in timings.items():
+        print(f"[INFO]: {name:<20} {us:10.1f} us/call")
+
+    csv = FILE_PATH + "/tests/test_keypoints.csv"
+    for backend, model_path in (("keras", args.weights), ("onnx", path)):
+        seconds, rss, tensorflow = subprocess.run(
+            [sys.executable, "-c", WORKER_SCRIPT, model_path, backend, csv],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()[-3:]
+        print(
+            f"[INFO]: {backend} worker: first prediction after {float(seconds):.2f} s, "
+            f"peak RSS {float(rss):.0f} MB, TensorFlow imported: {tensorflow}"
+        )
+    os.remove(path)
+    os.rmdir(tmp)
+    return timings
+
+
+# Loads a keras backend model in a fresh process, optionally from compiled
+# artifacts, and reports the seconds to a ready model and its call latency.
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import numpy as np
+from models.model import Model
+model = Model(sys.argv[1], compiled_dir=sys.argv[2] or None)
+model.__load__()
+seconds = time.perf_counter() - start
+windows = np.load(sys.argv[3])
+passes = []
+for _ in range(2):
+    call = time.perf_counter()
+    for size in range(1, len(windows)):
+        model.predict_logits(windows[:size])
+    passes.append((time.perf_counter() - call) * 1e3)
+print(seconds, model.traces(), *passes)
+"""
+
+
+def bench_startup(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time a worker's startup with and without the compiled artifact cache.
+
+    Each startup runs in a fresh process, up to a warmed-up model: without
+    the cache, when it builds the networks and saves the artifact, and when
+    it restores the artifact. Each model then predicts every batch size below
+    --windows twice: the first pass includes any first call at a new shape,
+    the second is the steady state.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Seconds to a ready model for each startup.
+    """
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        windows = os.path.join(tmp, "windows.npy")
+        np.save(windows, make_windows(args.windows))
+        compiled = os.path.join(tmp, "compiled")
+        for name, compiled_dir in (
+            ("uncached", ""),
+            ("cold", compiled),
+            ("warm", compiled),
+        ):
+            seconds, traces, first, steady = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    STARTUP_SCRIPT,
+                    args.weights,
+                    compiled_dir,
+                    windows,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()[-4:]
+            timings[name] = float(seconds)
+            print(
+                f"[INFO]: {name:<8} ready after {timings[name]:.2f} s, {traces} traces, "
+                f"every batch size {float(first):.0f} ms first, {float(steady):.0f} ms after"
+            )
+        size = sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(compiled)
+            for f in files
+        )
+    print(f"[INFO]: artifact {size / 1e6:.1f} MB")
+    return timings
+
+
+# Sends batches to an InferenceServer from a fresh worker-like process and
+# reports when it started and finished, its latencies and its footprint.
+CLIENT_SCRIPT = """
+import json, sys, time
+import numpy as np
+from models.service import RemoteModel
+model = RemoteModel(sys.argv[1])
+model.__load__()
+windows = np.load(sys.argv[2])
+latencies = []
+start = time.time()
+for _ in range(int(sys.argv[3])):
+    call = time.perf_counter()
+    model.predict_logits(windows)
+    latencies.append((time.perf_counter() - call) * 1e3)
+end = time.time()
+peak = [l for l in open("/proc/self/status") if l.startswith("VmHWM")][0]
+print(json.dumps({"start": start, "end": end, "latencies": latencies,
+                  "rss": int(peak.split()[1]) / 1024,
+                  "tensorflow": "tensorflow" in sys.modules}))
+"""
+
+
+def bench_server(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Profile the inference server against a model loaded in the worker.
+
+    The in-process model serves --number batches of --windows windows. Then
+    scripts/serve.py serves the same batches, without a prediction cache, to
+    1, 2 and 4 concurrent client processes; requests that wait together are
+    merged into one model call. Reports throughput, latency percentiles and
+    the footprint of a client.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Windows per second of each setup.
+    """
+    windows = make_windows(args.windows)
+    model = Model(model_path=args.weights)
+    model.predict_logits(windows)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.number):
+        call = time.perf_counter()
+        model.predict_logits(windows)
+        latencies.append((time.perf_counter() - call) * 1e3)
+    timings = {"in_process": args.number * args.windows / (time.perf_counter() - start)}
+    expected = model.predict_logits(windows)
+
+    def report(name: str, latencies: List[float]) -> None:
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(
+            f"[INFO]: {name:<10} {timings[name]:7.1f} windows/s, "
+            f"latency p50 {p50:.1f} ms, p95 {p95:.1f} ms"
+        )
+
+    report("in_process", latencies)
+    with tempfile.TemporaryDirectory() as tmp:
+        socket = os.path.join(tmp, "inference.sock")
+        path = os.path.join(tmp, "windows.npy")
+        np.save(path, windows)
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "scripts.serve",
+                "--socket",
+                socket,
+                "--weights",
+                args.weights,
+                "--no-compact",
+                "--no-cache",
+            ],
+            cwd=FILE_PATH,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            from models.service import RemoteModel
+
+            remote = RemoteModel(socket)
+            max_diff = float(np.max(np.abs(remote.predict_logits(windows) - expected)))
+            remote.close()
+            print(f"[INFO]: max logit difference {max_diff:.2e}")
+            for clients in (1, 2, 4):
+                workers = [
+                    subprocess.Popen(
+                        [
+                            sys.executable,
+                            "-c",
+                            CLIENT_SCRIPT,
+                            socket,
+                            path,
+                            str(args.number),
+                        ],
+                        cwd=FILE_PATH,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL,
+                        text=True,
+                    )
+                    for _ in range(clients)
+                ]
+                results = [
+                    json.loads(w.communicate()[0].splitlines()[-1]) for w in workers
+                ]
+                name = f"{clients}_client" + ("s" if clients > 1 else "")
+                seconds = max(r["end"] for r in results) - min(
+                    r["start"] for r in results
+                )
+                timings[name] = clients * args.number * args.windows / seconds
+                report(name, [ms for r in results for ms in r["latencies"]])
+            print(
+                f"[INFO]: client peak RSS {results[0]['rss']:.0f} MB, "
+                f"TensorFlow imported: {results[0]['tensorflow']}"
+            )
+        finally:
+            server.terminate()
+            server.wait()
+    return timings
+
+
+def bench_pipeline(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time the video stages run one frame at a time against the threaded Pipeline.
+
+    Each run starts from a fresh Holistic, so every run must detect the same
+    landmarks. Per-stage timings show where the frames wait.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Frames per second of each setup.
+    """
+    from api.video import VideoPrediction
+
+    video = VideoPrediction()
+    model = SimpleNamespace(rows=ROWS_PER_FRAME, compact=False)
+    timings = {}
+    expected = None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.avi")
+        for name, threaded, workers in (
+            ("serial", False, 1),
+            ("threaded_1", True, 1),
+            ("threaded_2", True, 2),
+        ):
+            video.holistic = VideoPrediction.mp_holistic.Holistic(
+                min_detection_confidence=0.5, min_tracking_confidence=0.5
+            )
+            landmarks, _, metrics = video.extract_landmarks(
+                model, args.video, output, threaded=threaded, render_workers=workers
+            )
+            video.holistic.close()
+            if expected is None:
+                expected = landmarks.copy()
+            assert np.array_equal(landmarks, expected, equal_nan=True)
+            timings[name] = metrics["total"]["items_per_second"]
+            stages = ", ".join(
+                f"{stage} {m['busy_ms']:.1f}/{m.get('starved_ms', 0):.1f}/"
+                f"{m['blocked_ms']:.1f}"
+                for stage, m in metrics.items()
+                if stage != "total"
+            )
+            print(f"[INFO]: {name:<10} {timings[name]:6.1f} fps  {stages}")
+    print("[INFO]: per stage: busy/starved/blocked ms per frame")
+    return timings
+
+
+def bench_segments(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time segment-parallel landmark extraction against one pass over the video.
+
+    The pool is warmed up before timing. Landmarks of each split are compared
+    with the single pass: the share of frames with the same hands detected
+    and the largest hand landmark difference, with and without warmup frames.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Seconds per video of each setup.
+    """
+    from api.segments import extract_segments
+    from api.video import VideoPrediction
+
+    model = SimpleNamespace(rows=ROWS_PER_FRAME, compact=False)
+    hands = LHAND + RHAND
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.avi")
+        video = VideoPrediction()
+        start = time.perf_counter()
+        expected, _, _ = video.extract_landmarks(
+            model, args.video, output, threaded=False
+        )
+        timings["single"] = time.perf_counter() - start
+        print(f"[INFO]: single     {timings['single']:.2f} s, {len(expected)} frames")
+        for workers in (2, 4):
+            extract_segments(model, args.video, output, workers, NUMBER_OF_FRAMES)
+            for warmup in (0, 15):
+                start = time.perf_counter()
+                landmarks, _, metrics = extract_segments(
+                    model, args.video, output, workers, NUMBER_OF_FRAMES, warmup
+                )
+                name = f"{workers}_workers_warmup_{warmup}"
+                timings[name] = time.perf_counter() - start
+                frames = int(cv2.VideoCapture(output).get(cv2.CAP_PROP_FRAME_COUNT))
+                assert len(landmarks) == len(expected) == frames
+                missing = np.isnan(landmarks[:, hands, 0]).all(-1)
+                same = missing == np.isnan(expected[:, hands, 0]).all(-1)
+                diff = np.nanmax(np.abs(landmarks[:, hands] - expected[:, hands]))
+                print(
+                    f"[INFO]: {workers} workers, warmup {warmup:>2}: "
+                    f"{timings[name]:.2f} s, {metrics['total']['segments']} segments, "
+                    f"hands agree on {same.mean():.1%} of frames, "
+                    f"max hand difference {diff:.3f}"
+                )
+    return timings
+
+
+FRAME_SIZE = (1920, 1080)
+
+
+def sample_frames(video_path: str, count: int = 16) -> List[np.ndarray]:
+    """
+    Decode the first frames of a video, resized to FRAME_SIZE.
+
+    Args:
+      video_path (str): The video.
+      count (int, optional): The number of frames. Defaults to 16.
+
+    Returns:
+      List[np.ndarray]: The BGR frames.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, FRAME_SIZE))
+    cap.release()
+    return frames
+
+
+def queue_producer(video_path: str, number: int, frames: Any) -> None:
+    """
+    Send --number frames through a multiprocessing queue, which pickles each one.
+    """
+    sample = sample_frames(video_path)
+    for i in range(number):
+        frames.put(sample[i % len(sample)])
+    frames.put(None)
+
+
+def ring_producer(video_path: str, number: int, ring: Any) -> None:
+    """
+    Send --number frames through a FrameRing, copying each into a free slot.
+    """
+    sample = sample_frames(video_path)
+    for i in range(number):
+        slot = ring.acquire()
+        ring.frame(slot)[...] = sample[i % len(sample)]
+        ring.put(slot, i)
+    ring.finish()
+    ring.close()
+
+
+def bench_frames(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time passing decoded frames between processes through a queue and through shared memory.
+
+    A spawned producer sends --number 1080p frames to this process, which
+    reads a pixel of each, either through a multiprocessing Queue that
+    pickles every frame or through a FrameRing, which only passes slot
+    numbers. Then the video stages are run with the decoder in this process
+    and in a decoder process, which must detect the same landmarks.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Frames per second of each setup.
+    """
+    from multiprocessing import get_context
+    from api.video import VideoPrediction
+    from utils.shm_ring import FrameRing
+
+    context = get_context("spawn")
+    timings = {}
+    shape = (FRAME_SIZE[1], FRAME_SIZE[0], 3)
+
+    def report(name: str, seconds: float, waits: List[float]) -> None:
+        # The first frame waits for the producer to start, so it is not timed.
+        waits = waits[1:]
+        timings[name] = len(waits) / seconds
+        p50, p95 = np.percentile(waits, [50, 95])
+        print(
+            f"[INFO]: {name:<8} {timings[name]:7.1f} frames/s, "
+            f"wait per frame p50 {p50:.2f} ms, p95 {p95:.2f} ms"
+        )
+
+    frames = context.Queue(maxsize=6)
+    producer = context.Process(
+        target=queue_producer, args=(args.video, args.number, frames)
+    )
+    producer.start()
+    waits, begin = [], None
+    while True:
+        call = time.perf_counter()
+        frame = frames.get()
+        if frame is None:
+            break
+        frame[0, 0].sum()
+        waits.append((time.perf_counter() - call) * 1e3)
+        begin = begin or time.perf_counter()
+    report("queue", time.perf_counter() - begin, waits)
+    producer.join()
+
+    ring = FrameRing(6, shape, context=context)
+    producer = context.Process(
+        target=ring_producer, args=(args.video, args.number, ring)
+    )
+    producer.start()
+    waits, begin, call = [], None, time.perf_counter()
+    for _, slot, frame in ring.frames():
+        frame[0, 0].sum()
+        ring.release(slot)
+        waits.append((time.perf_counter() - call) * 1e3)
+        begin = begin or time.perf_counter()
+        call = time.perf_counter()
+    del frame
+    report("ring", time.perf_counter() - begin, waits)
+    producer.join()
+    ring.close()
+
+    video = VideoPrediction()
+    model = SimpleNamespace(rows=ROWS_PER_FRAME, compact=False)
+    expected = None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.avi")
+        for name, decoder in (("inline", False), ("decoder", True)):
+            video.holistic = VideoPrediction.mp_holistic.Holistic(
+                min_detection_confidence=0.5, min_tracking_confidence=0.5
+            )
+            landmarks, _, metrics = video.extract_landmarks(
+                model, args.video, output, decoder=decoder
+            )
+            video.holistic.close()
+            if expected is None:
+                expected = landmarks.copy()
+            assert np.array_equal(landmarks, expected, equal_nan=True)
+            timings[name] = metrics["total"]["items_per_second"]
+            print(
+                f"[INFO]: {name:<8} {timings[name]:7.1f} fps, "
+                f"decode {metrics['decode']['busy_ms']:.1f} ms, "
+                f"detect {metrics['detect']['busy_ms']:.1f} ms per frame"
+            )
+    return timings
+
+
+def bench_detection(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time Holistic at several detection resolutions against the landmarks it finds at full resolution.
+
+    The frames of --video are scaled up to 1080p and 4K to stand in for
+    phone uploads. For each source size, every frame is detected with a
+    fresh Holistic at full resolution and with its longest side scaled down
+    to each DETECTION_MAX_SIDE candidate. Reports the milliseconds per frame
+    of mediapipe_detection, the share of frames where the same hands are
+    found and the mean hand and pose landmark error in pixels of the source.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Milliseconds per frame of each source size and detection side.
+    """
+    from api.video import VideoPrediction
+
+    hands = LHAND + RHAND
+    pose = list(range(POSE_ROWS.start, POSE_ROWS.stop))
+    timings = {}
+    for source in ((1280, 720), (1920, 1080), (3840, 2160)):
+        expected = None
+        for side in (None, 1920, 1280, 960, 640):
+            if side is not None and side >= max(source):
+                continue
+            holistic = VideoPrediction.mp_holistic.Holistic(
+                min_detection_confidence=0.5, min_tracking_confidence=0.5
+            )
+            cap = cv2.VideoCapture(args.video)
+            landmarks, seconds = [], 0.0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if frame.shape[1::-1] != source:
+                    frame = cv2.resize(frame, source, interpolation=cv2.INTER_CUBIC)
+                start = time.perf_counter()
+                _, results = VideoPrediction.mediapipe_detection(
+                    frame, holistic, max_side=side
+                )
+                seconds += time.perf_counter() - start
+                landmarks.append(results_to_array(results))
+            cap.release()
+            holistic.close()
+            landmarks = np.stack(landmarks)
+            name = f"{source[1]}p_{side or 'full'}"
+            timings[name] = seconds / len(landmarks) * 1e3
+            if expected is None:
+                expected = landmarks
+            missing = np.isnan(landmarks[:, hands, 0]).all(-1)
+            same = missing == np.isnan(expected[:, hands, 0]).all(-1)
+            scale = np.array(source)
+            hand = np.nanmean(
+                np.linalg.norm(
+                    (landmarks[:, hands, :2] - expected[:, hands, :2]) * scale, axis=-1
+                )
+            )
+            body = np.nanmean(
+                np.linalg.norm(
+                    (landmarks[:, pose, :2] - expected[:, pose, :2]) * scale, axis=-1
+                )
+            )
+            print(
+                f"[INFO]: {source[1]:>4}p at {str(side or 'full'):>4}: "
+                f"{timings[name]:6.1f} ms/frame, hands agree on {same.mean():6.1%}, "
+                f"hand error {hand:5.1f} px, pose error {body:5.1f} px"
+            )
+    return timings
+
+
+def bench_sampling(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Time landmark extraction of the same clip at 30 and 60 fps, with and without sampling to TARGET_FPS.
+
+    The 60 fps clip repeats every frame of --video twice, like a phone
+    recording at double the frame rate. Sampled down, it must detect about
+    the frames of the original, so the landmarks are compared with a pass
+    over the original: the share of frames with the same hands detected.
+    Reports detection milliseconds per second of video and the number of
+    WINDOW_SECONDS windows.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+      Dict[str, float]: Seconds of extraction per second of video of each setup.
+    """
+    from api.video import VideoPrediction
+
+    video = VideoPrediction()
+    model = SimpleNamespace(rows=ROWS_PER_FRAME, compact=False)
+    hands = LHAND + RHAND
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.avi")
+        doubled = os.path.join(tmp, "doubled.mp4")
+        cap = cv2.VideoCapture(args.video)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        size = (int(cap.get(3)), int(cap.get(4)))
+        writer = cv2.VideoWriter(
+            doubled, cv2.VideoWriter_fourcc(*"mp4v"), 2 * fps, size
+        )
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+            writer.write(frame)
+        cap.release()
+        writer.release()
+        duration = int(cv2.VideoCapture(args.video).get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+
+        expected = None
+        for name, path, target in (
+            ("30fps", args.video, None),
+            ("60fps", doubled, None),
+            ("60fps_sampled", doubled, TARGET_FPS),
+        ):
+            video.holistic = VideoPrediction.mp_holistic.Holistic(
+                min_detection_confidence=0.5, min_tracking_confidence=0.5
+            )
+            start = time.perf_counter()
+            landmarks, rate, metrics = video.extract_landmarks(
+                model, path, output, threaded=False, target_fps=target
+            )
+            timings[name] = (time.perf_counter() - start) / duration
+            video.holistic.close()
+            if expected is None:
+                expected = landmarks.copy()
+            window = max(round(WINDOW_SECONDS * rate), 1)
+            stride = max(round(WINDOW_STRIDE_SECONDS * rate), 1)
+            windows = len(sliding_windows(landmarks, window, stride))
+            message = (
+                f"[INFO]: {name:<14} {len(landmarks):4d} frames at {rate:5.2f} fps, "
+                f"{timings[name]:.2f} s per second of video, "
+                f"detect {metrics['detect']['busy_ms'] * len(landmarks) / duration:5.0f} ms "
+                f"per second, {windows} windows of {window} frames"
+            )
+            if len(landmarks) == len(expected):
+                missing = np.isnan(landmarks[:, hands, 0]).all(-1)
+                same = missing == np.isnan(expected[:, hands, 0]).all(-1)
+                message += f", hands agree on {same.mean():.1%}"
+            print(message)
+    return timings
+
+
+BENCHMARKS = {
+    "landmarks": bench_landmarks,
+    "compact": bench_compact,
+    "streaming": bench_streaming,
+    "fold": bench_fold,
+    "buckets": bench_buckets,
+    "xla": bench_xla,
+    "precision": bench_precision,
+    "ensemble": bench_ensemble,
+    "cascade": bench_cascade,
+    "gate": bench_gate,
+    "adaptive": bench_adaptive,
+    "cache": bench_cache,
+    "tflite": bench_tflite,
+    "onnx": bench_onnx,
+    "startup": bench_startup,
+    "server": bench_server,
+    "pipeline": bench_pipeline,
+    "segments": bench_segments,
+    "frames": bench_frames,
+    "detection": bench_detection,
+    "sampling": bench_sampling,
+}
+
+
+def main() -> None:
+    """
+    Run a benchmark by name.
+    """
+    parser = argparse.ArgumentParser(description="SignSwift micro-benchmarks.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--weights", default=WEIGHTS_PATH)
+    parser.add_argument("--windows", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=INFERENCE_THREADS)
+    parser.add_argument(
+        "--recordings",
+        nargs="*",
+        default=[],
+        help="Landmark recordings (.csv or .npy, globs allowed) to add to evaluation sets.",
+    )
+    parser.add_argument(
+        "--members",
+        nargs="*",
+        default=[],
+        help="Checkpoints of the ensemble benchmark. Defaults to --weights alone.",
+    )
+    parser.add_argument(
+        "--large",
+        nargs="+",
+        default=[MODEL_PATHS["cascade"]],
+        help="Weights of the cascade benchmark's CASCADE_DIM model, or of an ensemble.",
+    )
+    parser.add_argument(
+        "--thresholds",
+        type=float,
+        nargs="+",
+        default=[0.3, 0.5, 0.7, 0.9],
+        help="Top-1 probability thresholds of the cascade benchmark.",
+    )
+    parser.add_argument(
+        "--motion-energy",
+        type=float,
+        default=MIN_MOTION_ENERGY or 0.002,
+        help="The MIN_MOTION_ENERGY candidate of the gate benchmark.",
+    )
+    parser.add_argument(
+        "--video",
+        default=os.path.join(FILE_PATH, "videos/APPLE GREEN YOU LIKE EAT.mp4"),
+        help="The video of the pipeline benchmark.",
+    )
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
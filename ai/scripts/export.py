@@ -0,0 +1,166 @@
+import argparse
+import glob
+import json
+import os
+import tempfile
+import timeit
+import numpy as np
+from typing import Any, Dict, List
+from config import COMPACT_EXTRACTION, FILE_PATH, MODEL_PATHS
+from models.export import (
+    QUANTIZATION_MODES,
+    calibration_windows,
+    export_onnx,
+    export_tflite,
+)
+from models.model import Model
+from models.windowing import pad_windows
+
+
+def export_tflite_command(args: argparse.Namespace) -> None:
+    """
+    Export the ensemble, Preprocess included, to a .tflite file.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+    """
+    model = Model(model_path=args.weights, compact=args.compact)
+    output = args.output or MODEL_PATHS["tflite"]
+    size = export_tflite(model, output)
+    print(f"[INFO] Wrote {output} ({size / 1e6:.1f} MB)")
+
+
+def export_onnx_command(args: argparse.Namespace) -> None:
+    """
+    Export the ensemble, Preprocess included, to an .onnx file.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+    """
+    model = Model(model_path=args.weights, compact=args.compact)
+    output = args.output or MODEL_PATHS["onnx"]
+    size = export_onnx(model, output)
+    print(f"[INFO] Wrote {output} ({size / 1e6:.1f} MB)")
+
+
+def compare_models(
+    reference: Model, candidate: Model, windows: List[np.ndarray]
+) -> Dict[str, Any]:
+    """
+    Compare the predictions and the latency of two models on the same windows.
+
+    Args:
+      reference (Model): The float model.
+      candidate (Model): The quantized model.
+      windows (List[np.ndarray]): The windows, each of shape (T_i, rows, 3).
+
+    Returns:
+      Dict[str, Any]: The top-1 agreement, logit and probability deviations and milliseconds per window of each model.
+    """
+    batch, lengths = pad_windows(windows)
+    expected = reference.predict_logits(batch, lengths)
+    actual = candidate.predict_logits(batch, lengths)
+    _, expected_probs = reference.decode(expected)
+    _, actual_probs = candidate.decode(actual)
+    report = {
+        "windows": len(windows),
+        "top1_agreement": float(
+            np.mean(np.argmax(expected, -1) == np.argmax(actual, -1))
+        ),
+        "max_logit_diff": float(np.max(np.abs(expected - actual))),
+        "mean_top1_prob_diff": float(np.mean(np.abs(expected_probs - actual_probs))),
+    }
+    for name, model in (("float", reference), ("quantized", candidate)):
+        one = batch[:1, : lengths[0]]
+        model.predict_logits(one)
+        seconds = min(
+            timeit.repeat(lambda: model.predict_logits(one), number=10, repeat=3)
+        )
+        report[f"{name}_ms_per_window"] = seconds / 10 * 1e3
+    return report
+
+
+def export_quantized_command(args: argparse.Namespace) -> None:
+    """
+    Quantize the ensemble and write the artifact with an accuracy and latency report.
+
+    The report is compared against the float tflite model. When the top-1
+    agreement is below --min-agreement the artifact is not written, so
+    serving keeps falling back to the float model.
+
+    Args:
+      args (argparse.Namespace): The parsed arguments.
+    """
+    paths = sorted({p for pattern in args.calibration for p in glob.glob(pattern)})
+    windows = calibration_windows(paths, compact=args.compact)
+    print(f"[INFO] {len(windows)} calibration windows from {len(paths)} files")
+
+    model = Model(model_path=args.weights, compact=args.compact)
+    output = args.output or MODEL_PATHS["quantized"]
+    with tempfile.TemporaryDirectory() as tmp:
+        float_path = os.path.join(tmp, "float.tflite")
+        quantized_path = os.path.join(tmp, "quantized.tflite")
+        float_size = export_tflite(model, float_path)
+        size = export_tflite(model, quantized_path, args.mode, windows)
+        float_model = Model(float_path, compact=args.compact, backend="tflite")
+        quantized_model = Model(quantized_path, compact=args.compact, backend="tflite")
+        report = {
+            "mode": args.mode,
+            "calibration": paths,
+            "float_bytes": float_size,
+            "quantized_bytes": size,
+            **compare_models(float_model, quantized_model, windows),
+        }
+        accepted = report["top1_agreement"] >= args.min_agreement
+        report["accepted"] = accepted
+        if accepted:
+            os.replace(quantized_path, output)
+
+    with open(output + ".json", "w") as f:
+        json.dump(report, f, indent=4)
+    for key, value in report.items():
+        if key != "calibration":
+            print(f"[INFO] {key:<22} {value}")
+    if accepted:
+        print(f"[INFO] Wrote {output} ({size / 1e6:.1f} MB)")
+    else:
+        print(
+            f"[INFO] Top-1 agreement below {args.min_agreement}, kept the float model"
+        )
+
+
+EXPORTS = {
+    "tflite": export_tflite_command,
+    "quantize": export_quantized_command,
+    "onnx": export_onnx_command,
+}
+
+
+def main() -> None:
+    """
+    Run an export by name.
+    """
+    parser = argparse.ArgumentParser(description="Export SignSwift models.")
+    parser.add_argument("format", choices=sorted(EXPORTS))
+    parser.add_argument("--weights", default=MODEL_PATHS["keras"])
+    parser.add_argument("--output", default=None)
+    parser.add_argument(
+        "--compact",
+        action=argparse.BooleanOptionalAction,
+        default=COMPACT_EXTRACTION,
+        help="Take the compact landmark layout, which the exported file fixes.",
+    )
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="int8")
+    parser.add_argument(
+        "--calibration",
+        nargs="+",
+        default=[os.path.join(FILE_PATH, "tests/test_keypoints.csv")],
+        help="Landmark recordings (.csv or .npy, globs allowed) to calibrate and evaluate on.",
+    )
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+    EXPORTS[args.format](args)
+
+
+if __name__ == "__main__":
+    main()
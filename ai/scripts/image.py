@@ -1,9 +1,9 @@
 import mediapipe as mp
 import cv2
 import numpy as np
-import pandas as pd
 from models.model import Model
 from config import FILE_PATH
+from detection.landmarks import results_to_array, results_to_compact
 
 mp_holistic = mp.solutions.holistic  # Holistic model
 mp_drawing = mp.solutions.drawing_utils  # Drawing utilities
@@ -74,127 +74,6 @@ def draw_styled_landmarks(image: np.ndarray, results) -> None:
     )
 
 
-def extract_keypoints(frame_id: str, results) -> pd.DataFrame:
-    """
-    Extract keypoints from the given detection results.
-
-    Args:
-        frame_id (str): The frame ID.
-        results: The detection results.
-
-    Returns:
-        pd.DataFrame: The extracted keypoints.
-    """
-    objects = []
-
-    # FACE
-    if results.face_landmarks:
-        for i, res in enumerate(results.face_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "face",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(468):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "face",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # LEFT
-    if results.left_hand_landmarks:
-        for i, res in enumerate(results.left_hand_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "left_hand",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(21):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "left_hand",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # POSE
-    if results.pose_landmarks:
-        for i, res in enumerate(results.pose_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "pose",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(33):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "pose",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # RIGHT
-    if results.right_hand_landmarks:
-        for i, res in enumerate(results.right_hand_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "right_hand",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(21):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "right_hand",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    df = pd.DataFrame(objects)
-    return df
-
-
 def predict_image(model: Model, frame: np.ndarray, file_path_output: str) -> None:
     """
     Predict the image using the provided model and save the result to the specified file path.
@@ -207,10 +86,10 @@ def predict_image(model: Model, frame: np.ndarray, file_path_output: str) -> Non
     image, results = mediapipe_detection(frame, holistic)
 
     draw_styled_landmarks(image, results)
-    df = extract_keypoints("1", results)
+    to_array = results_to_compact if model.compact else results_to_array
+    keypoints = to_array(results)
 
-    df_imp = df.drop(["frame", "type", "landmark_index"], axis=1)
-    prediction, _ = model.predict(df_imp)
+    prediction, _ = model.predict_array(keypoints[None])
 
     cv2.putText(
         image,
@@ -0,0 +1,64 @@
+import argparse
+import signal
+from config import (
+    COMPACT_EXTRACTION,
+    INFERENCE_BACKEND,
+    INFERENCE_CASCADE,
+    INFERENCE_QUANTIZED,
+    INFERENCE_SOCKET,
+    MODEL_PATHS,
+    PREDICTION_CACHE,
+)
+from models.runtime import create_model
+from models.service import InferenceServer
+
+
+def main() -> None:
+    """
+    Load the model once and serve it to the workers of this node.
+    """
+    parser = argparse.ArgumentParser(description="Serve the SignSwift model.")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET)
+    parser.add_argument("--backend", default=INFERENCE_BACKEND)
+    parser.add_argument(
+        "--weights",
+        default=None,
+        help="The model file of the backend. Defaults to the one QueueService loads.",
+    )
+    parser.add_argument(
+        "--compact",
+        action=argparse.BooleanOptionalAction,
+        default=COMPACT_EXTRACTION,
+        help="Take the compact landmark layout; workers must extract the same.",
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=PREDICTION_CACHE,
+        help="Memoize window logits, see PredictionCache.",
+    )
+    args = parser.parse_args()
+
+    quantized = INFERENCE_QUANTIZED and args.backend == "tflite"
+    model = create_model(
+        model_path=args.weights
+        or MODEL_PATHS["quantized" if quantized else args.backend],
+        compact=args.compact,
+        backend=args.backend,
+        fallback_path=MODEL_PATHS["tflite"] if quantized else None,
+        cascade_path=MODEL_PATHS["cascade"] if INFERENCE_CASCADE else None,
+        cache=args.cache,
+    )
+    server = InferenceServer(model, args.socket)
+    signal.signal(signal.SIGTERM, lambda *_: server.close())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(f"[INFO] Served {server.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,20 @@ import mediapipe as mp
 import cv2
 import json
 import numpy as np
-import pandas as pd
-from models.model import Model
-from config import FILE_PATH, PROMPT
+from models.predictor import Predictor
+from models.runtime import create_model
+from config import (
+    COMPACT_EXTRACTION,
+    DETECTION_MAX_SIDE,
+    FILE_PATH,
+    INFERENCE_SERVER,
+    INFERENCE_SOCKET,
+    PROMPT,
+    TARGET_FPS,
+    WINDOW_SECONDS,
+)
+from detection.frames import detection_input, read_frames, sampled_fps
+from detection.landmarks import LandmarkBuffer, results_to_array, results_to_compact
 import traceback
 from utils.mistral_api import MistralAPI
 from typing import Tuple, List, Dict, Union
@@ -26,17 +37,15 @@ def mediapipe_detection(
     Perform mediapipe detection on an image using the given model.
 
     Args:
-        image (np.ndarray): The input image.
+        image (np.ndarray): The input image, in BGR.
         model (mp.solutions.holistic.Holistic): The mediapipe holistic model.
 
     Returns:
-        Tuple[np.ndarray, mp.solutions.holistic.Holistic]: The processed image and the detection results.
+        Tuple[np.ndarray, mp.solutions.holistic.Holistic]: The input image, to draw on, and the detection results.
     """
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # COLOR CONVERSION BGR 2 RGB
-    image.flags.writeable = False  # Image is no longer writeable
-    results = model.process(image)  # Make prediction
-    image.flags.writeable = True  # Image is now writeable
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)  # COLOR COVERSION RGB 2 BGR
+    rgb = detection_input(image, DETECTION_MAX_SIDE)  # Scale down and convert to RGB
+    rgb.flags.writeable = False  # Image is no longer writeable
+    results = model.process(rgb)  # Make prediction
     return image, results
 
 
@@ -80,128 +89,6 @@ def draw_styled_landmarks(
     )
 
 
-def extract_keypoints(
-    frame_id: str, results: mp.solutions.holistic.Holistic
-) -> List[Dict[str, Union[str, float]]]:
-    """
-    Extract keypoints from the detection results.
-
-    Args:
-        frame_id (str): The frame ID.
-        results (mp.solutions.holistic.Holistic): The detection results.
-
-    Returns:
-        List[Dict[str, Union[str, float]]]: The extracted keypoints.
-    """
-    objects = []
-
-    # FACE
-    if results.face_landmarks:
-        for i, res in enumerate(results.face_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "face",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(468):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "face",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # LEFT
-    if results.left_hand_landmarks:
-        for i, res in enumerate(results.left_hand_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "left_hand",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(21):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "left_hand",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # POSE
-    if results.pose_landmarks:
-        for i, res in enumerate(results.pose_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "pose",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(33):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "pose",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    # RIGHT
-    if results.right_hand_landmarks:
-        for i, res in enumerate(results.right_hand_landmarks.landmark):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "right_hand",
-                    "landmark_index": i,
-                    "x": res.x,
-                    "y": res.y,
-                    "z": res.z,
-                }
-            )
-    else:
-        for i in range(21):
-            objects.append(
-                {
-                    "frame": frame_id,
-                    "type": "right_hand",
-                    "landmark_index": i,
-                    "x": np.nan,
-                    "y": np.nan,
-                    "z": np.nan,
-                }
-            )
-
-    return objects
-
-
 def save_sentence(sentence: List[str], file_path: str) -> None:
     """
     Save the sentence to a text file.
@@ -265,13 +152,13 @@ def get_current_duration(fps: float, frame_id: int) -> float:
 
 
 def predict_video(
-    model: Model, video_path: str, output_path: str
+    model: Predictor, video_path: str, output_path: str
 ) -> Tuple[List[Dict[str, Union[str, float]]], List[str]]:
     """
     Predict the sign language gestures in a video.
 
     Args:
-        model (Model): The sign language gesture recognition model.
+        model (Predictor): The sign language gesture recognition model.
         video_path (str): The path of the input video.
         output_path (str): The path to save the output video.
 
@@ -285,53 +172,53 @@ def predict_video(
     frame_height = int(cap.get(4))
 
     fourcc = cv2.VideoWriter_fourcc(*"XVID")
-    out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+    out = cv2.VideoWriter(
+        output_path,
+        fourcc,
+        sampled_fps(fps, TARGET_FPS),
+        (frame_width, frame_height),
+    )
 
-    sequence = []
     predictions = []
     sentence = []
-    NUMBER_OF_FRAMES = 30
-    frame_id = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    NUMBER_OF_FRAMES = max(round(WINDOW_SECONDS * sampled_fps(fps, TARGET_FPS)), 1)
+    sequence = LandmarkBuffer(capacity=NUMBER_OF_FRAMES, rows=model.rows)
+    to_array = results_to_compact if model.compact else results_to_array
+
+    def predict_sequence(frame_id: int) -> None:
+        print("[INFO]: Predicting")
+        prediction, max_prob = model.predict_array(sequence.view())
+
+        # Remove repeated words
+        if len(predictions) > 0 and prediction == predictions[-1]["word"]:
+            if max_prob > float(predictions[-1]["probability"]):
+                predictions[-1]["probability"] = str(max_prob)
+        else:
+            sentence.append(prediction)
+            predictions.append(
+                {
+                    "word": prediction,
+                    "probability": str(max_prob),
+                    "current_duration": str(
+                        round(get_current_duration(fps, frame_id), 2)
+                    ),
+                    "sentence_till_now": " ".join(sentence),
+                    "llm_prediction": mistral.call_mistral_api(
+                        PROMPT(" ".join(sentence))
+                    ),
+                }
+            )
+        sequence.clear()
 
+    frame_id = 0
+    for _, frame_id, frame in read_frames(cap, target_fps=TARGET_FPS):
         image, results = mediapipe_detection(frame, holistic)
         draw_styled_landmarks(image, results)
 
-        if len(sequence) < NUMBER_OF_FRAMES:
-            sequence.append(extract_keypoints(str(frame_id), results))
-        elif len(sequence) == NUMBER_OF_FRAMES:
-            seq_pred = []
-            for s in sequence:
-                seq_pred.extend(s)
-            df = pd.DataFrame(seq_pred)
-            df_imp = df.drop(["frame", "type", "landmark_index"], axis=1)
-
-            print("[INFO]: Predicting")
-            prediction, max_prob = model.predict(df_imp)
-
-            # Remove repeated words
-            if len(predictions) > 0 and prediction == predictions[-1]["word"]:
-                if max_prob > float(predictions[-1]["probability"]):
-                    predictions[-1]["probability"] = str(max_prob)
-            else:
-                sentence.append(prediction)
-                predictions.append(
-                    {
-                        "word": prediction,
-                        "probability": str(max_prob),
-                        "current_duration": str(
-                            round(get_current_duration(fps, frame_id), 2)
-                        ),
-                        "sentence_till_now": " ".join(sentence),
-                        "llm_prediction": mistral.call_mistral_api(
-                            PROMPT(" ".join(sentence))
-                        ),
-                    }
-                )
-            sequence = []
+        # Every frame goes into a window, including the one that completes it.
+        to_array(results, out=sequence.next_frame())
+        if len(sequence) == NUMBER_OF_FRAMES:
+            predict_sequence(frame_id + 1)
 
         cv2.putText(
             image,
@@ -345,7 +232,10 @@ def predict_video(
         )
 
         out.write(image)
-        frame_id += 1
+
+    # The model masks missing frames, so the last, shorter window is classified too.
+    if len(sequence) > 0:
+        predict_sequence(frame_id + 1)
 
     cap.release()
     out.release()
@@ -353,12 +243,12 @@ def predict_video(
     return predictions, sentence
 
 
-def main(model: Model, video_path: str, save_name: str) -> None:
+def main(model: Predictor, video_path: str, save_name: str) -> None:
     """
     Perform sign language gesture prediction on a video.
 
     Args:
-        model (Model): The sign language gesture recognition model.
+        model (Predictor): The sign language gesture recognition model.
         video_path (str): The path of the input video.
         save_name (str): The name to be used for saving the output files.
     """
@@ -392,8 +282,10 @@ def main(model: Model, video_path: str, save_name: str) -> None:
 
 
 if __name__ == "__main__":
-    model = Model(
-        model_path=FILE_PATH + "/weights/islr-fp16-192-8-seed42-foldall-last.h5"
+    model = create_model(
+        model_path=FILE_PATH + "/weights/islr-fp16-192-8-seed42-foldall-last.h5",
+        compact=COMPACT_EXTRACTION,
+        server=INFERENCE_SOCKET if INFERENCE_SERVER else None,
     )
     model.__load__()
     video_path = FILE_PATH + "/videos/APPLE GREEN YOU LIKE EAT.mp4"
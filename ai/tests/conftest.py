@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config import FILE_PATH, NUMBER_OF_FRAMES
+from models.model import Model
+from tests.weights import save_random_weights
+
+
+@pytest.fixture(scope="session")
+def weights(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """
+    Saves random weights, see save_random_weights.
+    """
+    path = tmp_path_factory.mktemp("weights") / "model.weights.h5"
+    return save_random_weights(str(path))
+
+
+@pytest.fixture(scope="session")
+def model(weights: str) -> Model:
+    """
+    Loads the random weights with the keras backend and the full layout.
+    """
+    model = Model(model_path=weights)
+    model.__load__()
+    return model
+
+
+@pytest.fixture(scope="session")
+def windows() -> np.ndarray:
+    """
+    Returns four windows of the recorded test keypoints, jittered frame by frame.
+    """
+    recorded = pd.read_csv(FILE_PATH + "/tests/test_keypoints.csv")
+    frame = recorded[["x", "y", "z"]].to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 0.01, (4, NUMBER_OF_FRAMES) + frame.shape)
+    return (frame + noise).astype(np.float32)
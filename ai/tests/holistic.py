@@ -0,0 +1,90 @@
+import numpy as np
+from types import SimpleNamespace
+from typing import Any
+from mediapipe.framework.formats import landmark_pb2
+from api.dto.landmark import LandMark
+from detection.landmarks import FACE_ROWS, LHAND_ROWS, POSE_ROWS, RHAND_ROWS
+
+
+def make_landmark_list(n: int, rng: np.random.Generator, visibility: bool = False):
+    """
+    Build a NormalizedLandmarkList with random coordinates.
+
+    Args:
+        n (int): The number of landmarks.
+        rng (np.random.Generator): The random generator.
+        visibility (bool, optional): Whether to fill visibility and presence, as pose landmarks do. Defaults to False.
+
+    Returns:
+        landmark_pb2.NormalizedLandmarkList: The landmark list.
+    """
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in rng.random((n, 3), dtype=np.float32):
+        landmark = landmarks.landmark.add(x=x, y=y, z=z)
+        if visibility:
+            landmark.visibility = 0.9
+            landmark.presence = 0.9
+    return landmarks
+
+
+def make_holistic_results(seed: int = 0, left_hand: bool = False) -> Any:
+    """
+    Build an object shaped like MediaPipe Holistic results.
+
+    Args:
+        seed (int, optional): The random seed. Defaults to 0.
+        left_hand (bool, optional): Whether the left hand is detected. Defaults to False.
+
+    Returns:
+        Any: The fake detection results.
+    """
+    rng = np.random.default_rng(seed)
+    return SimpleNamespace(
+        face_landmarks=make_landmark_list(468, rng),
+        left_hand_landmarks=make_landmark_list(21, rng) if left_hand else None,
+        pose_landmarks=make_landmark_list(33, rng, visibility=True),
+        right_hand_landmarks=make_landmark_list(21, rng),
+    )
+
+
+def legacy_extract_keypoints(results: Any) -> np.ndarray:
+    """
+    The original per-landmark extraction through LandMark objects and dicts.
+    """
+    objects = []
+    parts = (
+        (results.face_landmarks, FACE_ROWS),
+        (results.left_hand_landmarks, LHAND_ROWS),
+        (results.pose_landmarks, POSE_ROWS),
+        (results.right_hand_landmarks, RHAND_ROWS),
+    )
+    for landmarks, rows in parts:
+        if landmarks:
+            for i, res in enumerate(landmarks.landmark):
+                objects.append(LandMark().add(res.x, res.y, res.z, 0, "", i))
+        else:
+            for i in range(rows.stop - rows.start):
+                objects.append(LandMark().add(np.nan, np.nan, np.nan, 0, "", i))
+    rows = [o.to_dict() for o in objects]
+    return np.array([[r["x"], r["y"], r["z"]] for r in rows], dtype=np.float32)
+
+
+def loop_extract_keypoints(results: Any, out: np.ndarray) -> np.ndarray:
+    """
+    Per-landmark attribute reads written into a preallocated block.
+    """
+    parts = (
+        (results.face_landmarks, FACE_ROWS),
+        (results.left_hand_landmarks, LHAND_ROWS),
+        (results.pose_landmarks, POSE_ROWS),
+        (results.right_hand_landmarks, RHAND_ROWS),
+    )
+    for landmarks, rows in parts:
+        if landmarks:
+            for i, res in enumerate(landmarks.landmark, start=rows.start):
+                out[i, 0] = res.x
+                out[i, 1] = res.y
+                out[i, 2] = res.z
+        else:
+            out[rows] = np.nan
+    return out
@@ -0,0 +1,56 @@
+import h5py
+import numpy as np
+import shutil
+from typing import Optional
+from models.cache import PredictionCache
+from models.model import Model
+
+
+def cached_model(weights: str, path: Optional[str] = None) -> Model:
+    model = Model(model_path=weights, buckets=())
+    model.cache = PredictionCache(path=path)
+    model.__load__()
+    return model
+
+
+def test_cache_hit_matches_miss(
+    weights: str, model: Model, windows: np.ndarray
+) -> None:
+    data = windows.reshape(-1, *windows.shape[2:])
+    expected, bounds = model.predict_windows(data, 30, adaptive=False)
+    cached = cached_model(weights)
+    miss, _ = cached.predict_windows(data, 30, adaptive=False)
+    assert cached.cache.metrics()["hits"] == 0
+    hit, hit_bounds = cached.predict_windows(data, 30, adaptive=False)
+    assert cached.cache.metrics()["hits"] == len(bounds)
+    np.testing.assert_array_equal(hit, miss)
+    np.testing.assert_array_equal(hit_bounds, bounds)
+    np.testing.assert_allclose(miss, expected, atol=1e-5)
+
+
+def test_saved_cache_hits_only_its_weights(
+    tmp_path, weights: str, windows: np.ndarray
+) -> None:
+    data = windows.reshape(-1, *windows.shape[2:])
+    path = str(tmp_path / "cache.npz")
+    cached = cached_model(weights, path)
+    _, bounds = cached.predict_windows(data, 30, adaptive=False)
+    cached.cache.save()
+
+    reloaded = cached_model(weights, path)
+    reloaded.predict_windows(data, 30, adaptive=False)
+    assert reloaded.cache.metrics()["hits"] == len(bounds)
+
+    changed = str(tmp_path / "model.weights.h5")
+    shutil.copy(weights, changed)
+    with h5py.File(changed, "r+") as f:
+        datasets = []
+        f.visititems(
+            lambda name, item: (
+                datasets.append(item) if isinstance(item, h5py.Dataset) else None
+            )
+        )
+        datasets[-1][(0,) * datasets[-1].ndim] += 1
+    retrained = cached_model(changed, path)
+    retrained.predict_windows(data, 30, adaptive=False)
+    assert retrained.cache.metrics()["hits"] == 0
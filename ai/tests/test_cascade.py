@@ -0,0 +1,36 @@
+import numpy as np
+from models.cascade import CascadeModel
+from models.model import Model
+from models.outputs import softmax, top_k
+from models.windowing import pad_windows
+from tests.weights import save_random_weights
+
+
+def test_unsure_windows_take_the_large_logits(
+    tmp_path, model: Model, windows: np.ndarray
+) -> None:
+    large = Model(model_path=save_random_weights(str(tmp_path / "large.weights.h5"), 1))
+    large.__load__()
+    inputs, lengths = pad_windows(
+        [w[:n] for w in windows for n in (30, 17)] + [windows[0, ::-1]]
+    )
+    small_logits = model.predict_logits(inputs, lengths)
+    _, probs = top_k(softmax(small_logits), 2)
+    margins = probs[:, 0] - probs[:, 1]
+    # Escalate the windows with a margin below the median, not all of them.
+    cascade = CascadeModel(
+        model, large, min_probability=0.0, min_margin=np.median(margins)
+    )
+    escalated = margins < cascade.min_margin
+    assert 0 < escalated.sum() < len(escalated)
+
+    logits = cascade.predict_logits(inputs, lengths)
+    np.testing.assert_allclose(
+        logits[escalated],
+        large.predict_logits(inputs[escalated], lengths[escalated]),
+        atol=1e-5,
+    )
+    np.testing.assert_allclose(logits[~escalated], small_logits[~escalated], atol=1e-5)
+    stats = cascade.metrics()["cascade"]
+    assert stats["windows"] == len(inputs)
+    assert stats["escalated"] == escalated.sum()
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+from detection.frames import FrameSampler, sample_video
+
+
+class FakeCapture(object):
+    """
+    A cv2.VideoCapture of `count` frames at `fps`, reporting no position timestamps.
+    """
+
+    def __init__(self, count: int, fps: float) -> None:
+        self.count = count
+        self.fps = fps
+        self.position = 0
+
+    def get(self, prop: int) -> float:
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def set(self, prop: int, value: float) -> None:
+        self.position = int(value)
+
+    def isOpened(self) -> bool:
+        return True
+
+    def grab(self) -> bool:
+        self.position += 1
+        return self.position <= self.count
+
+
+def kept(fps: float, target_fps: float, timestamps: np.ndarray) -> list:
+    sampler = FrameSampler(fps, target_fps)
+    return [i for i, t in enumerate(timestamps) if sampler.keep(t)]
+
+
+def test_60_fps_keeps_30_per_second() -> None:
+    frames = kept(60, 30, np.arange(600) / 60)
+    assert frames == list(range(0, 600, 2))
+
+
+def test_variable_frame_rate_keeps_target_rate() -> None:
+    rng = np.random.default_rng(0)
+    timestamps = np.cumsum(rng.uniform(1 / 90, 1 / 30, 1200))
+    frames = kept(60, 15, timestamps)
+    seconds = timestamps[-1] - timestamps[0]
+    assert abs(len(frames) - 15 * seconds) <= 1
+    assert np.diff(timestamps[frames]).max() < 1 / 15 + 1 / 30
+
+
+def test_lower_fps_keeps_every_frame() -> None:
+    assert kept(24, 30, np.arange(48) / 24) == list(range(48))
+
+
+@pytest.mark.parametrize("fps, target_fps", [(60, 30), (30, 12), (29.97, 10)])
+def test_segments_line_up_with_a_full_pass(fps: float, target_fps: float) -> None:
+    full = list(sample_video(FakeCapture(300, fps), target_fps=target_fps))
+    for start in (1, 7, 45, 100, 101, 299):
+        segment = list(sample_video(FakeCapture(300, fps), start, 300, target_fps))
+        assert segment == [i for i in full if i >= start]
+
+
+def test_unknown_fps_keeps_every_frame() -> None:
+    assert list(sample_video(FakeCapture(10, 0.0), target_fps=15)) == list(range(10))
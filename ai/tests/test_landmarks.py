@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from config import COMPACT_LANDMARKS
+from detection.landmarks import results_to_array, results_to_compact
+from tests.holistic import (
+    legacy_extract_keypoints,
+    loop_extract_keypoints,
+    make_holistic_results,
+)
+
+
+@pytest.mark.parametrize("left_hand", [False, True])
+def test_results_to_array_matches_legacy(left_hand: bool) -> None:
+    results = make_holistic_results(left_hand=left_hand)
+    expected = legacy_extract_keypoints(results)
+    out = np.empty_like(expected)
+    assert np.array_equal(results_to_array(results), expected, equal_nan=True)
+    assert np.array_equal(results_to_array(results, out), expected, equal_nan=True)
+    out = np.empty_like(expected)
+    assert np.array_equal(
+        loop_extract_keypoints(results, out), expected, equal_nan=True
+    )
+
+
+@pytest.mark.parametrize("left_hand", [False, True])
+def test_compact_rows_match_full(left_hand: bool) -> None:
+    results = make_holistic_results(left_hand=left_hand)
+    full = results_to_array(results)
+    compact = results_to_compact(results)
+    assert np.array_equal(full[COMPACT_LANDMARKS], compact, equal_nan=True)
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from config import COMPACT_LANDMARKS, MODEL_DIM, NUMBER_OF_FRAMES
+from models.export import export_onnx, export_tflite
+from models.model import Model
+from models.windowing import pad_windows
+from tests.weights import save_random_weights
+
+
+def ragged(windows: np.ndarray) -> tuple:
+    """
+    Pads the windows cut to different lengths into one batch.
+    """
+    return pad_windows([w[: NUMBER_OF_FRAMES - 7 * i] for i, w in enumerate(windows)])
+
+
+def test_compact_matches_full(weights: str, model: Model, windows: np.ndarray) -> None:
+    compact = Model(model_path=weights, compact=True)
+    compact.__load__()
+    np.testing.assert_allclose(
+        compact.predict_logits(windows[:, :, COMPACT_LANDMARKS]),
+        model.predict_logits(windows),
+        atol=1e-5,
+    )
+
+
+def test_padded_matches_alone(model: Model, windows: np.ndarray) -> None:
+    batch, lengths = ragged(windows)
+    alone = [model.predict_logits(w[None, :n])[0] for w, n in zip(batch, lengths)]
+    np.testing.assert_allclose(
+        model.predict_logits(batch, lengths), np.stack(alone), atol=1e-5
+    )
+
+
+def test_tflite_matches_keras(tmp_path, model: Model, windows: np.ndarray) -> None:
+    path = str(tmp_path / "model.tflite")
+    export_tflite(model, path)
+    tflite = Model(path, backend="tflite")
+    tflite.__load__()
+    batch, lengths = ragged(windows)
+    np.testing.assert_allclose(
+        tflite.predict_logits(batch, lengths),
+        model.predict_logits(batch, lengths),
+        atol=1e-4,
+    )
+
+
+def test_onnx_matches_keras(tmp_path, model: Model, windows: np.ndarray) -> None:
+    pytest.importorskip("tf2onnx")
+    pytest.importorskip("onnxruntime")
+    path = str(tmp_path / "model.onnx")
+    export_onnx(model, path)
+    onnx = Model(path, backend="onnx")
+    onnx.__load__()
+    batch, lengths = ragged(windows)
+    np.testing.assert_allclose(
+        onnx.predict_logits(batch, lengths),
+        model.predict_logits(batch, lengths),
+        atol=1e-4,
+    )
+
+
+def test_folded_matches_trained(weights: str, windows: np.ndarray) -> None:
+    trained = Model(model_path=weights, fold=False)
+    folded = Model(model_path=weights, fold=True)
+    trained.__load__()
+    folded.__load__()
+    assert len(folded.networks[0].layers) < len(trained.networks[0].layers)
+    batch, lengths = ragged(windows)
+    np.testing.assert_allclose(
+        folded.predict_logits(batch, lengths),
+        trained.predict_logits(batch, lengths),
+        atol=1e-4,
+    )
+    for length in (1, 2):
+        np.testing.assert_allclose(
+            folded.predict_logits(windows[:1, :length]),
+            trained.predict_logits(windows[:1, :length]),
+            atol=1e-4,
+        )
+
+
+def test_bucketed_matches_unbucketed(
+    weights: str, model: Model, windows: np.ndarray
+) -> None:
+    unbucketed = Model(model_path=weights, buckets=())
+    unbucketed.__load__()
+    for length in (1, 3, 12, 29, NUMBER_OF_FRAMES):
+        np.testing.assert_allclose(
+            model.predict_logits(windows[:, :length]),
+            unbucketed.predict_logits(windows[:, :length]),
+            atol=1e-5,
+        )
+
+
+def test_restored_matches_built(
+    tmp_path, weights: str, model: Model, windows: np.ndarray
+) -> None:
+    Model(model_path=weights, compiled_dir=str(tmp_path)).__load__()
+    restored = Model(model_path=weights, compiled_dir=str(tmp_path))
+    restored.__load__()
+    assert not restored.networks
+    batch, lengths = ragged(windows)
+    np.testing.assert_allclose(
+        restored.predict_logits(batch, lengths),
+        model.predict_logits(batch, lengths),
+        atol=1e-5,
+    )
+
+
+def test_ensembles_match_their_networks(
+    tmp_path, weights: str, windows: np.ndarray
+) -> None:
+    paths = [weights, save_random_weights(str(tmp_path / "1.weights.h5"), seed=1)]
+    batch, lengths = ragged(windows)
+    logits = {}
+    for mode in ("sequential", "fused", "average"):
+        ensemble = Model(model_path=paths, ensemble=mode)
+        ensemble.__load__()
+        logits[mode] = ensemble.predict_logits(batch, lengths)
+    networks = []
+    for path in paths:
+        network = Model(model_path=path).get_model(max_len=None, dim=MODEL_DIM)
+        network.load_weights(path)
+        networks.append(network.get_weights())
+    network.set_weights([np.mean(w, axis=0) for w in zip(*networks)])
+    network.save_weights(str(tmp_path / "mean.weights.h5"))
+    mean = Model(model_path=str(tmp_path / "mean.weights.h5"))
+    mean.__load__()
+    np.testing.assert_allclose(logits["fused"], logits["sequential"], atol=1e-4)
+    np.testing.assert_allclose(
+        logits["average"], mean.predict_logits(batch, lengths), atol=1e-4
+    )
+    assert np.abs(logits["average"] - logits["sequential"]).max() > 1e-3
@@ -0,0 +1,57 @@
+import itertools
+import threading
+import time
+import numpy as np
+import pytest
+from utils.pipeline import Pipeline
+
+
+def pipeline_threads() -> list:
+    return [t for t in threading.enumerate() if t.name in ("source", "slow", "add")]
+
+
+def test_workers_keep_the_source_order() -> None:
+    delays = np.random.default_rng(0).uniform(0, 0.005, 100)
+
+    def slow(i: int) -> int:
+        time.sleep(delays[i])
+        return i
+
+    stages = [("slow", slow, 4), ("add", lambda i: i + 1, 2)]
+    for threaded in (True, False):
+        pipeline = Pipeline(stages, threaded=threaded)
+        assert list(pipeline.run(range(100))) == list(range(1, 101))
+        assert pipeline.metrics()["slow"]["items"] == 100
+    assert not pipeline_threads()
+
+
+def test_stage_error_stops_the_run() -> None:
+    def fail(i: int) -> int:
+        if i == 20:
+            raise ValueError("bad frame")
+        return i
+
+    pipeline = Pipeline([("slow", fail, 3), ("add", lambda i: i + 1, 1)])
+    outputs = []
+    with pytest.raises(ValueError, match="bad frame"):
+        for item in pipeline.run(itertools.count()):
+            outputs.append(item)
+    assert outputs == list(range(1, len(outputs) + 1))
+    assert len(outputs) <= 20
+    assert not pipeline_threads()
+
+
+def test_stopping_under_backpressure() -> None:
+    # The consumer stops while every queue is full and the source is endless.
+    pipeline = Pipeline([("slow", lambda i: i, 2), ("add", lambda i: i, 1)], maxsize=2)
+    run = pipeline.run(itertools.count())
+    assert next(run) == 0
+    time.sleep(0.2)
+    # The full queues stall the source after a few items.
+    read = pipeline.source_stats["items"]
+    time.sleep(0.2)
+    assert pipeline.source_stats["items"] == read <= 20
+    begin = time.perf_counter()
+    run.close()
+    assert time.perf_counter() - begin < 2
+    assert not pipeline_threads()
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+import pytest
+from api.segments import merge_segments, plan_segments
+from detection.frames import sample_video
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """
+    Writes a 60 fps video whose frame i is filled with the value 2 * i.
+    """
+    path = str(tmp_path_factory.mktemp("video") / "frames.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 60, (64, 48))
+    for i in range(125):
+        writer.write(np.full((48, 64, 3), 2 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def read(video: str, start: int = 0, end=None, target_fps=None) -> np.ndarray:
+    """
+    Returns the index and the decoded value of each kept frame, like a segment worker reads them.
+    """
+    cap = cv2.VideoCapture(video)
+    frames = []
+    for frame_id in sample_video(cap, start, end, target_fps):
+        _, frame = cap.retrieve()
+        frames.append((frame_id, round(frame.mean() / 2)))
+    cap.release()
+    return np.array(frames).reshape(-1, 2)
+
+
+@pytest.mark.parametrize("frame_count", [0, 1, 59, 60, 125, 1000])
+@pytest.mark.parametrize("workers", [1, 2, 3, 8])
+def test_plan_covers_every_frame_once(frame_count: int, workers: int) -> None:
+    segments = plan_segments(frame_count, workers, min_frames=30)
+    assert 1 <= len(segments) <= workers
+    assert segments[0][0] == 0 and segments[-1][1] == frame_count
+    assert all(end == start for (_, end), (start, _) in zip(segments, segments[1:]))
+    if len(segments) > 1:
+        assert min(end - start for start, end in segments) >= 30
+
+
+@pytest.mark.parametrize("target_fps", [None, 30, 25])
+@pytest.mark.parametrize("workers", [2, 3, 4])
+def test_merged_segments_match_a_single_pass(
+    video: str, target_fps, workers: int
+) -> None:
+    expected = read(video, target_fps=target_fps)
+    assert (expected[:, 0] == expected[:, 1]).all()
+    segments = plan_segments(125, workers, min_frames=30)
+    results = []
+    for i, (start, end) in enumerate(segments):
+        # The last segment reads to the end, as extract_segments does.
+        frames = read(video, start, None if i == len(segments) - 1 else end, target_fps)
+        landmarks = np.repeat(frames[:, None, :1], 3, axis=-1).astype(np.float32)
+        results.append((landmarks, {"detect": {"items": len(frames), "busy_ms": i}}))
+    landmarks, metrics = merge_segments(results)
+    np.testing.assert_array_equal(landmarks[:, 0, 0], expected[:, 1])
+    assert metrics["detect"]["items"] == len(expected)
+    busy = sum(i * len(r[0]) for i, r in enumerate(results)) / len(expected)
+    assert metrics["detect"]["busy_ms"] == pytest.approx(busy)
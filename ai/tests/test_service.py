@@ -0,0 +1,31 @@
+import threading
+import numpy as np
+from models.model import Model
+from models.service import InferenceServer, RemoteModel
+from models.windowing import pad_windows
+
+
+def test_remote_model_matches_local(
+    tmp_path, model: Model, windows: np.ndarray
+) -> None:
+    server = InferenceServer(model, str(tmp_path / "model.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    # Batches over slot_bytes go over the socket instead of the ring.
+    remote = RemoteModel(server.path, slots=2, slot_bytes=windows[0].nbytes * 2)
+    try:
+        remote.__load__()
+        assert remote.version() == model.version()
+        batch, lengths = pad_windows([w[: 30 - 7 * i] for i, w in enumerate(windows)])
+        for inputs, lengths in ((windows[:1], None), (batch, lengths)):
+            np.testing.assert_allclose(
+                remote.predict_logits(inputs, lengths),
+                model.predict_logits(inputs, lengths),
+                atol=1e-6,
+            )
+    finally:
+        remote.close()
+        server.close()
+        thread.join(10)
+    assert not thread.is_alive()
+    assert server.metrics()["requests"] == 2
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from config import NUMBER_OF_FRAMES
+from models.graph import parse_blocks
+from models.model import Model
+from models.streaming import StreamingAttention, StreamingCausalConv, StreamingModel
+
+
+def block(model: Model, kind: str) -> dict:
+    return next(layers for k, layers in parse_blocks(model.networks[0]) if k == kind)
+
+
+def test_causal_conv_step_matches_layer(model: Model) -> None:
+    conv = block(model, "conv")["dwconv"]
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(NUMBER_OF_FRAMES, conv.dw_conv.kernel.shape[1]))
+    x = x.astype(np.float32)
+    step = StreamingCausalConv(conv)
+    actual = np.stack([step.step(row) for row in x])
+    np.testing.assert_allclose(actual, conv(x[None]).numpy()[0], atol=1e-4)
+
+
+def test_attention_step_matches_last_query(model: Model) -> None:
+    attn = block(model, "transformer")["attn"]
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(NUMBER_OF_FRAMES, attn.dim)).astype(np.float32)
+    step = StreamingAttention(attn)
+    for t in range(NUMBER_OF_FRAMES):
+        expected = attn(x[None, : t + 1]).numpy()[0, -1]
+        np.testing.assert_allclose(step.step(x[t]), expected, atol=1e-4)
+
+
+def test_one_frame_matches_full_window(model: Model, windows: np.ndarray) -> None:
+    # Over a single frame the running statistics are the window statistics.
+    streaming = StreamingModel(model)
+    streaming.push(windows[0, 0])
+    expected = model.predict_logits(windows[:1, :1])[0]
+    np.testing.assert_allclose(streaming.finish(), expected, atol=1e-4)
+
+
+def test_window_stays_near_full_window(model: Model, windows: np.ndarray) -> None:
+    # Streaming approximates the full window, see StreamingModel: within 1.0
+    # of logits up to about 5 after every frame, and within 0.25 at the end.
+    for window in windows:
+        streaming = StreamingModel(model)
+        for t, frame in enumerate(window):
+            logits = streaming.push(frame)
+            if t >= 2:
+                expected = model.predict_logits(window[None, : t + 1])[0]
+                np.testing.assert_allclose(logits, expected, atol=1.0)
+        expected = model.predict_logits(window[None])[0]
+        np.testing.assert_allclose(streaming.finish(), expected, atol=0.25)
+        assert np.argmax(streaming.logits) == np.argmax(expected)
+
+
+def test_restored_model_is_rejected(tmp_path, weights: str) -> None:
+    Model(model_path=weights, compiled_dir=str(tmp_path)).__load__()
+    restored = Model(model_path=weights, compiled_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        StreamingModel(restored)
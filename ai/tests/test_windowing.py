@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from config import NO_SIGN, NUM_CLASSES
+from models.model import Model
+from models.windowing import hand_coverage, motion_energy, window_bounds
+
+
+@pytest.mark.parametrize("frames", [0, 1, 4, 5])
+def test_motion_energy_has_a_value_per_frame(
+    model: Model, windows: np.ndarray, frames: int
+) -> None:
+    energy = motion_energy(windows[0, :frames], model.hand_rows, smoothing=5)
+    assert energy.shape == (frames,)
+    assert np.isfinite(energy).all()
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+@pytest.mark.parametrize("frames", [0, 1, 4, 5])
+def test_short_sequences_predict(
+    model: Model, windows: np.ndarray, frames: int, adaptive: bool
+) -> None:
+    logits, times = model.predict_windows(windows[0, :frames], 30, adaptive=adaptive)
+    assert logits.shape == (len(times), NUM_CLASSES)
+    if frames == 0:
+        assert len(times) == 0
+        return
+    bounds = np.round(times * 30).astype(int)
+    assert bounds[0, 0] == 0 and bounds[-1, 1] == frames
+    assert (bounds[:, 1] > bounds[:, 0]).all()
+    assert np.isfinite(logits).all()
+
+
+def test_window_bounds_end_with_the_last_frames() -> None:
+    bounds = window_bounds(5, 30, 15, 100)
+    assert bounds.tolist() == [
+        [0, 30],
+        [15, 45],
+        [30, 60],
+        [45, 75],
+        [60, 90],
+        [75, 100],
+    ]
+    assert window_bounds(5, 30, 15, 90).tolist()[-1] == [60, 90]
+
+
+def test_partial_window_matches_its_frames_alone(
+    model: Model, windows: np.ndarray
+) -> None:
+    data = windows.reshape(-1, *windows.shape[2:])[:100]
+    logits, times = model.predict_windows(data, 30, 1.0, 0.5, adaptive=False)
+    np.testing.assert_allclose(times[-1] * 30, [75, 100])
+    expected = model.predict_logits(data[None, 75:100])[0]
+    np.testing.assert_allclose(logits[-1], expected, atol=1e-5)
+    np.testing.assert_allclose(
+        logits[0], model.predict_logits(data[None, :30])[0], atol=1e-5
+    )
+
+
+def test_window_without_hands_decodes_to_no_sign(
+    model: Model, windows: np.ndarray
+) -> None:
+    data = windows.reshape(-1, *windows.shape[2:])[:90].copy()
+    data[30:60, model.hand_rows] = np.nan
+    bounds = np.array([[0, 30], [30, 60], [60, 90], [15, 45]])
+    coverage = hand_coverage(data, model.hand_rows, bounds)
+    np.testing.assert_allclose(coverage, [1, 0, 1, 0.5])
+
+    skipped = model.gate_stats["skipped"]
+    logits, _ = model.predict_windows(data, 30, 1.0, 1.0, adaptive=False)
+    assert model.gate_stats["skipped"] == skipped + 1
+    assert np.isnan(logits[1]).all() and np.isfinite(logits[[0, 2]]).all()
+    labels, probs = model.decode(logits)
+    assert labels[1] == NO_SIGN and probs[1] == 0
+    assert NO_SIGN not in labels[::2] and (probs[::2] > 0).all()
@@ -0,0 +1,20 @@
+import numpy as np
+import tensorflow as tf
+from config import MODEL_DIM
+from models.model import Model
+
+
+def save_random_weights(path: str, seed: int = 0) -> str:
+    """
+    Saves the weights of a randomly initialized get_model network, with random batch norm statistics so folding them changes the graph.
+    """
+    tf.keras.utils.set_random_seed(seed)
+    network = Model(model_path="").get_model(max_len=None, dim=MODEL_DIM)
+    rng = np.random.default_rng(seed)
+    for weight in network.weights:
+        if weight.name == "moving_mean":
+            weight.assign(rng.normal(0, 0.1, weight.shape))
+        elif weight.name == "moving_variance":
+            weight.assign(rng.uniform(0.5, 1.5, weight.shape))
+    network.save_weights(path)
+    return path
@@ -0,0 +1,253 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Marks the end of the items in a stage queue.
+_END = object()
+
+
+class _Stage(object):
+    """
+    One step of a Pipeline: its function, worker threads, input queue and timings.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int) -> None:
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.inputs: Optional[queue.Queue] = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the ordering state and timings before a run.
+        """
+        self.next_index = 0
+        self.pending: Dict[int, Any] = {}
+        self.running = self.workers
+        self.stats = {"items": 0, "busy": 0.0, "starved": 0.0, "blocked": 0.0}
+
+
+class Pipeline(object):
+    """
+    Runs items through a chain of stages, each on its own threads, with bounded queues between them.
+
+    The source is iterated on a thread of its own. A stage with several
+    workers finishes items out of order; they are put back in order before
+    the next stage sees them, so the output keeps the order of the source.
+    A full queue blocks the stage feeding it, so a slow stage throttles the
+    ones before it instead of letting frames pile up in memory.
+
+    Threads only overlap where the work releases the GIL, e.g. OpenCV
+    decoding and encoding, MediaPipe graphs and TensorFlow calls.
+
+    Attributes:
+        stages (List[_Stage]): The stages, in order.
+        maxsize (int): The capacity of each queue.
+        threaded (bool): Whether to run the stages on threads, or one item at a time in the caller's thread.
+        source (str): The name of the source in metrics.
+        source_stats (Dict[str, float]): The items read from the source, and the seconds spent reading and blocked.
+        seconds (float): The wall time of the last run.
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable[[Any], Any], int]],
+        maxsize: int = 4,
+        threaded: bool = True,
+        source: str = "source",
+    ) -> None:
+        """
+        Initializes the Pipeline object.
+
+        Args:
+            stages (List[Tuple[str, Callable[[Any], Any], int]]): The name, function and number of worker threads of each stage. Stages that keep state across items need a single worker.
+            maxsize (int, optional): The capacity of each queue. Defaults to 4.
+            threaded (bool, optional): Whether to run the stages on threads. Defaults to True.
+            source (str, optional): The name of the source in metrics. Defaults to "source".
+        """
+        self.stages = [_Stage(name, fn, workers) for name, fn, workers in stages]
+        self.maxsize = maxsize
+        self.threaded = threaded
+        self.source = source
+        self.source_stats = {"items": 0, "busy": 0.0, "blocked": 0.0}
+        self.seconds = 0.0
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        """
+        Runs the items of a source through the stages.
+
+        Args:
+            source (Iterable[Any]): The items, e.g. decoded frames.
+
+        Yields:
+            Any: The output of the last stage for each item, in the order of the source.
+
+        Raises:
+            Exception: The first exception raised by the source or a stage, after the threads stopped.
+        """
+        self.source_stats = {"items": 0, "busy": 0.0, "blocked": 0.0}
+        for stage in self.stages:
+            stage.reset()
+        start = time.perf_counter()
+        try:
+            if self.threaded:
+                yield from self._run_threaded(source)
+            else:
+                yield from self._run_serial(source)
+        finally:
+            self.seconds = time.perf_counter() - start
+
+    def _run_serial(self, source: Iterable[Any]) -> Iterator[Any]:
+        iterator = iter(source)
+        while True:
+            begin = time.perf_counter()
+            item = next(iterator, _END)
+            self.source_stats["busy"] += time.perf_counter() - begin
+            if item is _END:
+                return
+            self.source_stats["items"] += 1
+            for stage in self.stages:
+                begin = time.perf_counter()
+                item = stage.fn(item)
+                stage.stats["busy"] += time.perf_counter() - begin
+                stage.stats["items"] += 1
+            yield item
+
+    def _run_threaded(self, source: Iterable[Any]) -> Iterator[Any]:
+        stop = threading.Event()
+        errors = []
+        for stage in self.stages:
+            stage.inputs = queue.Queue(self.maxsize)
+        outputs = queue.Queue(self.maxsize)
+        queues = [stage.inputs for stage in self.stages] + [outputs]
+
+        def put(target: queue.Queue, item: Any, stats: Dict[str, float]) -> bool:
+            # Waits for room, unless the pipeline is stopping.
+            begin = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    stats["blocked"] += time.perf_counter() - begin
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read() -> None:
+            try:
+                iterator = iter(source)
+                index = 0
+                while not stop.is_set():
+                    begin = time.perf_counter()
+                    item = next(iterator, _END)
+                    self.source_stats["busy"] += time.perf_counter() - begin
+                    if item is _END:
+                        break
+                    self.source_stats["items"] += 1
+                    if not put(queues[0], (index, item), self.source_stats):
+                        return
+                    index += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            put(queues[0], _END, self.source_stats)
+
+        def work(position: int) -> None:
+            stage = self.stages[position]
+            target = queues[position + 1]
+            stats = stage.stats
+            try:
+                while not stop.is_set():
+                    begin = time.perf_counter()
+                    try:
+                        job = stage.inputs.get(timeout=0.1)
+                    except queue.Empty:
+                        stats["starved"] += time.perf_counter() - begin
+                        continue
+                    stats["starved"] += time.perf_counter() - begin
+                    if job is _END:
+                        # Let the other workers of the stage see the end too.
+                        stage.inputs.put(_END)
+                        break
+                    index, item = job
+                    begin = time.perf_counter()
+                    item = stage.fn(item)
+                    with stage.lock:
+                        stats["busy"] += time.perf_counter() - begin
+                        stats["items"] += 1
+                        # Forward the items that are next in order.
+                        stage.pending[index] = item
+                        while stage.next_index in stage.pending:
+                            ready = stage.pending.pop(stage.next_index)
+                            if not put(target, (stage.next_index, ready), stats):
+                                return
+                            stage.next_index += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                with stage.lock:
+                    stage.running -= 1
+                    last = stage.running == 0
+                if last and not stop.is_set():
+                    put(target, _END, stats)
+
+        threads = [threading.Thread(target=read, name=self.source, daemon=True)]
+        for position, stage in enumerate(self.stages):
+            threads.extend(
+                threading.Thread(
+                    target=work, args=(position,), name=stage.name, daemon=True
+                )
+                for _ in range(stage.workers)
+            )
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                try:
+                    job = outputs.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if job is _END:
+                    break
+                yield job[1]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the timings of the last run.
+
+        Returns:
+            Dict[str, Dict[str, float]]: For the source and each stage, the items processed and the milliseconds per item spent working, waiting for input (starved) and waiting for room downstream (blocked), plus the overall items per second.
+        """
+
+        def per_item(stats: Dict[str, float]) -> Dict[str, float]:
+            items = max(stats["items"], 1)
+            return {
+                "items": stats["items"],
+                **{
+                    f"{key}_ms": stats[key] / items * 1e3
+                    for key in ("busy", "starved", "blocked")
+                    if key in stats
+                },
+            }
+
+        metrics = {self.source: per_item(self.source_stats)}
+        for stage in self.stages:
+            metrics[stage.name] = per_item(stage.stats)
+        items = self.source_stats["items"]
+        metrics["total"] = {
+            "items": items,
+            "items_per_second": items / self.seconds if self.seconds else 0.0,
+        }
+        return metrics
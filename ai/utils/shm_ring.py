@@ -0,0 +1,285 @@
+import numpy as np
+import queue
+from multiprocessing import get_context, resource_tracker, shared_memory
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class ShmRing(object):
+    """
+    A ring of fixed-size slots in one block of shared memory.
+
+    The process that creates the ring owns the block and unlinks it on close,
+    other processes attach to it by name. Arrays are written into a slot and
+    read back as views of it, so they cross processes without being pickled
+    or copied through a pipe. Which slot holds what, and when it may be
+    reused, is up to the users, who pass small descriptors (slot, shape and
+    dtype) over a socket or queue.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        """
+        Creates a ring, or attaches to the ring of another process.
+
+        Args:
+            slots (int): The number of slots.
+            slot_bytes (int): The size of each slot in bytes.
+            name (Optional[str], optional): The name of the ring to attach to. Defaults to None, which creates one.
+
+        Raises:
+            ValueError: If the ring attached to is smaller than slots * slot_bytes.
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Attaching registers the block with this process' resource
+            # tracker, which would unlink it under its owner on exit.
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+            if self.shm.size < slots * slot_bytes:
+                raise ValueError(
+                    f"Ring {name} has {self.shm.size} bytes, not {slots * slot_bytes}"
+                )
+        self.name = self.shm.name
+
+    def fits(self, shape: Tuple[int, ...], dtype: np.dtype = np.float32) -> bool:
+        """
+        Checks whether an array fits in one slot.
+
+        Args:
+            shape (Tuple[int, ...]): The shape of the array.
+            dtype (np.dtype, optional): The dtype of the array. Defaults to np.float32.
+
+        Returns:
+            bool: True if the array fits, False otherwise.
+        """
+        return int(np.prod(shape)) * np.dtype(dtype).itemsize <= self.slot_bytes
+
+    def view(
+        self, slot: int, shape: Tuple[int, ...], dtype: np.dtype = np.float32
+    ) -> np.ndarray:
+        """
+        Returns an array backed by a slot, without copying.
+
+        The view is only valid until the slot is reused; copy it to keep it.
+
+        Args:
+            slot (int): The slot index.
+            shape (Tuple[int, ...]): The shape of the array.
+            dtype (np.dtype, optional): The dtype of the array. Defaults to np.float32.
+
+        Returns:
+            np.ndarray: The array.
+
+        Raises:
+            ValueError: If the array does not fit in a slot.
+        """
+        if not self.fits(shape, dtype):
+            raise ValueError(f"An array of shape {shape} does not fit in a slot")
+        return np.ndarray(
+            shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes
+        )
+
+    def write(self, slot: int, array: np.ndarray) -> np.ndarray:
+        """
+        Copies an array into a slot.
+
+        Args:
+            slot (int): The slot index.
+            array (np.ndarray): The array.
+
+        Returns:
+            np.ndarray: The view of the slot holding the copy.
+        """
+        view = self.view(slot, array.shape, array.dtype)
+        view[...] = array
+        return view
+
+    def close(self) -> None:
+        """
+        Detaches from the ring, and frees it if this process created it.
+
+        Views of the slots must be dropped first; while one is alive the
+        mapping stays open until it is garbage collected.
+        """
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+    def __enter__(self) -> "ShmRing":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class FrameRing(ShmRing):
+    """
+    A ShmRing of frame slots passed between processes, with queues of free and filled slots.
+
+    A producer takes a free slot with acquire, writes a frame into it, e.g.
+    with cv2.VideoCapture.read(ring.frame(slot)), and hands it over with put.
+    A consumer reads filled slots in place with frames and gives each back
+    with release once done, so at most `slots` frames are in flight and the
+    producer waits for a free slot when consumers fall behind. Only a slot
+    number and a frame index cross the queues.
+
+    The ring is passed to spawned processes as an argument, which attaches
+    them to it; only the process that created it unlinks the memory.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        shape: Tuple[int, ...],
+        dtype: np.dtype = np.uint8,
+        context: Optional[BaseContext] = None,
+    ):
+        """
+        Creates a ring of frame slots.
+
+        Args:
+            slots (int): The number of slots, i.e. of frames in flight.
+            shape (Tuple[int, ...]): The shape of a frame, e.g. (height, width, 3).
+            dtype (np.dtype, optional): The dtype of a frame. Defaults to np.uint8.
+            context (Optional[BaseContext], optional): The multiprocessing context of the queues. Defaults to the spawn context.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        super().__init__(slots, int(np.prod(self.shape)) * self.dtype.itemsize)
+        context = context or get_context("spawn")
+        self.free = context.Queue()
+        self.filled = context.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "shape": self.shape,
+            "dtype": self.dtype,
+            "free": self.free,
+            "filled": self.filled,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Processes started by multiprocessing share the resource tracker of
+        # their parent, so unlike in ShmRing the block stays registered.
+        self.slots = state["slots"]
+        self.slot_bytes = state["slot_bytes"]
+        self.owner = False
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.name = self.shm.name
+        self.shape = state["shape"]
+        self.dtype = state["dtype"]
+        self.free = state["free"]
+        self.filled = state["filled"]
+
+    def frame(self, slot: int) -> np.ndarray:
+        """
+        Returns the frame of a slot, without copying.
+
+        Args:
+            slot (int): The slot index.
+
+        Returns:
+            np.ndarray: The frame.
+        """
+        return self.view(slot, self.shape, self.dtype)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Takes a free slot, waiting for a consumer to release one if needed.
+
+        Args:
+            timeout (Optional[float], optional): The seconds to wait. Defaults to None, forever.
+
+        Returns:
+            int: The slot index.
+
+        Raises:
+            queue.Empty: If no slot was released in time.
+        """
+        return self.free.get(timeout=timeout)
+
+    def put(self, slot: int, index: int) -> None:
+        """
+        Hands a written slot over to the consumers.
+
+        Args:
+            slot (int): The slot index.
+            index (int): The index of the frame in the video.
+        """
+        self.filled.put((index, slot))
+
+    def release(self, slot: int) -> None:
+        """
+        Gives a slot back to the producer once its frame is no longer read.
+
+        Args:
+            slot (int): The slot index.
+        """
+        self.free.put(slot)
+
+    def finish(self, consumers: int = 1) -> None:
+        """
+        Tells the consumers that no more frames will come.
+
+        Args:
+            consumers (int, optional): The number of consumers. Defaults to 1.
+        """
+        for _ in range(consumers):
+            self.filled.put(None)
+
+    def frames(
+        self, producer: Optional[BaseProcess] = None
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Yields the filled slots until the producer finishes.
+
+        Args:
+            producer (Optional[BaseProcess], optional): The producing process, watched while waiting. Defaults to None, wait forever.
+
+        Yields:
+            Tuple[int, int, np.ndarray]: The frame index, the slot index, which the caller must release, and the frame.
+
+        Raises:
+            RuntimeError: If the producer exited without calling finish.
+        """
+        while True:
+            try:
+                item = self.filled.get(timeout=None if producer is None else 1.0)
+            except queue.Empty:
+                if producer.is_alive():
+                    continue
+                # It may have finished just before the check.
+                try:
+                    item = self.filled.get(timeout=0.1)
+                except queue.Empty:
+                    raise RuntimeError(
+                        f"{producer.name} exited with code {producer.exitcode}"
+                    ) from None
+            if item is None:
+                return
+            index, slot = item
+            yield index, slot, self.frame(slot)
+
+    def close(self) -> None:
+        """
+        Detaches from the ring, and frees it and its queues if this process created it.
+        """
+        if self.owner:
+            for q in (self.free, self.filled):
+                q.close()
+                q.cancel_join_thread()
+        super().close()